@@ -0,0 +1,15 @@
+"""
+ASGI config of the API-only profile (user_management.settings_api).
+"""
+
+import os
+
+from django.core.asgi import get_asgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'user_management.settings_api')
+
+application = get_asgi_application()
+
+from users.warmup import warm_up  # noqa: E402
+
+warm_up()
@@ -1,4 +1,5 @@
 # user_management/settings.py
+import os
 from pathlib import Path
 from datetime import timedelta  
 
@@ -39,16 +40,18 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'users.instrumentation.RequestMetricsMiddleware',  # first: times the whole stack
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
-    'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
-    'django.middleware.csrf.CsrfViewMiddleware',
-    'django.contrib.auth.middleware.AuthenticationMiddleware',
-    'django.contrib.messages.middleware.MessageMiddleware',
-    'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'users.middleware.RoutedMiddleware',  # USERS['ROUTED_MIDDLEWARE'], for admin/ only
+    'users.middleware.ReplicaRoutingMiddleware',
 ]
 
+# The admin's session, authentication and messages middleware are run by
+# RoutedMiddleware, which these checks do not see
+SILENCED_SYSTEM_CHECKS = ['admin.E408', 'admin.E409', 'admin.E410']
+
 ROOT_URLCONF = 'user_management.urls'
 
 TEMPLATES = [
@@ -72,13 +75,55 @@ WSGI_APPLICATION = 'user_management.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/6.0/ref/settings/#databases
 
+# Connection reuse for every alias: each thread keeps its connection for
+# CONN_MAX_AGE seconds and checks it is still usable before reusing it
+DATABASE_POOL = {
+    'CONN_MAX_AGE': 600,
+    'CONN_HEALTH_CHECKS': True,
+}
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        **DATABASE_POOL,
+        'OPTIONS': {
+            'timeout': 20,  # seconds to wait for the write lock
+        },
     }
 }
 
+# Optional read replica, e.g. a copy of db.sqlite3 kept in sync:
+# DATABASE_REPLICA_NAME=/path/to/replica.sqlite3
+if os.environ.get('DATABASE_REPLICA_NAME'):
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'NAME': os.environ['DATABASE_REPLICA_NAME'],
+        'TEST': {'MIRROR': 'default'},  # tests only use the primary
+    }
+
+# Token state, users and permissions are cached here and invalidated by the
+# process that changes them, so every worker must share the cache: set
+# REDIS_URL when running more than one (users.E001). Without it each process
+# keeps its own cache and users app entries expire after
+# USERS['LOCAL_CACHE_TIMEOUT'] seconds.
+if os.environ.get('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['REDIS_URL'],
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# Users app reads go to READ_REPLICAS, writes to default
+DATABASE_ROUTERS = ['users.routers.PrimaryReplicaRouter']
+
 AUTH_USER_MODEL = 'users.User'
 
 # Password validation
@@ -118,21 +163,30 @@ USE_TZ = True
 STATIC_URL = 'static/'
 
 
+# has_perm() (admin, DRF) from users.permissions.permission_cache
+AUTHENTICATION_BACKENDS = [
+    'users.permissions.CachedModelBackend',
+]
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'users.authentication.StatelessJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
     ),
+    # orjson-backed when orjson is installed, DRF's stdlib json otherwise
     'DEFAULT_RENDERER_CLASSES': (
-        'rest_framework.renderers.JSONRenderer',
+        'users.renderers.JSONRenderer',
     ),
     'DEFAULT_PARSER_CLASSES': (
-        'rest_framework.parsers.JSONParser',
+        'users.renderers.JSONParser',
     ),
+    # Client IPs (rate limits) come from REMOTE_ADDR; behind N reverse
+    # proxies set this to N to read X-Forwarded-For
+    'NUM_PROXIES': 0,
     'NON_FIELD_ERRORS_KEY': 'error',
+    'EXCEPTION_HANDLER': 'users.exceptions.exception_handler',
 }
 
 
@@ -162,7 +216,7 @@ SIMPLE_JWT = {
     'USER_ID_CLAIM': 'user_id',
     
     # Token types
-    'AUTH_TOKEN_CLASSES': ('rest_framework_simplejwt.tokens.AccessToken',),
+    'AUTH_TOKEN_CLASSES': ('users.tokens.UserAccessToken',),
     'TOKEN_TYPE_CLAIM': 'token_type',
     
     # Sliding tokens (optional)
@@ -171,6 +225,120 @@ SIMPLE_JWT = {
     'SLIDING_TOKEN_REFRESH_LIFETIME': timedelta(days=1),
 }
 
+# Users App Settings
+USERS = {
+    # Cache holding each user's token version / status for revocation checks
+    'TOKEN_STATE_CACHE_ALIAS': 'default',
+    'TOKEN_STATE_CACHE_TIMEOUT': 60 * 60 * 24,  # 1 day, shared caches only
+    'LOCAL_CACHE_TIMEOUT': 5,          # seconds, per-process (LocMemCache) caches
+    'WORKER_PROCESSES': None,          # None: $WEB_CONCURRENCY
+
+    # Tokens whose signature was verified, until their exp: repeat requests
+    # with the same access token skip the HMAC check (per process, entries)
+    'VERIFIED_TOKEN_CACHE_ENABLED': True,
+    'VERIFIED_TOKEN_CACHE_MAXSIZE': 10000,
+
+    # Read-through user cache: in-process LRU in front of the shared cache
+    'USER_CACHE_ENABLED': True,
+    'USER_CACHE_ALIAS': 'default',
+    'USER_CACHE_TIMEOUT': 60 * 5,      # shared tier, seconds
+    'USER_CACHE_LOCAL_MAXSIZE': 1024,  # in-process tier, entries
+    'USER_CACHE_LOCAL_TTL': 30,        # in-process tier, seconds
+
+    # Effective permission sets served to has_perm() and HasPermissions
+    'PERMISSION_CACHE_ALIAS': 'default',
+    'PERMISSION_CACHE_TIMEOUT': 60 * 60 * 24,  # 1 day
+
+    # Password hashing process pool (per server process)
+    'HASHING_POOL_ENABLED': True,
+    'HASHING_POOL_WORKERS': None,      # defaults to the number of CPUs
+    'HASHING_POOL_QUEUE_LIMIT': 32,    # waiting jobs before returning 503
+    'HASHING_POOL_TIMEOUT': 10,        # seconds
+    
+    # User search index
+    'SEARCH_BACKEND': 'auto',          # FTS5 on SQLite, token table elsewhere
+    'SEARCH_FUZZY_THRESHOLD': 0.3,     # minimum trigram similarity (0..1)
+    
+    # Refresh token revocation (logout)
+    'REVOCATION_FILTER_ENABLED': True, # in-memory Bloom filters in front of the table
+    'REVOCATION_SYNC_INTERVAL': 1.0,   # seconds before other processes' revocations apply
+    'REVOCATION_PRUNE_INTERVAL': 3600, # background purge of expired rows, None to disable
+    
+    # last_login is written behind the login request, in batches
+    'LAST_LOGIN_BUFFER_ENABLED': True,
+    'LAST_LOGIN_FLUSH_INTERVAL': 5,    # seconds
+    'LAST_LOGIN_FLUSH_SIZE': 500,      # pending users that trigger an early flush
+    
+    # Production SQLite profile (ignored on other databases)
+    'SQLITE_PRAGMAS': {
+        'journal_mode': 'WAL',          # readers never block the writer
+        'synchronous': 'NORMAL',        # safe with WAL, fsync on checkpoint
+        'busy_timeout': 20000,          # ms
+        'mmap_size': 256 * 1024 * 1024,
+        'cache_size': -64000,           # KiB (64 MB)
+        'temp_store': 'MEMORY',
+    },
+    'SQLITE_WRITE_QUEUE': True,        # run users app writes on one writer thread
+
+    # Read replicas (every alias other than default)
+    'READ_REPLICAS': [alias for alias in DATABASES if alias != 'default'],
+    'REPLICA_STICKY_SECONDS': 5,       # a user reads the primary this long after a write
+    'REPLICA_STICKY_CACHE_ALIAS': 'default',
+
+    # Request instrumentation: histograms at /users/metrics/ and a
+    # Server-Timing header (opt in, the middleware is skipped when off)
+    'METRICS_ENABLED': False,
+    'METRICS_SERVER_TIMING': True,
+    'METRICS_WINDOW_SECONDS': 60,      # rolling quantiles window
+
+    # Sessions, CSRF and messages are for the admin: Bearer-authenticated
+    # API requests skip them
+    'ROUTED_MIDDLEWARE': [
+        'django.contrib.sessions.middleware.SessionMiddleware',
+        'django.middleware.csrf.CsrfViewMiddleware',
+        'django.contrib.auth.middleware.AuthenticationMiddleware',
+        'django.contrib.messages.middleware.MessageMiddleware',
+        'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    ],
+    'ROUTED_MIDDLEWARE_PATHS': ['/admin/'],
+
+    # Rate limits of login, registration and token refresh, checked before
+    # any password hashing or database access
+    'THROTTLE_ENABLED': True,
+    'THROTTLE_STORE': 'local',         # per process; 'cache' to share between workers
+    'THROTTLE_CACHE_ALIAS': 'default',
+    'THROTTLE_LOCAL_MAX_KEYS': 100000, # tracked IPs/emails per process
+    'THROTTLE_RATES': {
+        'login_ip': '30/min',
+        'login_email': '10/min',
+        'login_global': '1200/min',
+        'register_ip': '20/hour',
+        'register_email': '5/hour',
+        'register_global': '600/min',
+        'token_refresh_ip': '120/min',
+    },
+
+    # Admin changelist: estimated counts, keyset "Next" links, cached
+    # filter counts (exact counts stop at ADMIN_COUNT_LIMIT rows)
+    'ADMIN_SCALABLE_CHANGELIST': True,
+    'ADMIN_COUNT_LIMIT': 10000,
+    'ADMIN_CACHE_ALIAS': 'default',
+    'ADMIN_FACET_CACHE_TIMEOUT': 60,
+
+    # /users/batch/: sub-requests per batch, threads running concurrent reads
+    'BATCH_MAX_REQUESTS': 20,
+    'BATCH_WORKERS': 4,
+
+    # Lifecycle events (created, updated, password changed, (de)activated,
+    # deleted) written with each change; run manage.py dispatch_user_events
+    # to publish them at /users/events/
+    'EVENTS_ENABLED': True,
+    'EVENT_BATCH_SIZE': 500,           # events numbered per dispatcher transaction
+    'EVENT_DISPATCH_INTERVAL': 0.5,    # seconds between dispatcher polls when idle
+    'EVENT_RETENTION': 60 * 60 * 24 * 7,  # published events are kept 7 days
+    'EVENT_POLL_TIMEOUT': 25,          # longest wait of a long-poll, seconds
+}
+
 # CORS Settings
 CORS_ALLOWED_ORIGINS = [
     
@@ -0,0 +1,42 @@
+# user_management/settings_api.py
+"""
+API-only profile: serves users.urls (JWT API) without the admin, sessions,
+messages and static files stacks, for nodes behind the API load balancer.
+Entry points: user_management.wsgi_api / user_management.asgi_api
+"""
+from .settings import *  # noqa: F401,F403
+
+# DRF and simplejwt need no app of their own: the users app imports them,
+# and the entry points load the views before forking workers
+INSTALLED_APPS = [
+    'django.contrib.auth',
+    'django.contrib.contenttypes',
+
+    'corsheaders', # CORS
+    'rest_framework_simplejwt.token_blacklist', # Token Blacklisting
+
+    'users', # our custom user app
+]
+
+# Token authentication only: no session, CSRF, messages or frame options
+MIDDLEWARE = [
+    'users.instrumentation.RequestMetricsMiddleware',  # first: times the whole stack
+    'corsheaders.middleware.CorsMiddleware',
+    'django.middleware.security.SecurityMiddleware',
+    'django.middleware.common.CommonMiddleware',
+    'users.middleware.ReplicaRoutingMiddleware',
+]
+
+ROOT_URLCONF = 'user_management.urls_api'
+
+# Responses are JSON; templates only render debug error pages
+TEMPLATES = [
+    {
+        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'DIRS': [],
+        'APP_DIRS': False,
+        'OPTIONS': {},
+    },
+]
+
+WSGI_APPLICATION = 'user_management.wsgi_api.application'
@@ -4,6 +4,7 @@ from django.urls import path,include
 
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('users/async/', include('users.async_urls')),
     path('users/', include('users.urls')),
 
 ]
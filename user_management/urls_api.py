@@ -0,0 +1,9 @@
+"""
+URLs of the API-only profile (user_management.settings_api): no admin
+"""
+from django.urls import path,include
+
+urlpatterns = [
+    path('users/async/', include('users.async_urls')),
+    path('users/', include('users.urls')),
+]
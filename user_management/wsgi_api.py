@@ -0,0 +1,19 @@
+"""
+WSGI config of the API-only profile (user_management.settings_api).
+
+Preload it in the master process so the warm-up runs once and forked
+workers share it, e.g.:
+    gunicorn --preload --workers 4 user_management.wsgi_api:application
+"""
+
+import os
+
+from django.core.wsgi import get_wsgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'user_management.settings_api')
+
+application = get_wsgi_application()
+
+from users.warmup import warm_up  # noqa: E402
+
+warm_up()
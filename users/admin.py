@@ -1,9 +1,15 @@
 """
 Django Admin Configuration for Custom User Model
 """
-from django.contrib import admin
+from django.contrib import admin, messages
+from django.contrib.admin.views.main import ORDER_VAR
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 from django.contrib.auth import get_user_model
+from django.db.models import Case, Value, When
+
+from .changelist import CountedBooleanFilter, EstimatedCountPaginator, KeysetChangeList
+from .conf import users_settings
+from .search import search_index
 
 User = get_user_model()
 
@@ -17,7 +23,8 @@ class UserAdmin(BaseUserAdmin):
     # Display configuration
     list_display = ['email', 'full_name', 'is_active', 'is_staff', 'created_at']
     list_filter = ['is_active', 'is_staff', 'is_superuser', 'created_at']
-    search_fields = ['email', 'full_name']
+    search_fields = ['email', 'full_name']  # answered by the search index
+    search_limit = 200  # best matches listed, the message says when there may be more
     ordering = ['-created_at']
     readonly_fields = ['created_at', 'updated_at', 'last_login']
     
@@ -48,8 +55,52 @@ class UserAdmin(BaseUserAdmin):
         }),
     )
     
-    # Optimize database queries
-    def get_queryset(self, request):
-        """Optimize queries with prefetch"""
-        qs = super().get_queryset(request)
-        return qs.prefetch_related('groups', 'user_permissions')
\ No newline at end of file
+    @property
+    def show_full_result_count(self):
+        """The "N total" count scans the whole table"""
+        return not users_settings.ADMIN_SCALABLE_CHANGELIST
+    
+    def get_changelist(self, request, **kwargs):
+        if users_settings.ADMIN_SCALABLE_CHANGELIST:
+            return KeysetChangeList
+        return super().get_changelist(request, **kwargs)
+    
+    def get_paginator(self, request, queryset, per_page, orphans=0, allow_empty_first_page=True):
+        if users_settings.ADMIN_SCALABLE_CHANGELIST:
+            return EstimatedCountPaginator(
+                queryset, per_page, orphans, allow_empty_first_page,
+                count_limit=users_settings.ADMIN_COUNT_LIMIT
+            )
+        return super().get_paginator(request, queryset, per_page, orphans, allow_empty_first_page)
+    
+    def get_list_filter(self, request):
+        if not users_settings.ADMIN_SCALABLE_CHANGELIST:
+            return self.list_filter
+        return [
+            (name, CountedBooleanFilter) if name in CountedBooleanFilter.facet_fields else name
+            for name in self.list_filter
+        ]
+    
+    def get_ordering(self, request):
+        # Search results are listed best first unless a column is sorted
+        ranking = getattr(request, 'search_ranking', None)
+        if ranking is not None and ORDER_VAR not in request.GET:
+            return [ranking.asc()]
+        return super().get_ordering(request)
+    
+    def get_search_results(self, request, queryset, search_term):
+        """Look the term up in the search index instead of icontains scans"""
+        if not search_term.strip():
+            return queryset, False
+        ranked = search_index.search(search_term, limit=self.search_limit)
+        user_ids = [user_id for user_id, _ in ranked]
+        if user_ids:
+            # The changelist orders after searching, get_ordering() hands it the ranks
+            request.search_ranking = Case(*[When(pk=pk, then=Value(rank)) for rank, pk in enumerate(user_ids)])
+        match = request.resolver_match
+        if len(user_ids) == self.search_limit and match and match.url_name.endswith('_changelist'):
+            messages.info(
+                request, 'Showing the %d best matches for "%s", refine the search to find others.'
+                % (self.search_limit, search_term)
+            )
+        return queryset.filter(pk__in=user_ids), False
@@ -0,0 +1,31 @@
+"""
+Async User App URL Configuration
+Same endpoints as users.urls, served by native async views (use with ASGI)
+"""
+from django.urls import path
+from .async_views import (
+    AsyncRegisterAPIView,
+    AsyncLoginAPIView,
+    AsyncLogoutAPIView,
+    AsyncProfileAPIView,
+    AsyncTokenRefreshAPIView,
+    AsyncChangePasswordAPIView,
+    AsyncUserEventsAPIView
+)
+
+app_name = 'users_async'
+
+urlpatterns = [
+    # Authentication endpoints
+    path('register/', AsyncRegisterAPIView.as_view(), name='register'),
+    path('login/', AsyncLoginAPIView.as_view(), name='login'),
+    path('logout/', AsyncLogoutAPIView.as_view(), name='logout'),
+    path('token/refresh/', AsyncTokenRefreshAPIView.as_view(), name='token_refresh'),
+    
+    # Profile endpoints
+    path('profile/', AsyncProfileAPIView.as_view(), name='profile'),
+    path('profile/change-password/', AsyncChangePasswordAPIView.as_view(), name='change_password'),
+
+    # Staff endpoints
+    path('events/', AsyncUserEventsAPIView.as_view(), name='events'),
+]
@@ -0,0 +1,502 @@
+"""
+Native Async (ASGI) User Authentication and Profile Views
+Same request and response shapes as users.views, but the database is only
+reached through Django's async ORM and password hashing never runs on the
+event loop, so a single ASGI worker can keep many requests in flight.
+"""
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.contrib.auth.password_validation import validate_password
+from django.core.exceptions import ValidationError
+from django.http import HttpResponse
+from django.utils.decorators import method_decorator
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import status
+from rest_framework.exceptions import APIException, NotAuthenticated, PermissionDenied, Throttled
+from rest_framework.settings import api_settings as drf_settings
+from rest_framework_simplejwt.exceptions import TokenError, AuthenticationFailed
+from rest_framework_simplejwt.settings import api_settings
+
+from .authentication import StatelessJWTAuthentication, acheck_token_state, claims_are_current
+from .conditional import (
+    if_match,
+    not_modified,
+    precondition_failed_payload,
+    precondition_holds,
+    profile_revision,
+    save_unless_modified,
+    set_validators
+)
+from .events import await_events, events_payload, parse_read_params
+from .exceptions import hashing_busy_payload, throttled_headers, throttled_payload
+from .hashing import HashingPoolBusy, amake_password
+from .renderers import dumps, loads
+from .serializers import (
+    RegisterSerializer,
+    LoginSerializer,
+    ProfileSerializer,
+    ProfileUpdateSerializer
+)
+from .routers import pin_primary
+from .throttling import AuthRateThrottle, blocking_throttles
+from .tokens import UserRefreshToken
+from .writebehind import arecord_login
+
+User = get_user_model()
+
+# Parsing a refresh token may look its revocation up in the database;
+# issuing one does not touch it
+parse_refresh_token = sync_to_async(UserRefreshToken)
+asave_unless_modified = sync_to_async(save_unless_modified)
+
+
+def api_response(data, status_code):
+    """JSON response encoded like DRF's JSONRenderer"""
+    return HttpResponse(dumps(data), status=status_code, content_type='application/json')
+
+
+def token_payload(user, refresh):
+    return {
+        "user": {
+            "id": user.id,
+            "email": user.email,
+            "full_name": user.full_name
+        },
+        "tokens": {
+            "access": str(refresh.access_token),
+            "refresh": str(refresh)
+        }
+    }
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class AsyncAPIView(View):
+    """
+    Minimal async counterpart of DRF's APIView: JSON bodies, stateless JWT
+    authentication and DRF-compatible error responses.
+    """
+    authentication_required = False
+    authenticator = StatelessJWTAuthentication()
+    # Rate limits (users.throttling) applied before the handler runs
+    throttle_scope = None
+
+    async def dispatch(self, request, *args, **kwargs):
+        try:
+            request.user = None
+            auth = await self.authenticator.aauthenticate(request)
+            if auth is not None:
+                request.user, request.auth = auth
+            if self.authentication_required and request.user is None:
+                raise NotAuthenticated()
+
+            request.data = self.parse_body(request)
+            if self.throttle_scope is not None:
+                if blocking_throttles():
+                    await sync_to_async(self.check_throttles)(request)
+                else:
+                    self.check_throttles(request)
+            return await super().dispatch(request, *args, **kwargs)
+
+        except HashingPoolBusy as exc:
+            response = api_response(hashing_busy_payload(exc), status.HTTP_503_SERVICE_UNAVAILABLE)
+            response['Retry-After'] = '1'
+            return response
+
+        except Throttled as exc:
+            response = api_response(throttled_payload(exc), exc.status_code)
+            for name, value in throttled_headers(exc).items():
+                response[name] = value
+            return response
+
+        except APIException as exc:
+            data = exc.detail if isinstance(exc.detail, (list, dict)) else {'detail': exc.detail}
+            response = api_response(data, exc.status_code)
+            if exc.status_code == status.HTTP_401_UNAUTHORIZED:
+                response['WWW-Authenticate'] = self.authenticator.authenticate_header(request)
+            return response
+
+    def check_throttles(self, request):
+        throttle = AuthRateThrottle()
+        if not throttle.allow_request(request, self):
+            raise Throttled(throttle.wait())
+
+    def parse_body(self, request):
+        if not request.body:
+            return {}
+        try:
+            data = loads(request.body)
+        except ValueError as exc:
+            error = APIException('JSON parse error - %s' % exc)
+            error.status_code = status.HTTP_400_BAD_REQUEST
+            raise error
+        return data if isinstance(data, dict) else {}
+
+
+class AsyncRegisterAPIView(AsyncAPIView):
+    """
+    User Registration Endpoint (async)
+    POST /users/async/register/
+    """
+    throttle_scope = 'register'
+
+    async def post(self, request):
+        """Register a new user and return JWT tokens"""
+        email = request.data.get('email')
+        email_taken = False
+        if isinstance(email, str) and email:
+            email_taken = await User.objects.filter(
+                email=User.objects.normalize_email(email)
+            ).aexists()
+
+        serializer = RegisterSerializer(data=request.data, context={'email_taken': email_taken})
+
+        if serializer.is_valid():
+            validated_data = dict(serializer.validated_data)
+            validated_data.pop('password2')
+            user = await User.objects.acreate_user(**validated_data)
+
+            refresh = UserRefreshToken.for_user(user)
+
+            return api_response({
+                "success": True,
+                "message": "User registered successfully",
+                "data": token_payload(user, refresh)
+            }, status.HTTP_201_CREATED)
+
+        return api_response({
+            "success": False,
+            "message": "Registration failed",
+            "errors": serializer.errors
+        }, status.HTTP_400_BAD_REQUEST)
+
+
+class AsyncLoginAPIView(AsyncAPIView):
+    """
+    User Login Endpoint (async)
+    POST /users/async/login/
+    """
+    throttle_scope = 'login'
+
+    async def post(self, request):
+        """Authenticate user and return JWT tokens"""
+        serializer = LoginSerializer(
+            data=request.data,
+            context={'request': request, 'defer_authentication': True}
+        )
+
+        if serializer.is_valid():
+            user = await self.authenticate(
+                User.objects.normalize_email(serializer.validated_data['email']),
+                serializer.validated_data['password']
+            )
+
+            if user is None:
+                return api_response({
+                    "success": False,
+                    "message": "Login failed",
+                    "errors": {
+                        drf_settings.NON_FIELD_ERRORS_KEY: [
+                            serializer.error_messages['invalid_credentials']
+                        ]
+                    }
+                }, status.HTTP_400_BAD_REQUEST)
+
+            await arecord_login(user)
+            refresh = UserRefreshToken.for_user(user)
+
+            return api_response({
+                "success": True,
+                "message": "Login successful",
+                "data": token_payload(user, refresh)
+            }, status.HTTP_200_OK)
+
+        return api_response({
+            "success": False,
+            "message": "Login failed",
+            "errors": serializer.errors
+        }, status.HTTP_400_BAD_REQUEST)
+
+    async def authenticate(self, email, password):
+        """Async equivalent of ModelBackend.authenticate"""
+        # Never check credentials against a lagging replica
+        pin_primary()
+        try:
+            user = await User.objects.aget(email=email)
+        except User.DoesNotExist:
+            # Run the hasher once to reduce the timing difference between
+            # an existing and a nonexistent user (as ModelBackend does)
+            await amake_password(password)
+            return None
+
+        if await user.acheck_password(password) and user.is_active:
+            return user
+        return None
+
+
+class AsyncLogoutAPIView(AsyncAPIView):
+    """
+    User Logout Endpoint (async)
+    POST /users/async/logout/
+    Requires: Authorization header with access token
+    Body: {"refresh": "refresh_token_here"}
+    """
+    authentication_required = True
+
+    async def post(self, request):
+        """Blacklist the refresh token to logout user"""
+        try:
+            refresh_token = request.data.get("refresh")
+
+            if not refresh_token:
+                return api_response({
+                    "success": False,
+                    "message": "Refresh token is required",
+                    "errors": {"refresh": ["This field is required"]}
+                }, status.HTTP_400_BAD_REQUEST)
+
+            token = await parse_refresh_token(refresh_token)
+            await sync_to_async(token.blacklist)()
+
+            return api_response({
+                "success": True,
+                "message": "Logout successful"
+            }, status.HTTP_200_OK)
+
+        except TokenError as e:
+            return api_response({
+                "success": False,
+                "message": "Invalid or expired token",
+                "errors": {"token": [str(e)]}
+            }, status.HTTP_400_BAD_REQUEST)
+
+        except Exception as e:
+            return api_response({
+                "success": False,
+                "message": "Logout failed",
+                "errors": {"detail": [str(e)]}
+            }, status.HTTP_400_BAD_REQUEST)
+
+
+class AsyncTokenRefreshAPIView(AsyncAPIView):
+    """
+    Token Refresh Endpoint (async)
+    POST /users/async/token/refresh/
+    Body: {"refresh": "refresh_token_here"}
+    """
+    throttle_scope = 'token_refresh'
+
+    async def post(self, request):
+        """Refresh access token using refresh token"""
+        try:
+            refresh_token = request.data.get("refresh")
+
+            if not refresh_token:
+                return api_response({
+                    "success": False,
+                    "message": "Refresh token is required",
+                    "errors": {"refresh": ["This field is required"]}
+                }, status.HTTP_400_BAD_REQUEST)
+
+            refresh = await parse_refresh_token(refresh_token)
+
+            # Reject revoked tokens and re-sign stale profile claims
+            try:
+                stamp = await acheck_token_state(refresh)
+            except AuthenticationFailed as e:
+                raise TokenError(e.detail['detail'])
+            if not claims_are_current(refresh, stamp):
+                refresh.set_user_claims(
+                    await User.objects.aget(pk=refresh[api_settings.USER_ID_CLAIM])
+                )
+
+            return api_response({
+                "success": True,
+                "message": "Token refreshed successfully",
+                "data": {
+                    "access": str(refresh.access_token),
+                    "refresh": str(refresh)
+                }
+            }, status.HTTP_200_OK)
+
+        except TokenError as e:
+            return api_response({
+                "success": False,
+                "message": "Invalid or expired refresh token",
+                "errors": {"token": [str(e)]}
+            }, status.HTTP_401_UNAUTHORIZED)
+
+        except Exception as e:
+            return api_response({
+                "success": False,
+                "message": "Token refresh failed",
+                "errors": {"detail": [str(e)]}
+            }, status.HTTP_400_BAD_REQUEST)
+
+
+class AsyncProfileAPIView(AsyncAPIView):
+    """
+    User Profile Endpoint (async)
+    GET /users/async/profile/ - Retrieve profile
+    PUT /users/async/profile/ - Full update
+    PATCH /users/async/profile/ - Partial update
+    Requires: Authorization header with access token
+    Conditional: GET honours If-None-Match/If-Modified-Since (304),
+    PUT/PATCH honour If-Match (412)
+    """
+    authentication_required = True
+
+    async def get(self, request):
+        """Get current user's profile (304 if the client's copy is current)"""
+        response = not_modified(request, request.user)
+        if response is not None:
+            return response
+
+        return set_validators(api_response({
+            "success": True,
+            "data": ProfileSerializer.represent(request.user)
+        }, status.HTTP_200_OK), request.user)
+
+    async def put(self, request):
+        """Update user profile (full update)"""
+        return await self.update(request, partial=False)
+
+    async def patch(self, request):
+        """Update user profile (partial update)"""
+        return await self.update(request, partial=True)
+
+    async def update(self, request, partial):
+        etags = if_match(request)
+        revision = profile_revision(request.user)
+        if not precondition_holds(etags, request.user, revision):
+            return set_validators(api_response(
+                precondition_failed_payload(), status.HTTP_412_PRECONDITION_FAILED
+            ), request.user, revision)
+
+        user = await request.user.aload()
+
+        email = request.data.get('email')
+        email_taken = False
+        if isinstance(email, str) and email:
+            email_taken = await User.objects.filter(
+                email=User.objects.normalize_email(email)
+            ).exclude(pk=user.pk).aexists()
+
+        serializer = ProfileUpdateSerializer(
+            user,
+            data=request.data,
+            partial=partial,
+            context={'email_taken': email_taken}
+        )
+
+        if serializer.is_valid():
+            for field, value in serializer.validated_data.items():
+                setattr(user, field, value)
+            if etags is None or '*' in etags:
+                await user.asave()
+            elif not await asave_unless_modified(user, revision, user.save):
+                return api_response(precondition_failed_payload(), status.HTTP_412_PRECONDITION_FAILED)
+
+            return set_validators(api_response({
+                "success": True,
+                "message": "Profile updated successfully",
+                "data": ProfileSerializer.represent(user)
+            }, status.HTTP_200_OK), user)
+
+        return api_response({
+            "success": False,
+            "message": "Profile update failed",
+            "errors": serializer.errors
+        }, status.HTTP_400_BAD_REQUEST)
+
+
+class AsyncChangePasswordAPIView(AsyncAPIView):
+    """
+    Change Password Endpoint (async)
+    POST /users/async/profile/change-password/
+    Requires: Authorization header with access token
+    """
+    authentication_required = True
+
+    async def post(self, request):
+        """Change user password"""
+        user = await request.user.aload()
+        old_password = request.data.get("old_password")
+        new_password = request.data.get("new_password")
+        new_password2 = request.data.get("new_password2")
+
+        if not all([old_password, new_password, new_password2]):
+            return api_response({
+                "success": False,
+                "message": "All fields are required",
+                "errors": {
+                    "detail": ["old_password, new_password, and new_password2 are required"]
+                }
+            }, status.HTTP_400_BAD_REQUEST)
+
+        if not await user.acheck_password(old_password):
+            return api_response({
+                "success": False,
+                "message": "Password change failed",
+                "errors": {
+                    "old_password": ["Current password is incorrect"]
+                }
+            }, status.HTTP_400_BAD_REQUEST)
+
+        if new_password != new_password2:
+            return api_response({
+                "success": False,
+                "message": "Password change failed",
+                "errors": {
+                    "new_password2": ["New passwords do not match"]
+                }
+            }, status.HTTP_400_BAD_REQUEST)
+
+        try:
+            validate_password(new_password, user)
+        except ValidationError as e:
+            return api_response({
+                "success": False,
+                "message": "Password change failed",
+                "errors": {
+                    "new_password": list(e.messages)
+                }
+            }, status.HTTP_400_BAD_REQUEST)
+
+        await user.aset_password(new_password)
+        await user.asave()
+
+        return api_response({
+            "success": True,
+            "message": "Password changed successfully"
+        }, status.HTTP_200_OK)
+
+
+class AsyncUserEventsAPIView(AsyncAPIView):
+    """
+    User Lifecycle Events Endpoint (async, staff only)
+    GET /users/async/events/?after=<position>&limit=100&wait=25
+    Long-polls without holding a thread: the preferred endpoint for waits
+    """
+    authentication_required = True
+
+    async def get(self, request):
+        """Events after a stream position"""
+        user = await request.user.aload()
+        if not user.is_staff:
+            raise PermissionDenied()
+
+        try:
+            after, limit, wait = parse_read_params(request.GET)
+        except ValidationError as e:
+            return api_response({
+                "success": False,
+                "message": "Invalid parameters",
+                "errors": {"detail": list(e.messages)}
+            }, status.HTTP_400_BAD_REQUEST)
+
+        events = await await_events(after, limit, wait)
+        return api_response({
+            "success": True,
+            "data": events_payload(events, after)
+        }, status.HTTP_200_OK)
@@ -0,0 +1,225 @@
+"""
+Stateless JWT Authentication backed by signed user claims
+"""
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.utils.functional import LazyObject, empty
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+from .cache import shared_timeout, user_cache
+from .conf import users_settings
+from .routers import aset_request_user, set_request_user
+from .tokens import TOKEN_VERSION_CLAIM, PROFILE_STAMP_CLAIM, profile_stamp, user_claims
+
+User = get_user_model()
+
+TOKEN_STATE_KEY = 'users:token_state:{}'
+
+
+def _token_state_cache():
+    return caches[users_settings.TOKEN_STATE_CACHE_ALIAS]
+
+
+def _token_state_timeout():
+    return shared_timeout(users_settings.TOKEN_STATE_CACHE_ALIAS, users_settings.TOKEN_STATE_CACHE_TIMEOUT)
+
+
+def _token_state(user):
+    return (user.token_version, user.is_active, profile_stamp(user.updated_at))
+
+
+def store_token_state(user):
+    """Publish the user's current token version, status and profile stamp"""
+    state = _token_state(user)
+    _token_state_cache().set(
+        TOKEN_STATE_KEY.format(user.pk),
+        state,
+        _token_state_timeout()
+    )
+    return state
+
+
+def clear_token_state(user_id):
+    """Forget the cached token state of a user"""
+    _token_state_cache().delete(TOKEN_STATE_KEY.format(user_id))
+
+
+def get_token_state(user_id):
+    """
+    Return (token_version, is_active, profile_stamp) for a user id,
+    reading the database only on a cache miss. Returns None if the
+    user does not exist.
+    """
+    state = _token_state_cache().get(TOKEN_STATE_KEY.format(user_id))
+    if state is not None:
+        return state
+
+    user = User.objects.filter(pk=user_id).only(
+        'token_version', 'is_active', 'updated_at'
+    ).first()
+    if user is None:
+        return None
+    return store_token_state(user)
+
+
+async def aget_token_state(user_id):
+    """Async version of get_token_state"""
+    key = TOKEN_STATE_KEY.format(user_id)
+    state = await _token_state_cache().aget(key)
+    if state is not None:
+        return state
+
+    user = await User.objects.filter(pk=user_id).only(
+        'token_version', 'is_active', 'updated_at'
+    ).afirst()
+    if user is None:
+        return None
+    state = _token_state(user)
+    await _token_state_cache().aset(key, state, _token_state_timeout())
+    return state
+
+
+def _token_user_id(token):
+    try:
+        return token[api_settings.USER_ID_CLAIM]
+    except KeyError:
+        raise InvalidToken('Token contained no recognizable user identification')
+
+
+def check_token_state(token):
+    """
+    Validate a token against the user's current token state and return the
+    stamp of the current profile revision.
+    Raises AuthenticationFailed if the token has been revoked.
+    """
+    return _validate_token_state(token, get_token_state(_token_user_id(token)))
+
+
+async def acheck_token_state(token):
+    """Async version of check_token_state"""
+    state = await aget_token_state(_token_user_id(token))
+    return _validate_token_state(token, state)
+
+
+def _validate_token_state(token, state):
+    if state is None:
+        raise AuthenticationFailed('User not found', code='user_not_found')
+
+    token_version, is_active, stamp = state
+    if not is_active:
+        raise AuthenticationFailed('User is inactive', code='user_inactive')
+
+    # Tokens issued before claims were embedded carry no version: they are
+    # accepted, but every attribute is read from the database.
+    if TOKEN_VERSION_CLAIM in token and token[TOKEN_VERSION_CLAIM] != token_version:
+        raise AuthenticationFailed('Token has been revoked', code='token_revoked')
+
+    return stamp
+
+
+def claims_are_current(token, stamp):
+    """Whether the profile claims of a token match the given revision"""
+    return TOKEN_VERSION_CLAIM in token and token.get(PROFILE_STAMP_CLAIM) == stamp
+
+
+class LazyUser(LazyObject):
+    """
+    User proxy built from token claims. Claimed fields are served from the
+    token; any other attribute (or any write) loads the real user once.
+    """
+
+    def __init__(self, user_id, claims=None, revision=None):
+        self.__dict__['_user_id'] = User._meta.pk.to_python(user_id)
+        self.__dict__['_claims'] = claims or {}
+        self.__dict__['_revision'] = revision
+        super().__init__()
+
+    is_authenticated = True
+    is_anonymous = False
+
+    # Answer truthiness and isinstance() checks (done by permission classes
+    # and serializers) without loading
+    __class__ = property(lambda self: User)
+
+    def __bool__(self):
+        return True
+
+    def _setup(self):
+        try:
+            self._wrapped = user_cache.get(self._user_id, revision=self._revision)
+        except User.DoesNotExist:
+            raise AuthenticationFailed('User not found', code='user_not_found')
+
+    def __getattr__(self, name):
+        if self._wrapped is empty:
+            if name in ('id', 'pk'):
+                return self._user_id
+            if name in self._claims:
+                return self._claims[name]
+        return super().__getattr__(name)
+
+    @property
+    def revision(self):
+        """Stamp of the current profile revision, known without loading"""
+        if self._revision is None or self._wrapped is not empty:
+            return profile_stamp(self.updated_at)
+        return self._revision
+
+    @property
+    def is_loaded(self):
+        """Whether the database row has been fetched"""
+        return self._wrapped is not empty
+
+    async def aload(self):
+        """Fetch the real user without blocking the event loop"""
+        if self._wrapped is empty:
+            try:
+                self._wrapped = await user_cache.aget(self._user_id, revision=self._revision)
+            except User.DoesNotExist:
+                raise AuthenticationFailed('User not found', code='user_not_found')
+        return self._wrapped
+
+
+class StatelessJWTAuthentication(JWTAuthentication):
+    """
+    JWT authentication that builds the user from signed claims instead of
+    fetching the row on every request. Tokens are revoked by bumping the
+    user's token_version (password change, activation change).
+    """
+
+    def get_user(self, validated_token):
+        """Return a lazy user backed by the validated token"""
+        # Users who just wrote read from the primary until replicas catch up
+        set_request_user(_token_user_id(validated_token))
+        stamp = check_token_state(validated_token)
+
+        return self._build_user(validated_token, stamp)
+
+    async def aauthenticate(self, request):
+        """
+        Async version of authenticate() for plain Django async views.
+        The returned user never needs a synchronous database query.
+        """
+        header = self.get_header(request)
+        if header is None:
+            return None
+
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+
+        validated_token = self.get_validated_token(raw_token)
+        await aset_request_user(_token_user_id(validated_token))
+        stamp = await acheck_token_state(validated_token)
+        user = self._build_user(validated_token, stamp)
+        if not user._claims:
+            await user.aload()
+        return user, validated_token
+
+    def _build_user(self, validated_token, stamp):
+        claims = {}
+        if claims_are_current(validated_token, stamp):
+            claims = user_claims(validated_token)
+        return LazyUser(validated_token[api_settings.USER_ID_CLAIM], claims, stamp)
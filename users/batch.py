@@ -0,0 +1,224 @@
+"""
+Batched Sub-requests
+BatchAPIView (/users/batch/) runs several users app requests in one round
+trip. Each sub-request is dispatched in-process to its view in users.urls
+(no middleware, no HTTP parsing) with the batch's authentication result,
+so the access token is decoded and checked once per batch.
+Consecutive safe (GET/HEAD) sub-requests run concurrently on a thread
+pool; every other sub-request runs alone, in order, after the ones before
+it, so a read listed after a write sees it.
+"""
+import contextvars
+import io
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.handlers.wsgi import WSGIRequest
+from django.core.signals import setting_changed
+from django.db import close_old_connections
+from django.urls import Resolver404, resolve
+
+from .conf import users_settings
+from .renderers import dumps, loads
+
+logger = logging.getLogger(__name__)
+
+METHODS = ('GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE')
+SAFE_METHODS = ('GET', 'HEAD')
+# Sub-response headers a client may act on
+RESPONSE_HEADERS = ('ETag', 'Last-Modified', 'Location', 'Retry-After', 'WWW-Authenticate')
+# Request attributes a sub-request must not inherit
+RESET_META = ('CONTENT_LENGTH', 'CONTENT_TYPE', 'PATH_INFO', 'QUERY_STRING', 'REQUEST_METHOD')
+
+
+class SubRequest:
+    """One validated item of a batch"""
+    __slots__ = ('method', 'path', 'query_string', 'body', 'headers', 'match')
+
+    def __init__(self, method, path, query_string, body, headers, match):
+        self.method = method
+        self.path = path
+        self.query_string = query_string
+        self.body = body
+        self.headers = headers
+        self.match = match
+
+    @property
+    def is_safe(self):
+        return self.method in SAFE_METHODS
+
+
+def parse_sub_request(item):
+    """
+    Validate one {"method", "path", "body", "headers"} item; returns a
+    SubRequest, raises ValueError with a message for the client
+    """
+    if not isinstance(item, dict):
+        raise ValueError('must be an object with method and path')
+
+    method = item.get('method', 'GET')
+    if not isinstance(method, str) or method.upper() not in METHODS:
+        raise ValueError('method must be one of %s' % ', '.join(METHODS))
+
+    path = item.get('path')
+    if not isinstance(path, str) or not path.startswith('/'):
+        raise ValueError('path must be an absolute path, e.g. /users/profile/')
+    path, _, query_string = path.partition('?')
+    try:
+        match = resolve(path)
+    except Resolver404:
+        raise ValueError('%s is not a users endpoint' % path)
+    view_class = getattr(match.func, 'view_class', None)
+    if match.namespace != 'users' or not getattr(view_class, 'batchable', True):
+        raise ValueError('%s cannot be batched' % path)
+
+    body = item.get('body')
+    if body is not None and not isinstance(body, (dict, list)):
+        raise ValueError('body must be a JSON object or array')
+
+    headers = item.get('headers') or {}
+    if not isinstance(headers, dict) or not all(
+        isinstance(name, str) and isinstance(value, str) for name, value in headers.items()
+    ):
+        raise ValueError('headers must be an object of strings')
+
+    return SubRequest(method.upper(), path, query_string, body, headers, match)
+
+
+def build_request(request, sub):
+    """A WSGIRequest for the sub-request, carrying the batch's client address and headers"""
+    payload = dumps(sub.body) if sub.body is not None else b''
+    environ = {
+        key: value for key, value in request.META.items()
+        if key not in RESET_META and not key.startswith('wsgi.')
+    }
+    for name, value in sub.headers.items():
+        # The batch's authentication applies to every sub-request
+        if name.lower() != 'authorization':
+            environ['HTTP_' + name.upper().replace('-', '_')] = value
+    environ.update({
+        'REQUEST_METHOD': sub.method,
+        'PATH_INFO': sub.path,
+        'QUERY_STRING': sub.query_string,
+        'CONTENT_TYPE': 'application/json',
+        'CONTENT_LENGTH': str(len(payload)),
+        'wsgi.input': io.BytesIO(payload),
+        'wsgi.url_scheme': request.scheme,
+    })
+    sub_request = WSGIRequest(environ)
+    sub_request.resolver_match = sub.match
+    if request.user.is_authenticated:
+        # DRF's hook for a known user (what APIRequestFactory's
+        # force_authenticate sets); anonymous sub-requests authenticate
+        # as usual, so protected views still answer 401
+        sub_request._force_auth_user = request.user
+        sub_request._force_auth_token = request.auth
+    return sub_request
+
+
+def dispatch(request, sub):
+    """Run one sub-request through its view; returns its result item"""
+    try:
+        response = sub.match.func(build_request(request, sub), *sub.match.args, **sub.match.kwargs)
+        if hasattr(response, 'render') and not response.is_rendered:
+            response.render()
+    except Exception:
+        logger.exception('Batched %s %s failed', sub.method, sub.path)
+        return {
+            "status": 500,
+            "headers": {},
+            "body": {"success": False, "message": "Internal server error"}
+        }
+
+    content = response.content
+    if not content:
+        body = None
+    elif response.get('Content-Type', '').startswith('application/json'):
+        body = loads(content)
+    else:
+        body = content.decode(response.charset)
+    return {
+        "status": response.status_code,
+        "headers": {name: response[name] for name in RESPONSE_HEADERS if response.has_header(name)},
+        "body": body,
+    }
+
+
+class BatchExecutor:
+    """Threads running the concurrent sub-requests, per process"""
+
+    def __init__(self):
+        self._executor = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def _ensure_started(self):
+        if self._executor is not None and self._pid == os.getpid():
+            return self._executor
+        with self._lock:
+            if self._executor is None or self._pid != os.getpid():
+                self._executor = ThreadPoolExecutor(
+                    max_workers=users_settings.BATCH_WORKERS,
+                    thread_name_prefix='users-batch'
+                )
+                self._pid = os.getpid()
+        return self._executor
+
+    @staticmethod
+    def _call(context, request, sub):
+        # Pool threads keep their connection between batches: honour
+        # CONN_MAX_AGE and health checks like the request cycle does
+        close_old_connections()
+        return context.run(dispatch, request, sub)
+
+    def map(self, request, subs):
+        """Dispatch the sub-requests concurrently; results in order"""
+        executor = self._ensure_started()
+        # Each sub-request sees the batch's context (replica pinning, metrics)
+        futures = [
+            executor.submit(self._call, contextvars.copy_context(), request, sub)
+            for sub in subs
+        ]
+        return [future.result() for future in futures]
+
+    def shutdown(self, wait=True):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=wait)
+            self._executor = None
+            self._pid = None
+
+
+batch_executor = BatchExecutor()
+
+
+def reset_batch_executor(*args, **kwargs):
+    if kwargs['setting'] == 'USERS':
+        batch_executor.shutdown(wait=False)
+
+
+setting_changed.connect(reset_batch_executor)
+
+
+def run_batch(request, subs):
+    """Results of the sub-requests, in order"""
+    results = []
+    pending = []
+
+    def flush():
+        if len(pending) > 1 and users_settings.BATCH_WORKERS > 1:
+            results.extend(batch_executor.map(request, pending))
+        else:
+            results.extend(dispatch(request, sub) for sub in pending)
+        pending.clear()
+
+    for sub in subs:
+        if sub.is_safe:
+            pending.append(sub)
+            continue
+        flush()
+        results.append(dispatch(request, sub))
+    flush()
+    return results
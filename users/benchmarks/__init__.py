@@ -0,0 +1,21 @@
+"""
+Users App Benchmarks
+Run with: python manage.py benchmark <name> [options]
+"""
+
+# Benchmark name -> module exposing add_arguments(parser) and run(stdout, **options)
+BENCHMARKS = {
+    'hashing': 'users.benchmarks.hashing',
+    'asgi': 'users.benchmarks.asgi',
+    'revocation': 'users.benchmarks.revocation',
+    'sqlite': 'users.benchmarks.sqlite',
+    'instrumentation': 'users.benchmarks.instrumentation',
+    'suite': 'users.benchmarks.suite',
+    'rendering': 'users.benchmarks.rendering',
+    'throttling': 'users.benchmarks.throttling',
+    'admin': 'users.benchmarks.admin',
+    'tokens': 'users.benchmarks.tokens',
+    'startup': 'users.benchmarks.startup',
+    'middleware': 'users.benchmarks.middleware',
+    'events': 'users.benchmarks.events',
+}
@@ -0,0 +1,143 @@
+"""
+Admin Changelist at Scale
+Render time of UserAdmin's changelist over a large users table, and the
+part of it spent in queries, with the stock ChangeList and paginator
+against USERS['ADMIN_SCALABLE_CHANGELIST'] (users.changelist): the first
+page, a deep page by number and by keyset cursor, filtered lists and a
+date range.
+"""
+import time
+from datetime import timedelta
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.core.wsgi import get_wsgi_application
+from django.db import connection
+from django.test import Client, override_settings
+from django.utils import timezone
+
+from ..changelist import CURSOR_VAR, encode_cursor
+from .base import benchmark_database, summarize, wsgi_request, write_table
+
+User = get_user_model()
+
+MODES = ('stock', 'scalable')
+CHANGELIST_URL = '/admin/users/user/'
+
+
+def add_arguments(parser):
+    parser.add_argument('--users', type=int, default=1000000, help='Users to seed')
+    parser.add_argument('--requests', type=int, default=5, help='Renders per page and mode')
+    parser.add_argument('--mode', choices=MODES, action='append',
+                        help='Changelist to measure (repeatable, default: all)')
+
+
+def seed_users(stdout, total, batch_size=50000):
+    """
+    Insert `total` users one second apart (newest last) with plain
+    INSERTs: model saves and bulk_create would take longer than the
+    measurements
+    """
+    table = connection.ops.quote_name(User._meta.db_table)
+    columns = ('password', 'is_superuser', 'email', 'full_name', 'is_active',
+               'is_staff', 'token_version', 'created_at', 'updated_at')
+    sql = 'INSERT INTO %s (%s) VALUES (%s)' % (
+        table,
+        ', '.join(connection.ops.quote_name(column) for column in columns),
+        ', '.join(['%s'] * len(columns))
+    )
+    encoded = make_password('BenchPass!2024')
+    start_at = timezone.now() - timedelta(seconds=total)
+    start = time.perf_counter()
+    with connection.cursor() as cursor:
+        for offset in range(0, total, batch_size):
+            rows = []
+            for i in range(offset, min(offset + batch_size, total)):
+                created_at = connection.ops.adapt_datetimefield_value(start_at + timedelta(seconds=i))
+                rows.append((
+                    encoded, False, f'user{i}@bench{i % 100}.example.com', f'Bench User {i}',
+                    i % 50 != 0, i % 1000 == 0, 0, created_at, created_at
+                ))
+            cursor.executemany(sql, rows)
+            done = offset + len(rows)
+            stdout.write('Seeded %d/%d users (%.0f rows/s)' % (done, total, done / (time.perf_counter() - start)))
+    return start_at
+
+
+def build_pages(total, per_page, start_at):
+    """(name, query string) of the pages to render"""
+    deep_page = max(1, total // per_page // 2)
+    deep_row = User.objects.order_by('-created_at', '-pk').only('created_at')[(deep_page - 1) * per_page - 1]
+    week_ago = (start_at + timedelta(seconds=total) - timedelta(days=7)).replace(microsecond=0)
+    return [
+        ('first page', ''),
+        ('page %d' % deep_page, '?p=%d' % deep_page),
+        ('page %d (keyset)' % deep_page, '?%s=%s' % (CURSOR_VAR, encode_cursor(deep_row))),
+        ('is_staff=yes', '?is_staff__exact=1'),
+        ('is_active=no p2', '?is_active__exact=0&p=2'),
+        ('last 7 days', '?' + urlencode({'created_at__gte': week_ago.isoformat()})),
+    ]
+
+
+def time_queries(fn):
+    """fn()'s result, the number of queries it ran and their total seconds"""
+    durations = []
+
+    def timer(execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            durations.append(time.perf_counter() - start)
+
+    with connection.execute_wrapper(timer):
+        result = fn()
+    return result, len(durations), sum(durations)
+
+
+def run(stdout, users, requests, mode, **options):
+    rows = []
+    base_settings = getattr(settings, 'USERS', {})
+    with benchmark_database():
+        start_at = seed_users(stdout, users)
+        admin_user = User.objects.create_superuser('admin@example.com', 'BenchPass!2024', full_name='Admin')
+        client = Client()
+        client.force_login(admin_user)
+        # The test client would copy every template context it renders
+        application = get_wsgi_application()
+        headers = {'Cookie': '%s=%s' % (settings.SESSION_COOKIE_NAME, client.session.session_key)}
+        pages = build_pages(users, 100, start_at)
+
+        for name in mode or MODES:
+            users_settings = {**base_settings, 'ADMIN_SCALABLE_CHANGELIST': name == 'scalable'}
+            with override_settings(USERS=users_settings):
+                cache.clear()
+                for page, query_string in pages:
+                    if CURSOR_VAR in query_string and name == 'stock':
+                        continue
+                    url = CHANGELIST_URL + query_string
+                    # Warms up caches (facet counts); also times the queries
+                    (status, _), queries, db_seconds = time_queries(
+                        lambda: wsgi_request(application, 'GET', url, headers=headers)
+                    )
+                    latencies = []
+                    start = time.perf_counter()
+                    for _ in range(requests):
+                        request_start = time.perf_counter()
+                        wsgi_request(application, 'GET', url, headers=headers)
+                        latencies.append(time.perf_counter() - request_start)
+                    result = summarize(latencies, time.perf_counter() - start)
+                    rows.append({
+                        'mode': name,
+                        'page': page,
+                        'status': status,
+                        'queries': queries,
+                        'db_ms': round(db_seconds * 1000, 3),
+                        **result,
+                    })
+
+    write_table(stdout, rows, ['mode', 'page', 'status', 'queries', 'db_ms', 'p50_ms', 'p99_ms'])
+    return rows
@@ -0,0 +1,141 @@
+"""
+In-flight Capacity of One ASGI Worker vs One WSGI Worker
+Fires concurrent login (or profile) requests at the async views through the
+ASGI application and at the sync views through a single-threaded WSGI
+application, and reports throughput, latency and peak in-flight requests.
+"""
+import asyncio
+import json
+import threading
+import time
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.asgi import get_asgi_application
+from django.core.wsgi import get_wsgi_application
+
+from ..hashing import hashing_pool
+from ..tokens import UserRefreshToken
+from .base import (
+    benchmark_database, run_concurrently, summarize, write_table,
+    asgi_request, wsgi_request
+)
+
+User = get_user_model()
+
+PASSWORD = 'BenchPass!2024'
+
+
+def add_arguments(parser):
+    parser.add_argument('--endpoint', choices=['login', 'profile'], default='login')
+    parser.add_argument('--requests', type=int, default=100, help='Requests per server')
+    parser.add_argument('--concurrency', type=int, default=32, help='Concurrent clients')
+    parser.add_argument('--users', type=int, default=50, help='Seeded accounts')
+
+
+class InFlight:
+    """Counts requests currently inside the application"""
+
+    def __init__(self):
+        self.current = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        with self._lock:
+            self.current += 1
+            self.peak = max(self.peak, self.current)
+
+    def __exit__(self, *exc_info):
+        with self._lock:
+            self.current -= 1
+
+
+def build_requests(endpoint, users):
+    """Return a function i -> (method, path suffix, body, headers)"""
+    if endpoint == 'login':
+        def make(i):
+            body = json.dumps({'email': f'bench{i % users}@example.com', 'password': PASSWORD})
+            return 'POST', 'login/', body.encode(), {}
+        return make
+
+    tokens = [
+        str(UserRefreshToken.for_user(user).access_token)
+        for user in User.objects.order_by('pk')[:users]
+    ]
+
+    def make(i):
+        return 'GET', 'profile/', b'', {'Authorization': 'Bearer ' + tokens[i % users]}
+    return make
+
+
+def run_wsgi(make_request, requests, concurrency):
+    """One sync worker: the application handles a single request at a time"""
+    application = get_wsgi_application()
+    worker = threading.Lock()
+    in_flight = InFlight()
+
+    def call(i):
+        method, path, body, headers = make_request(i)
+        with worker, in_flight:
+            status_code, _ = wsgi_request(application, method, '/users/' + path, body, headers)
+        return status_code < 400
+
+    result = run_concurrently(call, requests, concurrency)
+    return {**result, 'peak_in_flight': in_flight.peak}
+
+
+def run_asgi(make_request, requests, concurrency):
+    """One event loop serving every client concurrently"""
+    application = get_asgi_application()
+    in_flight = InFlight()
+    latencies = []
+    errors = [0]
+
+    async def client(indexes):
+        for i in indexes:
+            method, path, body, headers = make_request(i)
+            start = time.perf_counter()
+            with in_flight:
+                status_code, _ = await asgi_request(
+                    application, method, '/users/async/' + path, body, headers
+                )
+            if status_code < 400:
+                latencies.append(time.perf_counter() - start)
+            else:
+                errors[0] += 1
+
+    async def main():
+        await asyncio.gather(*(
+            client(range(n, requests, concurrency)) for n in range(concurrency)
+        ))
+
+    start = time.perf_counter()
+    asyncio.run(main())
+    result = summarize(latencies, time.perf_counter() - start, errors[0])
+    return {**result, 'peak_in_flight': in_flight.peak}
+
+
+def run(stdout, endpoint, requests, concurrency, users, **options):
+    with benchmark_database():
+        encoded = make_password(PASSWORD)
+        User.objects.bulk_create(
+            User(email=f'bench{i}@example.com', full_name=f'Bench {i}', password=encoded)
+            for i in range(users)
+        )
+        make_request = build_requests(endpoint, users)
+
+        if hashing_pool.enabled:
+            hashing_pool.run(make_password, PASSWORD)
+
+        rows = [
+            {'server': 'wsgi (1 worker)', **run_wsgi(make_request, requests, concurrency)},
+            {'server': 'asgi (1 worker)', **run_asgi(make_request, requests, concurrency)},
+        ]
+        hashing_pool.shutdown()
+
+    write_table(stdout, rows, [
+        'server', 'requests', 'errors', 'peak_in_flight', 'throughput_rps',
+        'p50_ms', 'p95_ms', 'p99_ms'
+    ])
+    return rows
@@ -0,0 +1,201 @@
+"""
+Shared Benchmark Helpers
+"""
+import os
+import shutil
+import statistics
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+from django.db import connections
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from ..writebehind import last_login_buffer
+
+
+@contextmanager
+def benchmark_database(alias='default'):
+    """
+    Create a throwaway file-backed copy of the schema and point the
+    connection at it for the duration of the block.
+    """
+    connection = connections[alias]
+    tmp_dir = tempfile.mkdtemp(prefix='users-bench-')
+    connection.settings_dict.setdefault('TEST', {})['NAME'] = os.path.join(
+        tmp_dir, 'bench.sqlite3'
+    )
+
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(
+        verbosity=0, autoclobber=True, serialize=False
+    )
+    try:
+        yield connection
+    finally:
+        # Buffered last_login writes belong to the throwaway database
+        last_login_buffer.flush()
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def summarize(latencies, elapsed, errors=0):
+    """Throughput and latency percentiles (milliseconds) of a run"""
+    latencies = sorted(latencies)
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'elapsed_s': round(elapsed, 4),
+        'throughput_rps': round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        'mean_ms': round(statistics.fmean(latencies) * 1000, 3) if latencies else 0.0,
+        'p50_ms': round(percentile(latencies, 0.50) * 1000, 3),
+        'p95_ms': round(percentile(latencies, 0.95) * 1000, 3),
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 3),
+    }
+
+
+def run_concurrently(fn, total, concurrency):
+    """
+    Call fn(i) `total` times from `concurrency` threads.
+    fn returns True on success. Returns the summary of the run.
+    """
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+    counter = iter(range(total))
+
+    def worker():
+        try:
+            while True:
+                with lock:
+                    i = next(counter, None)
+                if i is None:
+                    return
+                start = time.perf_counter()
+                ok = fn(i)
+                duration = time.perf_counter() - start
+                with lock:
+                    if ok:
+                        latencies.append(duration)
+                    else:
+                        errors[0] += 1
+        finally:
+            connections.close_all()
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    return summarize(latencies, elapsed, errors[0])
+
+
+def time_per_call(fn, number=1000, repeat=5):
+    """Best-of-`repeat` mean seconds per call of fn()"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        best = min(best, (time.perf_counter() - start) / number)
+    return best
+
+
+def write_table(stdout, rows, columns):
+    """Print a list of dicts as an aligned text table"""
+    widths = {
+        column: max(len(column), *(len(str(row.get(column, ''))) for row in rows))
+        for column in columns
+    }
+    stdout.write('  '.join(column.ljust(widths[column]) for column in columns))
+    for row in rows:
+        stdout.write('  '.join(str(row.get(column, '')).ljust(widths[column]) for column in columns))
+
+
+def wsgi_request(application, method, path, body=b'', headers=None):
+    """Call a WSGI application in-process; returns (status_code, body)"""
+    from io import BytesIO
+    from wsgiref.util import setup_testing_defaults
+
+    path, _, query_string = path.partition('?')
+    environ = {
+        'REQUEST_METHOD': method,
+        'PATH_INFO': path,
+        'QUERY_STRING': query_string,
+        'CONTENT_TYPE': 'application/json',
+        'CONTENT_LENGTH': str(len(body)),
+        'wsgi.input': BytesIO(body),
+        'SERVER_NAME': 'testserver',
+        'HTTP_HOST': 'testserver',
+    }
+    for name, value in (headers or {}).items():
+        environ['HTTP_' + name.upper().replace('-', '_')] = value
+    setup_testing_defaults(environ)
+
+    status_holder = []
+
+    def start_response(status, response_headers, exc_info=None):
+        status_holder.append(int(status.split(' ', 1)[0]))
+
+    chunks = application(environ, start_response)
+    try:
+        content = b''.join(chunks)
+    finally:
+        if hasattr(chunks, 'close'):
+            chunks.close()
+    return status_holder[0], content
+
+
+async def asgi_request(application, method, path, body=b'', headers=None):
+    """Call an ASGI application in-process; returns (status_code, body)"""
+    raw_headers = [
+        (b'host', b'testserver'),
+        (b'content-type', b'application/json'),
+        (b'content-length', str(len(body)).encode()),
+    ]
+    for name, value in (headers or {}).items():
+        raw_headers.append((name.lower().encode(), value.encode()))
+
+    scope = {
+        'type': 'http',
+        'asgi': {'version': '3.0'},
+        'http_version': '1.1',
+        'method': method,
+        'scheme': 'http',
+        'path': path,
+        'raw_path': path.encode(),
+        'query_string': b'',
+        'root_path': '',
+        'headers': raw_headers,
+        'client': ('127.0.0.1', 0),
+        'server': ('testserver', 80),
+    }
+    messages = [{'type': 'http.request', 'body': body, 'more_body': False}]
+    response = {'status': None, 'body': []}
+
+    async def receive():
+        if messages:
+            return messages.pop(0)
+        return {'type': 'http.disconnect'}
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            response['status'] = message['status']
+        elif message['type'] == 'http.response.body':
+            response['body'].append(message.get('body', b''))
+
+    await application(scope, receive, send)
+    return response['status'], b''.join(response['body'])
@@ -0,0 +1,102 @@
+"""
+Change Feed Reads
+What a downstream service pays to learn what changed, over a large users
+table and as many published events:
+- poll: users updated after a timestamp (no index on updated_at, so every
+  poll scans the table), with changes to return and with none
+- events: users.events.read_events() after a stream position, both ways
+Plus the cost of writing the outbox row with a profile save
+(USERS['EVENTS_ENABLED'] off and on) and the dispatcher's throughput.
+"""
+import itertools
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.test import override_settings
+
+from ..events import dispatch_batch, last_position, read_events
+from ..models import UserEvent
+from .admin import seed_users
+from .base import benchmark_database, time_per_call, write_table
+
+User = get_user_model()
+
+
+def add_arguments(parser):
+    parser.add_argument('--users', type=int, default=100000, help='Users (and published events) to seed')
+    parser.add_argument('--changes', type=int, default=100, help='Changes a poll returns')
+    parser.add_argument('--number', type=int, default=20, help='Calls per measurement')
+    parser.add_argument('--repeat', type=int, default=3, help='Measurements, the best is kept')
+    parser.add_argument('--dispatch', type=int, default=20000, help='Pending events to dispatch')
+
+
+def seed_events(total, batch_size=5000):
+    """`total` published events, positions 1 to total"""
+    payload = {'full_name': 'Bench User'}
+    for start in range(0, total, batch_size):
+        UserEvent.objects.bulk_create([
+            UserEvent(kind=UserEvent.UPDATED, user_id=position, payload=payload, position=position)
+            for position in range(start + 1, min(start + batch_size, total) + 1)
+        ])
+
+
+def run(stdout, users, changes, number, repeat, dispatch, **options):
+    rows = []
+    base_settings = getattr(settings, 'USERS', {})
+    with benchmark_database():
+        seed_users(stdout, users)
+        seed_events(users)
+        newest = list(User.objects.order_by('-updated_at').values_list('updated_at', flat=True)[:changes + 1])
+        latest = last_position()
+
+        def poll(since):
+            return list(
+                User.objects.filter(updated_at__gt=since).order_by('updated_at', 'pk')
+                .values_list('pk', 'updated_at')[:changes]
+            )
+
+        cases = [
+            ('poll updated_at', 'changes', lambda: poll(newest[-1])),
+            ('poll updated_at', 'idle', lambda: poll(newest[0])),
+            ('read events', 'changes', lambda: read_events(latest - changes, changes)),
+            ('read events', 'idle', lambda: read_events(latest, changes)),
+        ]
+        for name, state, call in cases:
+            returned = len(call())
+            seconds = time_per_call(call, number, repeat)
+            rows.append({'case': name, 'state': state, 'rows': returned, 'ms_per_call': round(seconds * 1000, 3)})
+
+        # Outbox writes: one profile save, without and with its event
+        user = User.objects.create_user('bench@example.com', 'BenchPass!2024', full_name='Bench User')
+        names = itertools.count()
+        for enabled in (False, True):
+            with override_settings(USERS={**base_settings, 'EVENTS_ENABLED': enabled}):
+                def save():
+                    user.full_name = 'Bench User %d' % next(names)
+                    user.save()
+                seconds = time_per_call(save, number * 10, repeat)
+            rows.append({
+                'case': 'profile save', 'state': 'events %s' % ('on' if enabled else 'off'),
+                'rows': 1, 'ms_per_call': round(seconds * 1000, 3)
+            })
+
+        UserEvent.objects.bulk_create(
+            [UserEvent(kind=UserEvent.UPDATED, user_id=user.pk) for _ in range(dispatch)],
+            batch_size=5000
+        )
+        start = time.perf_counter()
+        dispatched = 0
+        while True:
+            batch = len(dispatch_batch())
+            if not batch:
+                break
+            dispatched += batch
+        elapsed = time.perf_counter() - start
+        rows.append({
+            'case': 'dispatch', 'state': '%d/s' % (dispatched / elapsed),
+            'rows': dispatched, 'ms_per_call': round(elapsed * 1000, 3)
+        })
+
+    write_table(stdout, rows, ['case', 'state', 'rows', 'ms_per_call'])
+    return rows
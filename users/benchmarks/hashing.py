@@ -0,0 +1,62 @@
+"""
+Login Throughput With and Without the Hashing Pool
+Drives LoginAPIView from concurrent threads (like gunicorn threads) and
+reports logins per second for inline hashing and for the process pool.
+"""
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.test import Client, override_settings
+from django.conf import settings
+
+from ..hashing import hashing_pool
+from .base import benchmark_database, run_concurrently, write_table
+
+User = get_user_model()
+
+PASSWORD = 'BenchPass!2024'
+
+
+def add_arguments(parser):
+    parser.add_argument('--requests', type=int, default=200, help='Logins per mode')
+    parser.add_argument('--concurrency', type=int, default=8, help='Client threads')
+    parser.add_argument('--users', type=int, default=50, help='Seeded accounts')
+    parser.add_argument('--workers', type=int, default=None, help='Pool processes')
+    parser.add_argument('--queue-limit', type=int, default=64, help='Pool queue limit')
+
+
+def run(stdout, requests, concurrency, users, workers, queue_limit, **options):
+    with benchmark_database():
+        encoded = make_password(PASSWORD)
+        User.objects.bulk_create(
+            User(email=f'bench{i}@example.com', full_name=f'Bench {i}', password=encoded)
+            for i in range(users)
+        )
+
+        def login(i):
+            response = Client().post(
+                '/users/login/',
+                {'email': f'bench{i % users}@example.com', 'password': PASSWORD},
+                content_type='application/json'
+            )
+            return response.status_code == 200
+
+        rows = []
+        for mode, enabled in (('inline', False), ('pool', True)):
+            users_settings = {
+                **getattr(settings, 'USERS', {}),
+                'HASHING_POOL_ENABLED': enabled,
+                'HASHING_POOL_WORKERS': workers,
+                'HASHING_POOL_QUEUE_LIMIT': queue_limit,
+            }
+            with override_settings(USERS=users_settings):
+                if enabled:
+                    # Start (and warm) the pool outside of the measurement
+                    hashing_pool.run(make_password, PASSWORD)
+                result = run_concurrently(login, requests, concurrency)
+                hashing_pool.shutdown()
+            rows.append({'mode': mode, **result})
+
+    write_table(stdout, rows, [
+        'mode', 'requests', 'errors', 'throughput_rps', 'p50_ms', 'p95_ms', 'p99_ms'
+    ])
+    return rows
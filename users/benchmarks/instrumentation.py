@@ -0,0 +1,94 @@
+"""
+Overhead of the Request Instrumentation Middleware
+Sends the same requests through two WSGI handlers, one built with
+USERS['METRICS_ENABLED'] off and one with it on, interleaving them request
+by request so both see the same conditions, and reports the added time
+per request.
+"""
+import json
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.handlers.wsgi import WSGIHandler
+from django.db import connection
+from django.test import override_settings
+
+from ..instrumentation import metrics
+from ..tokens import UserRefreshToken
+from .base import benchmark_database, summarize, write_table, wsgi_request
+
+User = get_user_model()
+
+ENDPOINTS = ('profile', 'list', 'refresh')
+MODES = ('off', 'on')
+
+
+def add_arguments(parser):
+    parser.add_argument(
+        '--endpoint', choices=ENDPOINTS, action='append',
+        help='Endpoint to measure (repeatable, default: all)'
+    )
+    parser.add_argument('--requests', type=int, default=2000, help='Requests per endpoint and mode')
+
+
+def build_requests(user):
+    refresh = UserRefreshToken.for_user(user)
+    auth = {'Authorization': 'Bearer %s' % refresh.access_token}
+    return {
+        'profile': ('GET', '/users/profile/', b'', auth),
+        'list': ('GET', '/users/?fields=id,email', b'', auth),
+        'refresh': ('POST', '/users/token/refresh/', json.dumps({'refresh': str(refresh)}).encode(), {}),
+    }
+
+
+def run(stdout, endpoint, requests, **options):
+    rows = []
+    users_settings = {**getattr(settings, 'USERS', {}), 'REVOCATION_PRUNE_INTERVAL': None}
+    with benchmark_database():
+        user = User.objects.create_user(
+            'bench@example.com', 'BenchPass!2024', full_name='Bench', is_staff=True
+        )
+        calls = build_requests(user)
+
+        # The middleware is (or is not) loaded when the handler is built
+        handlers = {}
+        for mode in MODES:
+            with override_settings(USERS={**users_settings, 'METRICS_ENABLED': mode == 'on'}):
+                handlers[mode] = WSGIHandler()
+
+        with override_settings(USERS={**users_settings, 'METRICS_ENABLED': True}):
+            connection.close()  # reconnect with the query timer installed
+            for name in endpoint or ENDPOINTS:
+                method, path, body, headers = calls[name]
+                latencies = {mode: [] for mode in MODES}
+                elapsed = {mode: 0.0 for mode in MODES}
+                for mode in MODES:
+                    assert wsgi_request(handlers[mode], method, path, body, headers)[0] == 200
+
+                for i in range(requests):
+                    for mode in (MODES if i % 2 else MODES[::-1]):
+                        start = time.perf_counter()
+                        wsgi_request(handlers[mode], method, path, body, headers)
+                        duration = time.perf_counter() - start
+                        latencies[mode].append(duration)
+                        elapsed[mode] += duration
+
+                results = {mode: summarize(latencies[mode], elapsed[mode]) for mode in MODES}
+                for mode in MODES:
+                    result = results[mode]
+                    overhead = result['p50_ms'] - results['off']['p50_ms']
+                    rows.append({
+                        'endpoint': name,
+                        'metrics': mode,
+                        **result,
+                        'overhead_p50_us': round(overhead * 1000, 1),
+                        'overhead_pct': round(overhead / results['off']['p50_ms'] * 100, 2),
+                    })
+            metrics.reset()
+
+    write_table(stdout, rows, [
+        'endpoint', 'metrics', 'requests', 'mean_ms', 'p50_ms', 'p99_ms',
+        'overhead_p50_us', 'overhead_pct'
+    ])
+    return rows
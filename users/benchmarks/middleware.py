@@ -0,0 +1,121 @@
+"""
+Per-route Middleware
+Sends the same requests through two WSGI handlers: one with every
+USERS['ROUTED_MIDDLEWARE'] entry listed in MIDDLEWARE (the stock stack,
+run for every path) and one with users.middleware.RoutedMiddleware, which
+runs them for admin/ only. Requests alternate between the handlers so both
+see the same conditions. Reported per request: the time saved at p50 and
+the peak of memory allocated while handling it (tracemalloc, a separate
+pass).
+"""
+import time
+import tracemalloc
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.handlers.wsgi import WSGIHandler
+from django.test import Client, override_settings
+
+from ..conf import users_settings
+from ..tokens import UserRefreshToken
+from .base import benchmark_database, summarize, write_table, wsgi_request
+
+User = get_user_model()
+
+ENDPOINTS = ('profile', 'list', 'anonymous', 'admin')
+STACKS = ('stock', 'routed')
+ROUTER = 'users.middleware.RoutedMiddleware'
+
+
+def add_arguments(parser):
+    parser.add_argument(
+        '--endpoint', choices=ENDPOINTS, action='append',
+        help='Endpoint to measure (repeatable, default: all)'
+    )
+    parser.add_argument('--requests', type=int, default=2000, help='Requests per endpoint and stack')
+    parser.add_argument('--traced', type=int, default=200, help='Requests per endpoint and stack under tracemalloc')
+
+
+def stock_middleware():
+    """MIDDLEWARE with USERS['ROUTED_MIDDLEWARE'] listed in place of the router"""
+    middleware = []
+    for path in settings.MIDDLEWARE:
+        middleware.extend(users_settings.ROUTED_MIDDLEWARE if path == ROUTER else [path])
+    return middleware
+
+
+def build_requests(user, admin_session):
+    auth = {'Authorization': 'Bearer %s' % UserRefreshToken.for_user(user).access_token}
+    return {
+        'profile': ('GET', '/users/profile/', auth, 200),
+        'list': ('GET', '/users/?fields=id,email', auth, 200),
+        'anonymous': ('GET', '/users/profile/', {}, 401),
+        'admin': ('GET', '/admin/', {'Cookie': '%s=%s' % (settings.SESSION_COOKIE_NAME, admin_session)}, 200),
+    }
+
+
+def traced_kb(handler, method, path, headers, requests):
+    """Mean peak of memory allocated per request, in KiB"""
+    peaks = []
+    tracemalloc.start()
+    try:
+        for _ in range(requests):
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+            wsgi_request(handler, method, path, headers=headers)
+            peaks.append(tracemalloc.get_traced_memory()[1] - before)
+    finally:
+        tracemalloc.stop()
+    return sum(peaks) / len(peaks) / 1024
+
+
+def run(stdout, endpoint, requests, traced, **options):
+    rows = []
+    stacks = {'stock': stock_middleware(), 'routed': list(settings.MIDDLEWARE)}
+    with benchmark_database():
+        user = User.objects.create_user('bench@example.com', 'BenchPass!2024', full_name='Bench', is_staff=True)
+        admin_user = User.objects.create_superuser('admin@example.com', 'BenchPass!2024', full_name='Admin')
+        client = Client()
+        client.force_login(admin_user)
+        calls = build_requests(user, client.session.session_key)
+
+        # Middleware is loaded when the handler is built
+        handlers = {}
+        for stack in STACKS:
+            with override_settings(MIDDLEWARE=stacks[stack]):
+                handlers[stack] = WSGIHandler()
+
+        for name in endpoint or ENDPOINTS:
+            method, path, headers, expected = calls[name]
+            for stack in STACKS:
+                status = wsgi_request(handlers[stack], method, path, headers=headers)[0]
+                assert status == expected, '%s %s: %s with the %s stack' % (method, path, status, stack)
+
+            latencies = {stack: [] for stack in STACKS}
+            elapsed = {stack: 0.0 for stack in STACKS}
+            for i in range(requests):
+                for stack in (STACKS if i % 2 else STACKS[::-1]):
+                    start = time.perf_counter()
+                    wsgi_request(handlers[stack], method, path, headers=headers)
+                    duration = time.perf_counter() - start
+                    latencies[stack].append(duration)
+                    elapsed[stack] += duration
+
+            results = {stack: summarize(latencies[stack], elapsed[stack]) for stack in STACKS}
+            memory = {stack: traced_kb(handlers[stack], method, path, headers, traced) for stack in STACKS}
+            for stack in STACKS:
+                result = results[stack]
+                rows.append({
+                    'endpoint': name,
+                    'stack': stack,
+                    **result,
+                    'saved_p50_us': round((results['stock']['p50_ms'] - result['p50_ms']) * 1000, 1),
+                    'peak_alloc_kb': round(memory[stack], 1),
+                    'saved_alloc_kb': round(memory['stock'] - memory[stack], 1),
+                })
+
+    write_table(stdout, rows, [
+        'endpoint', 'stack', 'requests', 'p50_ms', 'p99_ms',
+        'saved_p50_us', 'peak_alloc_kb', 'saved_alloc_kb'
+    ])
+    return rows
@@ -0,0 +1,119 @@
+"""
+JSON Rendering and Parsing
+CPU time per response and bytes per second for the profile and login
+payloads, with DRF's stock ModelSerializer, JSONRenderer and JSONParser
+against ProfileSerializer.represent() and users.renderers (orjson when
+installed):
+- serialize: build the response envelope
+- render: encode it to JSON
+- parse: decode the request body the endpoint receives
+"""
+import io
+import time
+
+from django.contrib.auth import get_user_model
+from rest_framework import parsers, renderers, serializers
+
+from .. import renderers as fast_renderers
+from ..serializers import ProfileSerializer
+from ..tokens import UserRefreshToken
+from .base import benchmark_database, write_table
+
+User = get_user_model()
+
+PAYLOADS = ('profile', 'login')
+STAGES = ('serialize', 'render', 'parse')
+
+
+class StockProfileSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = User
+        fields = ProfileSerializer.Meta.fields
+
+
+def add_arguments(parser):
+    parser.add_argument('--payload', choices=PAYLOADS, action='append',
+                        help='Payload to measure (repeatable, default: all)')
+    parser.add_argument('--number', type=int, default=5000, help='Calls per measurement')
+    parser.add_argument('--repeat', type=int, default=5, help='Measurements, the best is kept')
+
+
+def cpu_per_call(fn, number, repeat):
+    """Best-of-`repeat` CPU seconds per call of fn()"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.process_time()
+        for _ in range(number):
+            fn()
+        best = min(best, (time.process_time() - start) / number)
+    return best
+
+
+def build_payloads(user):
+    refresh = UserRefreshToken.for_user(user)
+    tokens = {"access": str(refresh.access_token), "refresh": str(refresh)}
+
+    def login_envelope():
+        return {
+            "success": True,
+            "message": "Login successful",
+            "data": {
+                "user": {"id": user.id, "email": user.email, "full_name": user.full_name},
+                "tokens": dict(tokens)
+            }
+        }
+
+    return {
+        'profile': {
+            'stock': lambda: {"success": True, "data": StockProfileSerializer(user).data},
+            'fast': lambda: {"success": True, "data": ProfileSerializer.represent(user)},
+            'request': b'{"full_name":"Bench User","email":"bench@example.com"}',
+        },
+        'login': {
+            'stock': login_envelope,
+            'fast': login_envelope,
+            'request': b'{"email":"bench@example.com","password":"BenchPass!2024"}',
+        },
+    }
+
+
+def run(stdout, payload, number, repeat, **options):
+    codecs = {
+        'stock': (renderers.JSONRenderer(), parsers.JSONParser()),
+        'fast': (fast_renderers.JSONRenderer(), fast_renderers.JSONParser()),
+    }
+    rows = []
+    with benchmark_database():
+        user = User.objects.create_user('bench@example.com', 'BenchPass!2024', full_name='Bench User')
+        payloads = build_payloads(user)
+
+        for name in payload or PAYLOADS:
+            calls = payloads[name]
+            stock_cpu = {}
+            for codec, (renderer, parser) in codecs.items():
+                build = calls[codec]
+                envelope = build()
+                body = renderer.render(envelope, 'application/json', {})
+                request = calls['request']
+                measured = {
+                    'serialize': (build, len(body)),
+                    'render': (lambda: renderer.render(envelope, 'application/json', {}), len(body)),
+                    'parse': (lambda: parser.parse(io.BytesIO(request), 'application/json', {}), len(request)),
+                }
+                for stage in STAGES:
+                    fn, size = measured[stage]
+                    cpu = cpu_per_call(fn, number, repeat)
+                    stock_cpu.setdefault(stage, cpu)
+                    rows.append({
+                        'payload': name,
+                        'codec': 'stock' if codec == 'stock' else 'fast (%s)' % fast_renderers.BACKEND,
+                        'stage': stage,
+                        'bytes': size,
+                        'cpu_us': round(cpu * 1e6, 2),
+                        'mb_per_s': round(size / cpu / 1e6, 1),
+                        'speedup': round(stock_cpu[stage] / cpu, 1),
+                    })
+
+    rows.sort(key=lambda row: (PAYLOADS.index(row['payload']), STAGES.index(row['stage'])))
+    write_table(stdout, rows, ['payload', 'stage', 'codec', 'bytes', 'cpu_us', 'mb_per_s', 'speedup'])
+    return rows
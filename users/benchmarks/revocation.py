@@ -0,0 +1,90 @@
+"""
+Token Refresh Latency as the Revocation Table Grows
+Seeds RevokedToken rows in steps and times POST /users/token/refresh/ with
+the in-memory revocation filter and with a database lookup per check.
+"""
+import json
+import time
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from ..models import RevokedToken
+from ..revocation import revocation_index
+from ..tokens import UserRefreshToken
+from .base import benchmark_database, summarize, write_table
+
+User = get_user_model()
+
+
+def add_arguments(parser):
+    parser.add_argument(
+        '--sizes', default='1000,10000,100000',
+        help='Comma separated revoked-token table sizes'
+    )
+    parser.add_argument('--requests', type=int, default=300, help='Refreshes per size and mode')
+
+
+def seed(count, batch_size=5000):
+    """Add `count` revocations expiring over the next week"""
+    now = timezone.now()
+    for start in range(0, count, batch_size):
+        RevokedToken.objects.bulk_create(
+            RevokedToken(
+                jti=uuid.uuid4().hex,
+                expires_at=now + timedelta(seconds=(start + i) * 7 * 24 * 3600 // max(count, 1))
+            )
+            for i in range(min(batch_size, count - start))
+        )
+
+
+def run(stdout, sizes, requests, **options):
+    sizes = sorted(int(size) for size in sizes.split(','))
+    rows = []
+    with benchmark_database():
+        user = User.objects.create_user('bench@example.com', 'BenchPass!2024', full_name='Bench')
+        body = json.dumps({'refresh': str(UserRefreshToken.for_user(user))})
+        client = Client()
+
+        def refresh():
+            return client.post('/users/token/refresh/', body, content_type='application/json')
+
+        for size in sizes:
+            seed(size - RevokedToken.objects.count())
+
+            for mode, enabled in (('filter', True), ('database', False)):
+                users_settings = {
+                    **getattr(settings, 'USERS', {}),
+                    'REVOCATION_FILTER_ENABLED': enabled,
+                    'REVOCATION_PRUNE_INTERVAL': None,
+                }
+                with override_settings(USERS=users_settings):
+                    refresh()  # load the filter outside of the measurement
+                    with CaptureQueriesContext(connection) as queries:
+                        latencies = []
+                        start = time.perf_counter()
+                        for _ in range(requests):
+                            request_start = time.perf_counter()
+                            assert refresh().status_code == 200
+                            latencies.append(time.perf_counter() - request_start)
+                        elapsed = time.perf_counter() - start
+                    result = summarize(latencies, elapsed)
+                    rows.append({
+                        'revoked_rows': size,
+                        'mode': mode,
+                        'queries_per_refresh': round(len(queries) / requests, 2),
+                        **result,
+                        'filter_bytes': revocation_index.stats()['bytes'] if enabled else 0,
+                    })
+
+    write_table(stdout, rows, [
+        'revoked_rows', 'mode', 'queries_per_refresh', 'throughput_rps',
+        'p50_ms', 'p95_ms', 'p99_ms', 'filter_bytes'
+    ])
+    return rows
@@ -0,0 +1,172 @@
+"""
+In-process HTTP Servers for Benchmarks
+Real socket servers running on a background thread, so requests pay for
+HTTP parsing and the WSGI/ASGI handler like in production:
+- WSGIServer: the standard library's wsgiref server, a thread per request
+- ASGIServer: a minimal asyncio HTTP/1.1 server (one request per
+  connection) driving an ASGI application on its own event loop
+"""
+import asyncio
+import http.client
+import threading
+from http import HTTPStatus
+from socketserver import ThreadingMixIn
+from wsgiref.simple_server import WSGIRequestHandler, WSGIServer as _WSGIServer, make_server
+
+
+class _ThreadingWSGIServer(ThreadingMixIn, _WSGIServer):
+    daemon_threads = True
+    request_queue_size = 128
+
+
+class _QuietHandler(WSGIRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+class WSGIServer:
+    """Serve a WSGI application on 127.0.0.1 and a free port"""
+
+    def __init__(self, application):
+        self.application = application
+        self._server = None
+        self._thread = None
+
+    @property
+    def port(self):
+        return self._server.server_address[1]
+
+    def start(self):
+        self._server = make_server(
+            '127.0.0.1', 0, self.application,
+            server_class=_ThreadingWSGIServer, handler_class=_QuietHandler
+        )
+        self._thread = threading.Thread(target=self._server.serve_forever, name='bench-wsgi', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+class ASGIServer:
+    """Serve an ASGI application on 127.0.0.1 and a free port"""
+
+    def __init__(self, application):
+        self.application = application
+        self.port = None
+        self._loop = None
+        self._server = None
+        self._thread = None
+
+    def start(self):
+        ready = threading.Event()
+        self._loop = asyncio.new_event_loop()
+
+        def serve():
+            asyncio.set_event_loop(self._loop)
+            self._server = self._loop.run_until_complete(
+                asyncio.start_server(self._handle, '127.0.0.1', 0, backlog=128)
+            )
+            self.port = self._server.sockets[0].getsockname()[1]
+            ready.set()
+            self._loop.run_forever()
+
+        self._thread = threading.Thread(target=serve, name='bench-asgi', daemon=True)
+        self._thread.start()
+        ready.wait()
+        return self
+
+    def stop(self):
+        async def close():
+            self._server.close()
+            await self._server.wait_closed()
+            # Let connection handlers still closing their socket finish
+            handlers = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+            await asyncio.gather(*handlers, return_exceptions=True)
+
+        asyncio.run_coroutine_threadsafe(close(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    async def _handle(self, reader, writer):
+        try:
+            request_line = (await reader.readline()).decode('latin-1').rstrip('\r\n')
+            if not request_line:
+                return
+            method, target, _ = request_line.split(' ', 2)
+            headers = []
+            while True:
+                line = (await reader.readline()).decode('latin-1').rstrip('\r\n')
+                if not line:
+                    break
+                name, _, value = line.partition(':')
+                headers.append((name.strip().lower().encode('latin-1'), value.strip().encode('latin-1')))
+            length = int(dict(headers).get(b'content-length', b'0') or 0)
+            body = await reader.readexactly(length) if length else b''
+
+            path, _, query_string = target.partition('?')
+            scope = {
+                'type': 'http',
+                'asgi': {'version': '3.0'},
+                'http_version': '1.1',
+                'method': method,
+                'scheme': 'http',
+                'path': path,
+                'raw_path': path.encode('latin-1'),
+                'query_string': query_string.encode('latin-1'),
+                'root_path': '',
+                'headers': headers,
+                'client': writer.get_extra_info('peername')[:2],
+                'server': ('127.0.0.1', self.port),
+            }
+            messages = [{'type': 'http.request', 'body': body, 'more_body': False}]
+
+            async def receive():
+                if messages:
+                    return messages.pop(0)
+                return {'type': 'http.disconnect'}
+
+            async def send(message):
+                if message['type'] == 'http.response.start':
+                    status = message['status']
+                    lines = ['HTTP/1.1 %d %s' % (status, HTTPStatus(status).phrase)]
+                    lines += ['%s: %s' % (name.decode('latin-1'), value.decode('latin-1'))
+                              for name, value in message.get('headers', [])]
+                    lines.append('Connection: close')
+                    writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1'))
+                elif message['type'] == 'http.response.body':
+                    writer.write(message.get('body', b''))
+                    await writer.drain()
+
+            await self.application(scope, receive, send)
+        finally:
+            writer.close()
+
+
+def http_request(port, method, path, body=b'', headers=None):
+    """Send one request to 127.0.0.1:port; returns (status_code, body)"""
+    connection = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+    try:
+        connection.request(method, path, body=body or None, headers={
+            'Content-Type': 'application/json', **(headers or {})
+        })
+        response = connection.getresponse()
+        return response.status, response.read()
+    finally:
+        connection.close()
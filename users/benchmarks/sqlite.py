@@ -0,0 +1,93 @@
+"""
+Mixed Read/Write Load on SQLite, Default vs Production Profile
+Client threads list users (reads) and update their profile (writes) against
+a file database, first with SQLite defaults (rollback journal, no connection
+reuse, concurrent writers) and then with the tuned profile (WAL and PRAGMAs,
+persistent connections, single-writer queue).
+"""
+import json
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import connections
+from django.test import Client, override_settings
+
+from ..sqlite import write_queue
+from ..tokens import UserRefreshToken
+from .base import benchmark_database, run_concurrently, write_table
+
+User = get_user_model()
+
+TUNED_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -64000,
+    'temp_store': 'MEMORY',
+}
+
+PROFILES = (
+    ('default', {'SQLITE_PRAGMAS': {}, 'SQLITE_WRITE_QUEUE': False}, 0),
+    ('tuned', {'SQLITE_PRAGMAS': TUNED_PRAGMAS, 'SQLITE_WRITE_QUEUE': True}, 600),
+)
+
+
+def add_arguments(parser):
+    parser.add_argument('--requests', type=int, default=2000, help='Requests per profile')
+    parser.add_argument('--concurrency', type=int, default=16, help='Client threads')
+    parser.add_argument('--write-ratio', type=float, default=0.2, help='Share of profile updates')
+    parser.add_argument('--users', type=int, default=200, help='Seeded accounts')
+
+
+def run(stdout, requests, concurrency, write_ratio, users, **options):
+    rows = []
+    write_every = max(1, round(1 / write_ratio)) if write_ratio > 0 else 0
+
+    for name, profile, conn_max_age in PROFILES:
+        users_settings = {
+            **getattr(settings, 'USERS', {}),
+            **profile,
+            'REVOCATION_PRUNE_INTERVAL': None,
+            'LAST_LOGIN_BUFFER_ENABLED': False,
+        }
+        with override_settings(USERS=users_settings), benchmark_database() as connection:
+            connection.settings_dict['CONN_MAX_AGE'] = conn_max_age
+            connection.close()
+
+            encoded = make_password('BenchPass!2024')
+            User.objects.bulk_create(
+                User(email=f'bench{i}@example.com', full_name=f'Bench {i}', password=encoded, is_staff=True)
+                for i in range(users)
+            )
+            tokens = [
+                'Bearer ' + str(UserRefreshToken.for_user(user).access_token)
+                for user in User.objects.order_by('pk')
+            ]
+
+            def request(i):
+                client = Client(HTTP_AUTHORIZATION=tokens[i % len(tokens)])
+                try:
+                    if write_every and i % write_every == 0:
+                        response = client.patch(
+                            '/users/profile/',
+                            json.dumps({'full_name': f'Bench {i}'}),
+                            content_type='application/json'
+                        )
+                    else:
+                        response = client.get('/users/?page_size=20')
+                except Exception:
+                    # "database is locked" and friends
+                    return False
+                return response.status_code == 200
+
+            result = run_concurrently(request, requests, concurrency)
+            write_queue.shutdown()
+            connections.close_all()
+        rows.append({'profile': name, **result})
+
+    write_table(stdout, rows, [
+        'profile', 'requests', 'errors', 'throughput_rps', 'p50_ms', 'p95_ms', 'p99_ms'
+    ])
+    return rows
@@ -0,0 +1,132 @@
+"""
+Worker Startup Cost
+Cold start of each settings profile, every run in a fresh interpreter:
+- import_ms: importing the WSGI entry point (django.setup(), the API
+  profile's warm-up)
+- first_request_ms: the first request once imported
+- ready_ms: interpreter launch to the first response, seen by the parent
+- rss_kb / modules: resident memory and modules loaded after that request
+- fork_request_ms / worker_private_kb: a worker forked from the loaded
+  process (as gunicorn --preload does) answering its first request, and
+  the memory it does not share with its parent
+"""
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from importlib import import_module
+
+PROFILES = {
+    'full': 'user_management.wsgi',
+    'api': 'user_management.wsgi_api',
+}
+PROBE_PATH = '/users/profile/'
+METRICS = ('import_ms', 'first_request_ms', 'ready_ms', 'rss_kb', 'modules',
+           'fork_request_ms', 'worker_private_kb')
+
+
+def add_arguments(parser):
+    parser.add_argument('--profile', choices=PROFILES, action='append',
+                        help='Profile to measure (repeatable, default: all)')
+    parser.add_argument('--runs', type=int, default=5, help='Fresh interpreters per profile, medians are kept')
+
+
+def memory_kb(fields):
+    """Sum of /proc/self memory fields in kB, None off Linux"""
+    path = '/proc/self/smaps_rollup' if fields[0].startswith('Private') else '/proc/self/status'
+    try:
+        with open(path) as file:
+            lines = file.read().splitlines()
+    except OSError:
+        return None
+    total = 0
+    for line in lines:
+        name, _, value = line.partition(':')
+        if name in fields:
+            total += int(value.split()[0])
+    return total
+
+
+def probe(entry_point):
+    """Child side: load the entry point, serve requests, print the measures"""
+    start = time.perf_counter()
+    application = import_module(entry_point).application
+    imported = time.perf_counter()
+
+    from .base import wsgi_request
+
+    def first_request():
+        status, _ = wsgi_request(application, 'GET', PROBE_PATH, headers={'Host': 'localhost'})
+        return status
+
+    status = first_request()
+    served = time.perf_counter()
+    print('ready %d' % status, flush=True)
+    result = {
+        'status': status,
+        'import_ms': (imported - start) * 1000,
+        'first_request_ms': (served - imported) * 1000,
+        'rss_kb': memory_kb(['VmRSS']),
+        'modules': len(sys.modules),
+    }
+
+    # A preforked worker
+    read_end, write_end = os.pipe()
+    fork_start = time.perf_counter()
+    pid = os.fork()
+    if pid == 0:
+        os.close(read_end)
+        first_request()
+        worker = {
+            'fork_request_ms': (time.perf_counter() - fork_start) * 1000,
+            'worker_private_kb': memory_kb(['Private_Clean', 'Private_Dirty']),
+        }
+        os.write(write_end, json.dumps(worker).encode())
+        os._exit(0)
+    os.close(write_end)
+    with os.fdopen(read_end) as pipe:
+        result.update(json.loads(pipe.read()))
+    os.waitpid(pid, 0)
+    print(json.dumps(result), flush=True)
+
+
+def measure(entry_point, base_dir):
+    """One fresh interpreter: the probe's measures plus ready_ms"""
+    env = {key: value for key, value in os.environ.items() if key != 'DJANGO_SETTINGS_MODULE'}
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, '-m', __name__, entry_point],
+        cwd=base_dir, env=env, stdout=subprocess.PIPE, text=True
+    )
+    ready_line = process.stdout.readline()
+    ready = time.perf_counter()
+    result_line = process.stdout.readline()
+    process.wait()
+    if not ready_line.startswith('ready') or process.returncode:
+        raise RuntimeError('%s failed to start (exit code %s)' % (entry_point, process.returncode))
+    result = json.loads(result_line)
+    result['ready_ms'] = (ready - start) * 1000
+    return result
+
+
+def run(stdout, profile, runs, **options):
+    from django.conf import settings
+
+    from .base import write_table
+
+    rows = []
+    for name in profile or PROFILES:
+        results = [measure(PROFILES[name], settings.BASE_DIR) for _ in range(runs)]
+        row = {'profile': name, 'entry_point': PROFILES[name], 'status': results[0]['status']}
+        for metric in METRICS:
+            values = [result[metric] for result in results if result[metric] is not None]
+            row[metric] = round(statistics.median(values), 1) if values else None
+        rows.append(row)
+    write_table(stdout, rows, ['profile', 'status', *METRICS])
+    return rows
+
+
+if __name__ == '__main__':
+    probe(sys.argv[1])
@@ -0,0 +1,464 @@
+"""
+Endpoint Benchmark Suite
+Seeds a dataset (users, revoked and blacklisted refresh tokens) into a
+throwaway SQLite database, drives every endpoint of users/urls.py through
+Django's test client, an in-process WSGI server and an in-process ASGI
+server, and reports throughput, latency percentiles and database queries
+per request. Results are saved as JSON and can be compared against a
+saved baseline: any metric worse than --threshold percent fails the run.
+"""
+import json
+import platform
+import random
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import timedelta
+
+import django
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.asgi import get_asgi_application
+from django.core.management.base import CommandError
+from django.core.wsgi import get_wsgi_application
+from django.db.backends.signals import connection_created
+from django.test import Client, override_settings
+from django.utils import timezone
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+
+from ..conditional import profile_etag, profile_revision
+from ..conf import users_settings
+from ..search import search_index
+from ..sqlite import write_queue
+from ..tokens import UserRefreshToken
+from .base import benchmark_database, run_concurrently, write_table
+from .revocation import seed as seed_revoked
+from .servers import ASGIServer, WSGIServer, http_request
+
+User = get_user_model()
+
+PASSWORD = 'BenchPass!2024'
+NEW_PASSWORD = 'BenchPass!2025'
+TRANSPORTS = ('client', 'wsgi', 'asgi')
+
+# Compared against the baseline: metric -> whether higher is better
+COMPARED_METRICS = {
+    'p50_ms': False,
+    'p95_ms': False,
+    'throughput_rps': True,
+    'queries_per_request': False,
+}
+
+
+def count(value):
+    """Parse a row count such as 10000, 10k or 1M"""
+    value = str(value).strip().lower()
+    multiplier = {'k': 1000, 'm': 1000000}.get(value[-1:], 1)
+    if multiplier > 1:
+        value = value[:-1]
+    return int(float(value) * multiplier)
+
+
+def add_arguments(parser):
+    parser.add_argument('--users', type=count, default='10k', help='Seeded users (e.g. 10k, 100k, 1M)')
+    parser.add_argument('--revoked', type=count, default=0, help='Seeded revoked refresh tokens')
+    parser.add_argument('--blacklisted', type=count, default=0,
+                        help='Seeded simplejwt outstanding + blacklisted tokens')
+    parser.add_argument('--requests', type=int, default=200, help='Requests per endpoint and transport')
+    parser.add_argument('--slow-requests', type=int, default=20,
+                        help='Requests for endpoints that hash passwords or export the table')
+    parser.add_argument('--concurrency', type=int, default=1, help='Client threads')
+    parser.add_argument('--transport', choices=TRANSPORTS, action='append',
+                        help='Transport to measure (repeatable, default: all)')
+    parser.add_argument('--endpoint', action='append',
+                        help='Endpoint (URL name) to measure (repeatable, default: all)')
+    parser.add_argument('--seed', type=int, default=42, help='Random seed for request data')
+    parser.add_argument('--output', help='Write the results as JSON to this file')
+    parser.add_argument('--baseline', help='Compare against results saved with --output')
+    parser.add_argument('--threshold', type=float, default=10.0,
+                        help='Allowed regression against the baseline, in percent')
+
+
+class QueryCounter:
+    """Execute wrapper counting the queries of every connection and thread"""
+
+    def __init__(self):
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, execute, sql, params, many, context):
+        with self._lock:
+            self.value += 1
+        return execute(sql, params, many, context)
+
+    def install(self, sender, connection, **kwargs):
+        if self not in connection.execute_wrappers:
+            connection.execute_wrappers.append(self)
+
+
+def seed_users(stdout, total, batch_size=10000):
+    """Create `total` users sharing one password hash, and index them for search"""
+    encoded = make_password(PASSWORD)
+    start = time.perf_counter()
+    for offset in range(0, total, batch_size):
+        users = User.objects.bulk_create(
+            User(
+                email=f'user{i}@bench{i % 100}.example.com',
+                full_name=f'Bench User {i}',
+                password=encoded,
+                is_staff=i == 0,
+            )
+            for i in range(offset, min(offset + batch_size, total))
+        )
+        search_index.index_rows([(user.pk, user.email, user.full_name) for user in users])
+        done = offset + len(users)
+        stdout.write('Seeded %d/%d users (%.0f rows/s)' % (done, total, done / (time.perf_counter() - start)))
+
+
+def seed_blacklisted(total, user_ids, batch_size=10000):
+    """Create `total` outstanding simplejwt tokens, all blacklisted"""
+    now = timezone.now()
+    for offset in range(0, total, batch_size):
+        tokens = OutstandingToken.objects.bulk_create(
+            OutstandingToken(
+                user_id=user_ids[i % len(user_ids)],
+                jti=uuid.uuid4().hex,
+                token='',
+                created_at=now,
+                expires_at=now + timedelta(days=1),
+            )
+            for i in range(offset, min(offset + batch_size, total))
+        )
+        BlacklistedToken.objects.bulk_create(BlacklistedToken(token=token) for token in tokens)
+
+
+class Dataset:
+    """Seeded users handed out to the request builders"""
+
+    def __init__(self, user_ids, seed):
+        self.staff = User.objects.get(pk=user_ids[0])
+        self.staff_auth = self.bearer(self.staff)
+        # Users logging in keep their password; the others may change it
+        half = max(2, len(user_ids) // 2)
+        self.login_ids = user_ids[1:half]
+        self.spare_ids = list(reversed(user_ids[half:]))
+        self.random = random.Random(seed)
+
+    @staticmethod
+    def bearer(user, refresh=None):
+        refresh = refresh or UserRefreshToken.for_user(user)
+        return {'Authorization': 'Bearer %s' % refresh.access_token}
+
+    def login_users(self, n, distinct=20):
+        """n users (cycling over a few distinct ones) who log in with PASSWORD"""
+        picked = self.random.sample(self.login_ids, min(distinct, len(self.login_ids)))
+        users = list(User.objects.filter(pk__in=picked))
+        return [users[i % len(users)] for i in range(n)]
+
+    def take_spare_users(self, n):
+        """n users never handed out before"""
+        if len(self.spare_ids) < n:
+            raise CommandError('Not enough seeded users: increase --users or lower the request counts')
+        picked, self.spare_ids = self.spare_ids[:n], self.spare_ids[n:]
+        return list(User.objects.filter(pk__in=picked))
+
+
+def _json(data):
+    return json.dumps(data).encode()
+
+
+# Request builders: (dataset, n, tag) -> [(method, path, body, headers)]
+
+def build_register(dataset, n, tag):
+    return [
+        ('POST', '/users/register/', _json({
+            'email': f'new-{tag}-{i}@bench.example.com',
+            'full_name': f'New User {i}',
+            'password': PASSWORD,
+            'password2': PASSWORD,
+        }), {})
+        for i in range(n)
+    ]
+
+
+def build_login(dataset, n, tag):
+    return [
+        ('POST', '/users/login/', _json({'email': user.email, 'password': PASSWORD}), {})
+        for user in dataset.login_users(n)
+    ]
+
+
+def build_logout(dataset, n, tag):
+    requests = []
+    for user in dataset.login_users(n):
+        refresh = UserRefreshToken.for_user(user)
+        requests.append((
+            'POST', '/users/logout/', _json({'refresh': str(refresh)}), dataset.bearer(user, refresh)
+        ))
+    return requests
+
+
+def build_token_refresh(dataset, n, tag):
+    bodies = [_json({'refresh': str(UserRefreshToken.for_user(user))}) for user in dataset.login_users(20)]
+    return [('POST', '/users/token/refresh/', bodies[i % len(bodies)], {}) for i in range(n)]
+
+
+def build_profile(dataset, n, tag):
+    headers = [dataset.bearer(user) for user in dataset.login_users(20)]
+    return [('GET', '/users/profile/', b'', headers[i % len(headers)]) for i in range(n)]
+
+
+def build_profile_not_modified(dataset, n, tag):
+    headers = [
+        {**dataset.bearer(user), 'If-None-Match': profile_etag(user.pk, profile_revision(user))}
+        for user in dataset.login_users(20)
+    ]
+    return [('GET', '/users/profile/', b'', headers[i % len(headers)]) for i in range(n)]
+
+
+def build_batch(dataset, n, tag):
+    """A page load: profile, token refresh and a revalidated profile in one request"""
+    requests = []
+    for user in dataset.login_users(20):
+        refresh = UserRefreshToken.for_user(user)
+        requests.append(('POST', '/users/batch/', _json({'requests': [
+            {'method': 'GET', 'path': '/users/profile/'},
+            {'method': 'POST', 'path': '/users/token/refresh/', 'body': {'refresh': str(refresh)}},
+            {'method': 'GET', 'path': '/users/profile/', 'headers': {
+                'If-None-Match': profile_etag(user.pk, profile_revision(user))
+            }},
+        ]}), dataset.bearer(user, refresh)))
+    return [requests[i % len(requests)] for i in range(n)]
+
+
+def build_profile_update(dataset, n, tag):
+    headers = [dataset.bearer(user) for user in dataset.take_spare_users(min(n, 20))]
+    return [
+        ('PATCH', '/users/profile/', _json({'full_name': f'Renamed {tag} {i}'}), headers[i % len(headers)])
+        for i in range(n)
+    ]
+
+
+def build_change_password(dataset, n, tag):
+    # Changing the password revokes the user's tokens: one user per request
+    body = _json({'old_password': PASSWORD, 'new_password': NEW_PASSWORD, 'new_password2': NEW_PASSWORD})
+    return [
+        ('POST', '/users/profile/change-password/', body, dataset.bearer(user))
+        for user in dataset.take_spare_users(n)
+    ]
+
+
+def build_list(dataset, n, tag):
+    return [('GET', '/users/?page_size=50', b'', dataset.staff_auth)] * n
+
+
+def build_search(dataset, n, tag):
+    # An email prefix, as typed into the admin search box
+    return [
+        ('GET', '/users/search/?q=user%d' % dataset.random.choice(dataset.login_ids), b'', dataset.staff_auth)
+        for _ in range(n)
+    ]
+
+
+def build_export(dataset, n, tag):
+    return [('GET', '/users/export/?output=jsonl&is_staff=true', b'', dataset.staff_auth)] * n
+
+
+def build_metrics(dataset, n, tag):
+    return [('GET', '/users/metrics/', b'', dataset.staff_auth)] * n
+
+
+# URL name -> (request builder, expected status, slow)
+ENDPOINTS = {
+    'register': (build_register, 201, True),
+    'login': (build_login, 200, True),
+    'logout': (build_logout, 200, False),
+    'token_refresh': (build_token_refresh, 200, False),
+    'profile': (build_profile, 200, False),
+    'profile_not_modified': (build_profile_not_modified, 304, False),
+    'profile_update': (build_profile_update, 200, False),
+    'change_password': (build_change_password, 200, True),
+    'list': (build_list, 200, False),
+    'search': (build_search, 200, False),
+    'export': (build_export, 200, True),
+    'metrics': (build_metrics, None, False),
+    'batch': (build_batch, 200, False),
+}
+
+
+class ClientTransport:
+    """django.test.Client, one per client thread"""
+    name = 'client'
+
+    def __init__(self):
+        self._local = threading.local()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        pass
+
+    def request(self, method, path, body, headers):
+        client = getattr(self._local, 'client', None)
+        if client is None:
+            client = self._local.client = Client()
+        extra = {'HTTP_' + name.upper().replace('-', '_'): value for name, value in headers.items()}
+        response = client.generic(method, path, body, content_type='application/json', **extra)
+        # Consume streaming responses like a real client would
+        content = b''.join(response) if response.streaming else response.content
+        return response.status_code, content
+
+
+class ServerTransport:
+    """HTTP requests to an in-process WSGI or ASGI server"""
+
+    def __init__(self, name, server):
+        self.name = name
+        self.server = server
+
+    def __enter__(self):
+        self.server.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.server.stop()
+
+    def request(self, method, path, body, headers):
+        # The test environment only allows the 'testserver' host
+        return http_request(self.server.port, method, path, body, {'Host': 'testserver', **headers})
+
+
+def make_transport(name):
+    if name == 'wsgi':
+        return ServerTransport(name, WSGIServer(get_wsgi_application()))
+    if name == 'asgi':
+        return ServerTransport(name, ASGIServer(get_asgi_application()))
+    return ClientTransport()
+
+
+def measure(transport, requests, expected, concurrency, counter):
+    """Send the prepared requests; returns the summary with queries per request"""
+    before = counter.value
+
+    def call(i):
+        status, _ = transport.request(*requests[i])
+        return status == expected
+
+    result = run_concurrently(call, len(requests), concurrency)
+    result['queries_per_request'] = round((counter.value - before) / max(1, len(requests)), 2)
+    return result
+
+
+def compare(results, baseline, threshold):
+    """Rows comparing results with a baseline; regressions are flagged"""
+    previous = {(row['transport'], row['endpoint']): row for row in baseline['results']}
+    rows = []
+    for row in results:
+        old = previous.get((row['transport'], row['endpoint']))
+        if old is None:
+            continue
+        for metric, higher_is_better in COMPARED_METRICS.items():
+            before, after = old.get(metric), row.get(metric)
+            if before is None or after is None:
+                continue
+            change = (after - before) / before * 100 if before else (0.0 if after == before else 100.0)
+            worse = -change if higher_is_better else change
+            rows.append({
+                'transport': row['transport'],
+                'endpoint': row['endpoint'],
+                'metric': metric,
+                'baseline': before,
+                'current': after,
+                'change_pct': round(change, 1),
+                'regression': 'REGRESSION' if worse > threshold else '',
+            })
+    return rows
+
+
+def run(stdout, users, revoked, blacklisted, requests, slow_requests, concurrency,
+        transport, endpoint, seed, output, baseline, threshold, **options):
+    endpoints = endpoint or list(ENDPOINTS)
+    unknown = set(endpoints) - set(ENDPOINTS)
+    if unknown:
+        raise CommandError('Unknown endpoint(s): %s (choose from %s)' % (
+            ', '.join(sorted(unknown)), ', '.join(ENDPOINTS)
+        ))
+    transports = transport or list(TRANSPORTS)
+    if users < 2:
+        raise CommandError('--users must be at least 2')
+    baseline_data = None
+    if baseline:
+        with open(baseline) as f:
+            baseline_data = json.load(f)
+
+    counter = QueryCounter()
+    connection_created.connect(counter.install)
+    users_overrides = {**getattr(settings, 'USERS', {}), 'REVOCATION_PRUNE_INTERVAL': None}
+    results = []
+    try:
+        with override_settings(USERS=users_overrides), benchmark_database() as connection:
+            counter.install(None, connection)
+            seed_users(stdout, users)
+            user_ids = list(User.objects.order_by('pk').values_list('pk', flat=True))
+            if revoked:
+                seed_revoked(revoked)
+            if blacklisted:
+                seed_blacklisted(blacklisted, user_ids)
+            dataset = Dataset(user_ids, seed)
+
+            for transport_name in transports:
+                with make_transport(transport_name) as client:
+                    for name in endpoints:
+                        build, expected, slow = ENDPOINTS[name]
+                        if expected is None:
+                            expected = 200 if users_settings.METRICS_ENABLED else 404
+                        prepared = build(dataset, slow_requests if slow else requests, transport_name)
+                        result = measure(client, prepared, expected, concurrency, counter)
+                        results.append({'transport': transport_name, 'endpoint': name, **result})
+                        stdout.write('%s %s: %.1f req/s, p50 %.2f ms' % (
+                            transport_name, name, result['throughput_rps'], result['p50_ms']
+                        ))
+            write_queue.shutdown()
+    finally:
+        connection_created.disconnect(counter.install)
+
+    write_table(stdout, results, [
+        'transport', 'endpoint', 'requests', 'errors', 'throughput_rps',
+        'p50_ms', 'p95_ms', 'p99_ms', 'queries_per_request'
+    ])
+
+    report = {
+        'meta': {
+            'created_at': timezone.now().isoformat(),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'sqlite': sqlite3.sqlite_version,
+            'users': users,
+            'revoked': revoked,
+            'blacklisted': blacklisted,
+            'requests': requests,
+            'slow_requests': slow_requests,
+            'concurrency': concurrency,
+            'seed': seed,
+        },
+        'results': results,
+    }
+    if output:
+        with open(output, 'w') as f:
+            json.dump(report, f, indent=2)
+        stdout.write('Results written to %s' % output)
+
+    if baseline_data is not None:
+        comparison = compare(results, baseline_data, threshold)
+        write_table(stdout, comparison, [
+            'transport', 'endpoint', 'metric', 'baseline', 'current', 'change_pct', 'regression'
+        ])
+        regressions = [row for row in comparison if row['regression']]
+        if regressions:
+            raise CommandError('%d metric(s) regressed by more than %s%% against %s' % (
+                len(regressions), threshold, baseline
+            ))
+    return results
@@ -0,0 +1,128 @@
+"""
+Rate Limiter Overhead
+Time per AuthRateThrottle.allow_request() call (IP, email and global
+budgets) for each store, with one hot client or many distinct ones, from
+one or several threads, and for requests allowed or rejected. Then the
+latency of a login rejected by the limiter against one that reaches
+password hashing.
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, override_settings
+from rest_framework.test import APIRequestFactory
+
+from ..throttling import AuthRateThrottle, throttle_stores
+from .base import benchmark_database, summarize, write_table
+
+User = get_user_model()
+
+STORES = ('local', 'cache')
+UNLIMITED = '1000000000/s'
+
+
+def add_arguments(parser):
+    parser.add_argument('--store', choices=STORES, action='append',
+                        help='Store to measure (repeatable, default: all)')
+    parser.add_argument('--calls', type=int, default=20000, help='Calls per measurement')
+    parser.add_argument('--threads', type=int, default=4, help='Threads of the concurrent measurement')
+    parser.add_argument('--clients', type=int, default=10000, help='Distinct IPs/emails')
+    parser.add_argument('--logins', type=int, default=20, help='Logins per mode')
+
+
+class View:
+    throttle_scope = 'login'
+
+
+def build_requests(clients):
+    factory = APIRequestFactory()
+    requests = []
+    for i in range(clients):
+        request = factory.post('/users/login/', REMOTE_ADDR='10.%d.%d.%d' % (i >> 16 & 255, i >> 8 & 255, i & 255))
+        request.data = {'email': 'client%d@example.com' % i, 'password': 'x'}
+        requests.append(request)
+    return requests
+
+
+def time_calls(requests, calls, threads):
+    """Seconds per allow_request() call, spread over threads"""
+    view = View()
+    per_thread = calls // threads
+
+    def worker(offset):
+        throttle = AuthRateThrottle()
+        for i in range(per_thread):
+            throttle.allow_request(requests[(offset + i) % len(requests)], view)
+
+    workers = [threading.Thread(target=worker, args=(n * 7919,)) for n in range(threads)]
+    start = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    return (time.perf_counter() - start) / (per_thread * threads)
+
+
+def run(stdout, store, calls, threads, clients, logins, **options):
+    rows = []
+    base_settings = getattr(settings, 'USERS', {})
+    requests = build_requests(clients)
+    cases = [
+        ('1 hot', requests[:1], UNLIMITED, 1, 'allowed'),
+        ('%d' % clients, requests, UNLIMITED, 1, 'allowed'),
+        ('%d' % clients, requests, UNLIMITED, threads, 'allowed'),
+        ('1 hot', requests[:1], '1/min', 1, 'rejected'),
+    ]
+    for name in store or STORES:
+        for label, sample, rate, thread_count, outcome in cases:
+            users_settings = {
+                **base_settings,
+                'THROTTLE_ENABLED': True,
+                'THROTTLE_STORE': name,
+                'THROTTLE_RATES': {'login_ip': rate, 'login_email': rate, 'login_global': UNLIMITED},
+            }
+            with override_settings(USERS=users_settings):
+                cache.clear()
+                time_calls(sample, min(calls, 1000), 1)  # warm up
+                seconds = time_calls(sample, calls, thread_count)
+                throttle_stores.reset()
+            rows.append({
+                'store': name,
+                'clients': label,
+                'threads': thread_count,
+                'outcome': outcome,
+                'us_per_call': round(seconds * 1e6, 2),
+                'calls_per_s': round(1 / seconds),
+            })
+    write_table(stdout, rows, ['store', 'clients', 'threads', 'outcome', 'us_per_call', 'calls_per_s'])
+
+    # A throttled login never reaches password hashing
+    login_rows = []
+    with benchmark_database():
+        User.objects.create_user('bench@example.com', 'BenchPass!2024')
+        body = {'email': 'bench@example.com', 'password': 'wrong password'}
+        for mode, rate in (('hashed', UNLIMITED), ('throttled', '1/day')):
+            users_settings = {
+                **base_settings,
+                'THROTTLE_ENABLED': True,
+                'THROTTLE_STORE': 'local',
+                'THROTTLE_RATES': {'login_email': rate},
+            }
+            with override_settings(USERS=users_settings):
+                client = Client()
+                client.post('/users/login/', body, content_type='application/json')
+                latencies = []
+                start = time.perf_counter()
+                for _ in range(logins):
+                    request_start = time.perf_counter()
+                    client.post('/users/login/', body, content_type='application/json')
+                    latencies.append(time.perf_counter() - request_start)
+                result = summarize(latencies, time.perf_counter() - start)
+                throttle_stores.reset()
+            login_rows.append({'login': mode, **result})
+    stdout.write('')
+    write_table(stdout, login_rows, ['login', 'requests', 'throughput_rps', 'p50_ms', 'p99_ms'])
+    return rows + login_rows
@@ -0,0 +1,65 @@
+"""
+Token Verification Cost
+Time per request spent turning the raw JWT into a validated token, with
+USERS['VERIFIED_TOKEN_CACHE_ENABLED'] off (decode, HMAC and claim checks
+every time) and on (repeat tokens served from users.tokens.verified_tokens):
+- access: StatelessJWTAuthentication.get_validated_token() of a Bearer token
+- refresh: UserRefreshToken(raw), as token refresh and logout build it
+  (the revocation check still runs)
+- authenticate: the whole authenticate() of a request, token state included
+"""
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.test import override_settings
+from rest_framework.test import APIRequestFactory
+
+from ..authentication import StatelessJWTAuthentication
+from ..tokens import UserRefreshToken, verified_tokens
+from .base import benchmark_database, time_per_call, write_table
+
+User = get_user_model()
+
+CASES = ('access', 'refresh', 'authenticate')
+
+
+def add_arguments(parser):
+    parser.add_argument('--case', choices=CASES, action='append',
+                        help='Case to measure (repeatable, default: all)')
+    parser.add_argument('--number', type=int, default=5000, help='Calls per measurement')
+    parser.add_argument('--repeat', type=int, default=5, help='Measurements, the best is kept')
+
+
+def run(stdout, case, number, repeat, **options):
+    rows = []
+    base_settings = getattr(settings, 'USERS', {})
+    with benchmark_database():
+        user = User.objects.create_user('bench@example.com', 'BenchPass!2024', full_name='Bench User')
+        refresh = UserRefreshToken.for_user(user)
+        raw_access = str(refresh.access_token).encode()
+        raw_refresh = str(refresh)
+        authentication = StatelessJWTAuthentication()
+        request = APIRequestFactory().get('/users/profile/', HTTP_AUTHORIZATION='Bearer %s' % raw_access.decode())
+        calls = {
+            'access': lambda: authentication.get_validated_token(raw_access),
+            'refresh': lambda: UserRefreshToken(raw_refresh),
+            'authenticate': lambda: authentication.authenticate(request),
+        }
+
+        for name in case or CASES:
+            uncached = None
+            for enabled in (False, True):
+                users_settings = {**base_settings, 'VERIFIED_TOKEN_CACHE_ENABLED': enabled}
+                with override_settings(USERS=users_settings):
+                    calls[name]()  # fills the cache
+                    seconds = time_per_call(calls[name], number, repeat)
+                    verified_tokens.clear()
+                uncached = uncached or seconds
+                rows.append({
+                    'case': name,
+                    'cache': 'on' if enabled else 'off',
+                    'us_per_call': round(seconds * 1e6, 2),
+                    'speedup': round(uncached / seconds, 1),
+                })
+
+    write_table(stdout, rows, ['case', 'cache', 'us_per_call', 'speedup'])
+    return rows
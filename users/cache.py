@@ -0,0 +1,220 @@
+"""
+Read-through User Object Cache
+Two tiers: a bounded in-process LRU with TTL in front of Django's cache
+framework, which is shared between workers.
+"""
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.utils.module_loading import import_string
+from django.db import transaction
+
+from .conf import users_settings
+from .tokens import profile_stamp
+
+User = get_user_model()
+
+USER_CACHE_KEY = 'users:user:{}'
+
+
+def is_process_local(alias):
+    """Whether the cache alias is private to each process (LocMemCache)"""
+    backend = settings.CACHES.get(alias, {}).get('BACKEND', '')
+    try:
+        return issubclass(import_string(backend), LocMemCache)
+    except ImportError:
+        return False
+
+
+def shared_timeout(alias, timeout):
+    """
+    Timeout of an entry that other processes invalidate: capped to
+    USERS['LOCAL_CACHE_TIMEOUT'] in a per-process cache, which never sees
+    their invalidations
+    """
+    if not is_process_local(alias):
+        return timeout
+    limit = users_settings.LOCAL_CACHE_TIMEOUT
+    return limit if timeout is None else min(timeout, limit)
+
+
+class LocalLRUCache:
+    """
+    Thread-safe in-process LRU cache with a per-entry TTL
+    """
+
+    def __init__(self, maxsize=1024, ttl=30):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        """Return a live entry and mark it as recently used"""
+        with self._lock:
+            try:
+                expires_at, value = self._data[key]
+            except KeyError:
+                return default
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        """Store an entry, evicting the least recently used ones"""
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class UserCache:
+    """
+    Read-through cache of User instances keyed by id.
+    Callers always receive their own copy, so mutating and saving a cached
+    user never leaks into other requests.
+    """
+
+    def __init__(self):
+        self._local = None
+        self._stats_lock = threading.Lock()
+        self.reset_stats()
+
+    @property
+    def local(self):
+        if self._local is None:
+            self._local = LocalLRUCache(
+                maxsize=users_settings.USER_CACHE_LOCAL_MAXSIZE,
+                ttl=users_settings.USER_CACHE_LOCAL_TTL
+            )
+        return self._local
+
+    @property
+    def shared(self):
+        return caches[users_settings.USER_CACHE_ALIAS]
+
+    @staticmethod
+    def timeout():
+        return shared_timeout(users_settings.USER_CACHE_ALIAS, users_settings.USER_CACHE_TIMEOUT)
+
+    def _count(self, counter):
+        with self._stats_lock:
+            self._stats[counter] += 1
+
+    def get(self, user_id, revision=None):
+        """
+        Return the user with the given id, loading it from the database on
+        a miss in both tiers. Raises User.DoesNotExist.
+        When the current profile revision stamp is known, cached copies of
+        an older revision count as misses.
+        """
+        if not users_settings.USER_CACHE_ENABLED:
+            return User.objects.get(pk=user_id)
+
+        user_id = User._meta.pk.to_python(user_id)
+        key = USER_CACHE_KEY.format(user_id)
+
+        user = self.local.get(key)
+        if self._is_current(user, revision):
+            self._count('local_hits')
+            return copy.copy(user)
+
+        user = self.shared.get(key)
+        if self._is_current(user, revision):
+            self._count('shared_hits')
+            self.local.set(key, user)
+            return copy.copy(user)
+
+        self._count('misses')
+        user = User.objects.get(pk=user_id)
+        self.shared.set(key, user, self.timeout())
+        self.local.set(key, user)
+        return copy.copy(user)
+
+    async def aget(self, user_id, revision=None):
+        """Async version of get()"""
+        if not users_settings.USER_CACHE_ENABLED:
+            return await User.objects.aget(pk=user_id)
+
+        user_id = User._meta.pk.to_python(user_id)
+        key = USER_CACHE_KEY.format(user_id)
+
+        user = self.local.get(key)
+        if self._is_current(user, revision):
+            self._count('local_hits')
+            return copy.copy(user)
+
+        user = await self.shared.aget(key)
+        if self._is_current(user, revision):
+            self._count('shared_hits')
+            self.local.set(key, user)
+            return copy.copy(user)
+
+        self._count('misses')
+        user = await User.objects.aget(pk=user_id)
+        await self.shared.aset(key, user, self.timeout())
+        self.local.set(key, user)
+        return copy.copy(user)
+
+    @staticmethod
+    def _is_current(user, revision):
+        if user is None:
+            return False
+        return revision is None or profile_stamp(user.updated_at) == revision
+
+    def invalidate(self, user_id):
+        """Drop a user from both tiers, again once the transaction commits"""
+        key = USER_CACHE_KEY.format(user_id)
+
+        def drop():
+            self.local.delete(key)
+            self.shared.delete(key)
+
+        drop()
+        transaction.on_commit(drop)
+        self._count('invalidations')
+
+    def clear_local(self):
+        """Empty the in-process tier (e.g. after settings change)"""
+        self._local = None
+
+    def reset_stats(self):
+        with self._stats_lock:
+            self._stats = dict.fromkeys(
+                ('local_hits', 'shared_hits', 'misses', 'invalidations'), 0
+            )
+
+    def stats(self):
+        """Return hit/miss counters and the hit ratio of this process"""
+        with self._stats_lock:
+            stats = dict(self._stats)
+        hits = stats['local_hits'] + stats['shared_hits']
+        lookups = hits + stats['misses']
+        stats['hit_ratio'] = hits / lookups if lookups else 0.0
+        stats['local_size'] = len(self.local)
+        return stats
+
+
+user_cache = UserCache()
@@ -0,0 +1,230 @@
+"""
+Admin Changelist for Large User Tables
+With USERS['ADMIN_SCALABLE_CHANGELIST'] on, UserAdmin's changelist stops
+costing a full table scan per page:
+- EstimatedCountPaginator: the unfiltered count comes from database
+  statistics, filtered lists are counted up to ADMIN_COUNT_LIMIT rows, and
+  the second "N total" count is not run
+- KeysetChangeList: "Next" links carry the last row's (created_at, id), so
+  the next page is an index range scan on users_created_id_idx however deep
+  it is; numbered pages past the first ones fetch their ids through the
+  same index before loading rows (deferred join)
+- only the displayed columns are loaded (the password hash stays behind)
+- CountedBooleanFilter: the Yes/No filters show how many users each one
+  matches, from one cached GROUP BY
+"""
+from django.contrib import admin
+from django.contrib.admin.views.main import ChangeList
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.core.paginator import EmptyPage, Paginator
+from django.db import connections
+from django.db.models import Count, Q, QuerySet
+from django.utils.functional import cached_property
+
+from .conf import users_settings
+from .tokens import profile_stamp, stamp_to_datetime
+
+User = get_user_model()
+
+CURSOR_VAR = 'after'
+FACET_CACHE_KEY = 'users:admin:facets'
+
+
+def estimated_count(queryset):
+    """Rows of the queryset's table according to database statistics, None when unknown"""
+    connection = connections[queryset.db]
+    table = queryset.model._meta.db_table
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute('SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass', [table])
+        elif connection.vendor == 'mysql':
+            cursor.execute(
+                'SELECT table_rows FROM information_schema.tables '
+                'WHERE table_schema = DATABASE() AND table_name = %s',
+                [table]
+            )
+        elif connection.vendor == 'sqlite':
+            # Statistics of the last ANALYZE / PRAGMA optimize ...
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'sqlite_stat1'")
+            if cursor.fetchone() is not None:
+                cursor.execute('SELECT stat FROM sqlite_stat1 WHERE tbl = %s LIMIT 1', [table])
+                row = cursor.fetchone()
+                if row is not None:
+                    return int(row[0].split()[0])
+            # ... else the highest rowid, one index seek (deleted rows included)
+            cursor.execute('SELECT MAX(rowid) FROM %s' % connection.ops.quote_name(table))
+        else:
+            return None
+        row = cursor.fetchone()
+    # PostgreSQL reports -1 for tables never analyzed
+    if row is None or row[0] is None or row[0] < 0:
+        return None
+    return int(row[0])
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator that never counts more than `count_limit` rows: an unfiltered
+    queryset is counted from database statistics, a filtered one exactly up
+    to the limit. Past that the count is an estimate, so pages beyond it are
+    served (possibly empty) rather than refused. Pages starting at
+    `deferred_join_offset` or later select their ids first, skipping index
+    entries instead of rows.
+    """
+    deferred_join_offset = 1000
+
+    def __init__(self, *args, count_limit=10000, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.count_limit = count_limit
+        self.estimated = False
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not isinstance(queryset, QuerySet):
+            return super().count
+        if not queryset.query.has_filters():
+            estimate = estimated_count(queryset)
+            if estimate is not None and estimate > self.count_limit:
+                self.estimated = True
+                return estimate
+        count = queryset.order_by()[:self.count_limit + 1].count()
+        if count > self.count_limit:
+            self.estimated = True
+        return count
+
+    def validate_number(self, number):
+        try:
+            return super().validate_number(number)
+        except EmptyPage:
+            # Past an estimate is not necessarily past the end
+            if self.estimated and int(number) > 1:
+                return int(number)
+            raise
+
+    def page(self, number):
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        top = bottom + self.per_page
+        if not self.estimated and top + self.orphans >= self.count:
+            top = self.count
+        object_list = self.object_list
+        if bottom >= self.deferred_join_offset and isinstance(object_list, QuerySet):
+            page_ids = list(object_list.values_list('pk', flat=True)[bottom:top])
+            object_list = object_list.filter(pk__in=page_ids)
+        else:
+            object_list = object_list[bottom:top]
+        return self._get_page(object_list, number, self)
+
+
+def encode_cursor(user):
+    return '%d.%d' % (profile_stamp(user.created_at), user.pk)
+
+
+def decode_cursor(value):
+    """(created_at, id) of a cursor, raises ValueError"""
+    stamp, pk = value.split('.')
+    return stamp_to_datetime(int(stamp)), int(pk)
+
+
+class KeysetChangeList(ChangeList):
+    """
+    ChangeList paging newest-first lists by keyset: ?after=<cursor> lists
+    the rows after the cursor's (created_at, id)
+    """
+    keyset_ordering = ('-created_at', '-pk')
+
+    def get_queryset(self, request):
+        # Links built from params (filters, sorting) start over from the top
+        self.cursor = self.params.pop(CURSOR_VAR, None)
+        queryset = super().get_queryset(request)
+        columns = self.display_columns()
+        return queryset.only(*columns) if columns else queryset
+
+    def display_columns(self):
+        """Fields the rows display, None when list_display needs more than fields"""
+        columns = {'pk', 'created_at'}
+        field_names = {field.name for field in self.lookup_opts.concrete_fields}
+        for name in self.list_display:
+            if name == 'action_checkbox':
+                continue
+            if name not in field_names:
+                return None
+            columns.add(name)
+        return sorted(columns)
+
+    @property
+    def is_keyset_ordered(self):
+        # The admin's ordering may be repeated by get_ordering()
+        return tuple(dict.fromkeys(self.queryset.query.order_by)) == self.keyset_ordering
+
+    def get_results(self, request):
+        after = None
+        if self.cursor and self.is_keyset_ordered:
+            try:
+                after = decode_cursor(self.cursor)
+            except ValueError:
+                pass
+
+        if after is None:
+            self.cursor = None
+            super().get_results(request)
+        else:
+            created_at, pk = after
+            self.paginator = self.model_admin.get_paginator(request, self.queryset, self.list_per_page)
+            self.result_count = self.paginator.count
+            # created_at <= first, so the OR stays a filter on an index range
+            self.result_list = self.queryset.filter(
+                Q(created_at__lt=created_at) | Q(pk__lt=pk),
+                created_at__lte=created_at
+            )[:self.list_per_page]
+            self.show_full_result_count = False
+            self.full_result_count = None
+            self.show_admin_actions = True
+            self.can_show_all = False
+            self.multi_page = True
+
+        self.next_cursor = None
+        if self.multi_page and not (self.show_all and self.can_show_all) and self.is_keyset_ordered:
+            self.result_list = list(self.result_list)
+            if len(self.result_list) == self.list_per_page:
+                self.next_cursor = encode_cursor(self.result_list[-1])
+
+    @property
+    def next_page_url(self):
+        if self.next_cursor is None:
+            return None
+        return self.get_query_string({CURSOR_VAR: self.next_cursor})
+
+    @property
+    def first_page_url(self):
+        return self.get_query_string()
+
+
+def facet_counts(fields):
+    """{field: {True: users, False: users}} of boolean fields, cached"""
+    cache = caches[users_settings.ADMIN_CACHE_ALIAS]
+    key = '%s:%s' % (FACET_CACHE_KEY, ','.join(fields))
+    counts = cache.get(key)
+    if counts is None:
+        counts = {field: {True: 0, False: 0} for field in fields}
+        # One scan for every field
+        for row in User.objects.order_by().values(*fields).annotate(users=Count('pk')):
+            for field in fields:
+                counts[field][row[field]] += row['users']
+        cache.set(key, counts, users_settings.ADMIN_FACET_CACHE_TIMEOUT)
+    return counts
+
+
+class CountedBooleanFilter(admin.BooleanFieldListFilter):
+    """Yes/No filter of one of `facet_fields`, showing the users of each choice"""
+    facet_fields = ('is_active', 'is_staff', 'is_superuser')
+
+    def choices(self, changelist):
+        counts = facet_counts(self.facet_fields).get(self.field.name, {})
+        values = (None, True, False)
+        for value, choice in zip(values, super().choices(changelist)):
+            if value is not None:
+                choice['display'] = '%s (%s)' % (choice['display'], format(counts.get(value, 0), ','))
+            yield choice
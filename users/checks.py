@@ -0,0 +1,39 @@
+"""
+Users App System Checks
+"""
+import os
+
+from django.core.checks import Error, Tags, register
+
+from .cache import is_process_local
+from .conf import users_settings
+
+# Caches whose entries are invalidated by the process that changes the data
+SHARED_CACHE_SETTINGS = ('TOKEN_STATE_CACHE_ALIAS', 'USER_CACHE_ALIAS', 'PERMISSION_CACHE_ALIAS')
+
+
+def worker_processes():
+    if users_settings.WORKER_PROCESSES is not None:
+        return users_settings.WORKER_PROCESSES
+    try:
+        return int(os.environ.get('WEB_CONCURRENCY', 1))
+    except ValueError:
+        return 1
+
+
+@register(Tags.caches)
+def check_shared_caches(app_configs, **kwargs):
+    """Several worker processes must share the caches holding revocable state"""
+    if worker_processes() <= 1:
+        return []
+    return [
+        Error(
+            "USERS['%s'] (%r) is a per-process LocMemCache, but %d worker processes are configured: "
+            "revocations and invalidations made by one worker would not reach the others."
+            % (name, getattr(users_settings, name), worker_processes()),
+            hint='Point it at a cache every worker shares (Redis, Memcached, database), e.g. set REDIS_URL.',
+            id='users.E001',
+        )
+        for name in SHARED_CACHE_SETTINGS
+        if is_process_local(getattr(users_settings, name))
+    ]
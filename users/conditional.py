@@ -0,0 +1,108 @@
+"""
+Conditional Requests for the Profile
+The profile's validators are derived from the user id and the stamp of
+its updated_at, which authentication already knows from the token state
+(users.authentication), so:
+- GET with If-None-Match / If-Modified-Since is answered 304 without a
+  query and without running the serializer
+- PUT/PATCH with If-Match are refused with 412 when the profile changed
+  since the client read it, checked again inside the write transaction so
+  two concurrent updates cannot both pass
+"""
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date, parse_etags
+
+from .authentication import LazyUser
+from .sqlite import write_queue
+from .tokens import profile_stamp, stamp_to_datetime
+
+User = get_user_model()
+
+
+def profile_revision(user):
+    """Stamp of the user's current profile revision"""
+    if isinstance(user, LazyUser):
+        return user.revision
+    return profile_stamp(user.updated_at)
+
+
+def profile_etag(user_id, revision):
+    """Strong ETag of a profile revision"""
+    return '"%s-%s"' % (user_id, revision)
+
+
+def _last_modified(revision):
+    return int(stamp_to_datetime(revision).timestamp())
+
+
+def not_modified(request, user):
+    """
+    The 304 (or 412) response for a conditional GET of the profile, None
+    when the full response must be sent
+    """
+    revision = profile_revision(user)
+    response = get_conditional_response(
+        request,
+        etag=profile_etag(user.pk, revision),
+        last_modified=_last_modified(revision)
+    )
+    if response is not None:
+        set_validators(response, user, revision)
+    return response
+
+
+def set_validators(response, user, revision=None):
+    """Add ETag and Last-Modified; the profile is private and revalidated"""
+    if revision is None:
+        revision = profile_revision(user)
+    response['ETag'] = profile_etag(user.pk, revision)
+    response['Last-Modified'] = http_date(_last_modified(revision))
+    patch_cache_control(response, private=True, no_cache=True)
+    patch_vary_headers(response, ('Authorization',))
+    return response
+
+
+def if_match(request):
+    """ETags of the If-Match header, None without one"""
+    header = request.META.get('HTTP_IF_MATCH')
+    if header is None:
+        return None
+    return parse_etags(header)
+
+
+def precondition_holds(etags, user, revision):
+    """Whether If-Match ETags allow updating the profile at `revision`"""
+    # Weak ETags never match (strong comparison)
+    return etags is None or '*' in etags or profile_etag(user.pk, revision) in etags
+
+
+def precondition_failed_payload():
+    """Response body of a 412 to an If-Match update"""
+    return {
+        "success": False,
+        "message": "Profile update failed",
+        "errors": {"detail": ["The profile has been modified since it was fetched"]}
+    }
+
+
+def save_unless_modified(user, revision, save):
+    """
+    Run save() if the stored profile is still at `revision`, in one write
+    transaction; returns whether it ran
+    """
+    def conditional_save():
+        with transaction.atomic():
+            updated_at = (
+                User.objects.select_for_update()
+                .filter(pk=user.pk)
+                .values_list('updated_at', flat=True)
+                .first()
+            )
+            if profile_stamp(updated_at) != revision:
+                return False
+            save()
+            return True
+
+    return write_queue.run(conditional_save)
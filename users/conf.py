@@ -0,0 +1,133 @@
+"""
+Users App Settings
+All options are namespaced in the USERS setting, for example:
+
+USERS = {
+    'TOKEN_STATE_CACHE_TIMEOUT': 60 * 60 * 24,
+}
+"""
+from django.conf import settings
+from django.core.signals import setting_changed
+from rest_framework.settings import APISettings as _APISettings
+
+DEFAULTS = {
+    # Stateless token authentication
+    'TOKEN_STATE_CACHE_ALIAS': 'default',
+    'TOKEN_STATE_CACHE_TIMEOUT': 60 * 60 * 24,  # 1 day
+
+    # Per-process caches (LocMemCache) only see the invalidations of their
+    # own process: users app entries in them expire after this many seconds
+    'LOCAL_CACHE_TIMEOUT': 5,
+    # Processes serving requests (None: $WEB_CONCURRENCY, else 1); more than
+    # one requires shared caches (users.E001)
+    'WORKER_PROCESSES': None,
+
+    # Verified JWT payloads, keyed by a digest of the raw token (users.tokens)
+    'VERIFIED_TOKEN_CACHE_ENABLED': False,
+    'VERIFIED_TOKEN_CACHE_MAXSIZE': 4096,
+
+    # Read-through user object cache
+    'USER_CACHE_ENABLED': True,
+    'USER_CACHE_ALIAS': 'default',
+    'USER_CACHE_TIMEOUT': 60 * 5,
+    'USER_CACHE_LOCAL_MAXSIZE': 1024,
+    'USER_CACHE_LOCAL_TTL': 30,
+
+    # Effective permissions (users.permissions)
+    'PERMISSION_CACHE_ALIAS': 'default',
+    'PERMISSION_CACHE_TIMEOUT': 60 * 60 * 24,  # 1 day
+
+    # Password hashing process pool
+    'HASHING_POOL_ENABLED': False,
+    'HASHING_POOL_WORKERS': None,
+    'HASHING_POOL_QUEUE_LIMIT': 32,
+    'HASHING_POOL_TIMEOUT': 10,
+
+    # User search index: 'auto' (FTS5 on SQLite when available), 'fts5' or 'table'
+    'SEARCH_BACKEND': 'auto',
+    'SEARCH_FUZZY_THRESHOLD': 0.3,
+
+    # Refresh token revocation
+    'REVOCATION_FILTER_ENABLED': True,
+    'REVOCATION_SYNC_INTERVAL': 1.0,
+    'REVOCATION_BUCKET_SECONDS': 60 * 60,
+    'REVOCATION_BUCKET_CAPACITY': 10000,
+    'REVOCATION_ERROR_RATE': 0.01,
+    'REVOCATION_PRUNE_INTERVAL': 60 * 60,
+    'REVOCATION_PRUNE_BATCH_SIZE': 1000,
+
+    # Write-behind last_login updates
+    'LAST_LOGIN_BUFFER_ENABLED': True,
+    'LAST_LOGIN_FLUSH_INTERVAL': 5,
+    'LAST_LOGIN_FLUSH_SIZE': 500,
+
+    # SQLite: PRAGMAs applied to new connections and the single-writer queue
+    'SQLITE_PRAGMAS': {},
+    'SQLITE_WRITE_QUEUE': False,
+
+    # Read replicas: database aliases for users app reads (empty: primary only)
+    'READ_REPLICAS': [],
+    'REPLICA_STICKY_SECONDS': 5,
+    'REPLICA_STICKY_CACHE_ALIAS': 'default',
+
+    # Request instrumentation (RequestMetricsMiddleware, /users/metrics/)
+    'METRICS_ENABLED': False,
+    'METRICS_SERVER_TIMING': True,
+    'METRICS_WINDOW_SECONDS': 60,
+    'METRICS_WINDOW_SLICES': 6,
+
+    # Middleware run only for some paths (users.middleware.RoutedMiddleware)
+    'ROUTED_MIDDLEWARE': [],
+    'ROUTED_MIDDLEWARE_PATHS': ['/admin/'],
+
+    # Rate limits of login, registration and token refresh (users.throttling)
+    'THROTTLE_ENABLED': False,
+    'THROTTLE_STORE': 'local',
+    'THROTTLE_CACHE_ALIAS': 'default',
+    'THROTTLE_LOCAL_MAX_KEYS': 100000,
+    'THROTTLE_RATES': {},
+
+    # Admin changelist for large tables (users.changelist)
+    'ADMIN_SCALABLE_CHANGELIST': False,
+    'ADMIN_COUNT_LIMIT': 10000,
+    'ADMIN_CACHE_ALIAS': 'default',
+    'ADMIN_FACET_CACHE_TIMEOUT': 60,
+
+    # /users/batch/
+    'BATCH_MAX_REQUESTS': 20,
+    'BATCH_WORKERS': 4,
+
+    # Lifecycle events outbox (users.events)
+    'EVENTS_ENABLED': False,
+    'EVENT_BATCH_SIZE': 500,
+    'EVENT_DISPATCH_INTERVAL': 0.5,
+    'EVENT_RETENTION': 60 * 60 * 24 * 7,  # 7 days
+    'EVENT_PAGE_SIZE': 100,
+    'EVENT_MAX_PAGE_SIZE': 1000,
+    'EVENT_POLL_TIMEOUT': 25,
+    'EVENT_POLL_INTERVAL': 0.5,
+}
+
+IMPORT_STRINGS = ()
+
+
+class APISettings(_APISettings):
+    """Settings object that only ever reads from the USERS namespace"""
+
+    @property
+    def user_settings(self):
+        if not hasattr(self, '_user_settings'):
+            self._user_settings = getattr(settings, 'USERS', {})
+        return self._user_settings
+
+
+users_settings = APISettings(None, DEFAULTS, IMPORT_STRINGS)
+
+
+def reload_users_settings(*args, **kwargs):
+    """Reload settings when USERS is overridden (e.g. in tests)"""
+    if kwargs['setting'] == 'USERS':
+        users_settings.reload()
+
+
+setting_changed.connect(reload_users_settings)
@@ -0,0 +1,268 @@
+"""
+User Lifecycle Events
+Change-data-capture of users through a transactional outbox, so downstream
+services read what changed after their last position instead of scanning
+users by updated_at:
+- writes: User.save() (registration, profile and password changes,
+  (de)activation), deletions and bulk imports add UserEvent rows in the
+  transaction of the change (USERS['EVENTS_ENABLED'])
+- dispatch: one Dispatcher process (manage.py dispatch_user_events) gives
+  new rows the next positions, oldest first, one batch per transaction,
+  appends them to JSONL sinks and deletes published events older than
+  EVENT_RETENTION
+- reads: GET /users/events/?after=<position>&wait=<seconds> (or
+  /users/async/events/) long-polls until events follow the position; a
+  JSONL sink is a local copy consumers resume from any position
+Row ids are allocated when a transaction inserts, not when it commits, so a
+reader following ids could pass a row that commits later. Positions are
+only given to committed rows by the dispatcher, so they never do.
+"""
+import asyncio
+import logging
+import os
+import time
+from datetime import timedelta
+
+from django.core.exceptions import ValidationError
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, close_old_connections, transaction
+from django.utils import timezone
+
+from .conf import users_settings
+from .models import UserEvent
+from .renderers import dumps, loads
+
+logger = logging.getLogger(__name__)
+
+
+def serialize(event):
+    return {
+        'position': event.position,
+        'kind': event.kind,
+        'user_id': event.user_id,
+        'payload': event.payload,
+        'created_at': event.created_at,
+    }
+
+
+def published(using=None):
+    return UserEvent.objects.using(using).filter(position__isnull=False)
+
+
+def last_position(using=None):
+    """Position of the newest published event, 0 when there is none"""
+    return published(using).order_by('-position').values_list('position', flat=True).first() or 0
+
+
+def _after(after, limit, using=None):
+    # A range scan on the position index, however large the table
+    return published(using).filter(position__gt=after).order_by('position')[:limit]
+
+
+def read_events(after=0, limit=None, using=None):
+    """Published events following position `after`, oldest first"""
+    return list(_after(after, limit or users_settings.EVENT_PAGE_SIZE, using))
+
+
+def wait_for_events(after=0, limit=None, timeout=0, using=None):
+    """read_events(), polling for up to `timeout` seconds until there are some"""
+    deadline = time.monotonic() + timeout
+    while True:
+        events = read_events(after, limit, using)
+        remaining = deadline - time.monotonic()
+        if events or remaining <= 0:
+            return events
+        time.sleep(min(users_settings.EVENT_POLL_INTERVAL, remaining))
+
+
+async def await_events(after=0, limit=None, timeout=0, using=None):
+    """Async version of wait_for_events (the event loop is free while waiting)"""
+    deadline = time.monotonic() + timeout
+    while True:
+        events = [event async for event in _after(after, limit or users_settings.EVENT_PAGE_SIZE, using)]
+        remaining = deadline - time.monotonic()
+        if events or remaining <= 0:
+            return events
+        await asyncio.sleep(min(users_settings.EVENT_POLL_INTERVAL, remaining))
+
+
+def parse_read_params(params):
+    """(after, limit, wait) of a query string; raises ValidationError"""
+    def integer(name, default, low, high):
+        value = params.get(name)
+        if value in (None, ''):
+            return default
+        try:
+            value = int(value)
+        except (TypeError, ValueError):
+            raise ValidationError('%s must be an integer' % name)
+        if not low <= value <= high:
+            raise ValidationError('%s must be between %d and %d' % (name, low, high))
+        return value
+
+    return (
+        integer('after', 0, 0, 2 ** 63 - 1),
+        integer('limit', users_settings.EVENT_PAGE_SIZE, 1, users_settings.EVENT_MAX_PAGE_SIZE),
+        integer('wait', 0, 0, users_settings.EVENT_POLL_TIMEOUT),
+    )
+
+
+def events_payload(events, after):
+    return {
+        'events': [serialize(event) for event in events],
+        # Where to resume: the last position read, or `after` again
+        'next': events[-1].position if events else after,
+    }
+
+
+def dispatch_batch(batch_size=None, using=DEFAULT_DB_ALIAS):
+    """Give the oldest unpublished events the next positions; returns them"""
+    events = UserEvent.objects.using(using)
+    batch_size = batch_size or users_settings.EVENT_BATCH_SIZE
+    with transaction.atomic(using=using):
+        pending = list(events.filter(position__isnull=True).order_by('pk')[:batch_size])
+        if not pending:
+            return []
+        position = last_position(using)
+        for event in pending:
+            position += 1
+            event.position = position
+        events.bulk_update(pending, ['position'])
+    return pending
+
+
+def prune_published(retention=None, batch_size=1000, using=DEFAULT_DB_ALIAS):
+    """
+    Delete published events older than `retention` seconds, oldest first;
+    returns how many. The newest event is always kept: dispatch_batch()
+    numbers on from it, so positions are never reused.
+    """
+    if retention is None:
+        retention = users_settings.EVENT_RETENTION
+    cutoff = timezone.now() - timedelta(seconds=retention)
+    newest = last_position(using)
+    deleted = 0
+    while True:
+        rows = (
+            published(using).filter(position__lt=newest).order_by('position')
+            .values_list('pk', 'created_at')[:batch_size]
+        )
+        expired = [pk for pk, created_at in rows if created_at < cutoff]
+        if expired:
+            deleted += UserEvent.objects.using(using).filter(pk__in=expired).delete()[0]
+        if len(expired) < batch_size:
+            return deleted
+
+
+class JsonlSink:
+    """
+    Append-only JSONL file of the stream, one event per line in position
+    order. It resumes after the position of its last complete line, so it
+    can be stopped, restarted or created late (it catches up on whatever
+    the outbox still retains).
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.position = self._recover()
+
+    def _recover(self):
+        """Position of the last complete line; drops a line cut short by a crash"""
+        try:
+            file = open(self.path, 'rb+')
+        except FileNotFoundError:
+            return 0
+        with file:
+            end = file.seek(0, os.SEEK_END)
+            tail = b''
+            start = end
+            # Read backwards until the tail holds a whole line
+            while start > 0 and tail.count(b'\n') < 2:
+                start = max(0, start - 65536)
+                file.seek(start)
+                tail = file.read(end - start)
+            if tail and not tail.endswith(b'\n'):
+                complete = tail.rfind(b'\n') + 1
+                file.truncate(start + complete)
+                tail = tail[:complete]
+            lines = tail.splitlines()
+            return loads(lines[-1])['position'] if lines else 0
+
+    def write(self, events):
+        """Append events following the file's position (others are skipped)"""
+        lines = [dumps(serialize(event)) + b'\n' for event in events if event.position > self.position]
+        if not lines:
+            return 0
+        with open(self.path, 'ab') as file:
+            file.writelines(lines)
+            file.flush()
+            os.fsync(file.fileno())
+        self.position = max(event.position for event in events)
+        return len(lines)
+
+    def sync(self, using=None):
+        """Append every published event after the file's position; returns how many"""
+        written = 0
+        while True:
+            events = read_events(self.position, users_settings.EVENT_BATCH_SIZE, using)
+            if not events:
+                return written
+            written += self.write(events)
+
+
+def read_jsonl(path, after=0):
+    """Events (dicts) of a JSONL sink following position `after`"""
+    with open(path, 'rb') as file:
+        for line in file:
+            if not line.endswith(b'\n'):
+                return  # still being written
+            event = loads(line)
+            if event['position'] > after:
+                yield event
+
+
+class Dispatcher:
+    """
+    Publishing loop: numbers new events a batch at a time, keeps the sinks
+    up to date and prunes expired events. Run one per database.
+    """
+    prune_interval = 60 * 60
+
+    def __init__(self, batch_size=None, sinks=(), prune=True, using=DEFAULT_DB_ALIAS):
+        self.batch_size = batch_size or users_settings.EVENT_BATCH_SIZE
+        self.sinks = list(sinks)
+        self.prune = prune
+        self.using = using
+        self._pruned_at = None
+
+    def run_once(self):
+        """One round: dispatch a batch, sync the sinks, prune when due; returns events dispatched"""
+        # Long-running process: honour CONN_MAX_AGE like the request cycle does
+        close_old_connections()
+        try:
+            events = dispatch_batch(self.batch_size, self.using)
+        except DatabaseError:
+            # Lost a race with a writer (SQLite) or another dispatcher: retry
+            logger.warning('Dispatching user events failed, retrying', exc_info=True)
+            return 0
+        for sink in self.sinks:
+            sink.sync(self.using)
+        if self.prune and (self._pruned_at is None or time.monotonic() - self._pruned_at >= self.prune_interval):
+            self._pruned_at = time.monotonic()
+            deleted = prune_published(using=self.using)
+            if deleted:
+                logger.info('Pruned %d published user events', deleted)
+        return len(events)
+
+    def run(self, interval=None, once=False):
+        """Dispatch until interrupted (or, with once, until nothing is pending); returns events dispatched"""
+        if interval is None:
+            interval = users_settings.EVENT_DISPATCH_INTERVAL
+        total = 0
+        while True:
+            dispatched = self.run_once()
+            total += dispatched
+            # Full batches mean more are waiting: no pause
+            if dispatched < self.batch_size:
+                if once:
+                    return total
+                time.sleep(interval)
@@ -0,0 +1,59 @@
+"""
+API Exception Handling
+"""
+import math
+
+from rest_framework import status
+from rest_framework.exceptions import Throttled
+from rest_framework.response import Response
+from rest_framework.views import exception_handler as drf_exception_handler
+
+from .hashing import HashingPoolBusy
+
+
+def hashing_busy_payload(exc):
+    """Response body returned when the hashing pool is saturated"""
+    return {
+        "success": False,
+        "message": "Service temporarily unavailable, please retry",
+        "errors": {"detail": [str(exc)]}
+    }
+
+
+def throttled_payload(exc):
+    """Response body returned when a rate limit is exceeded"""
+    return {
+        "success": False,
+        "message": "Too many requests, please retry later",
+        "errors": {"detail": [str(exc.detail)]}
+    }
+
+
+def throttled_headers(exc):
+    """Retry-After hint of a Throttled exception"""
+    if exc.wait is None:
+        return {}
+    return {'Retry-After': '%d' % math.ceil(exc.wait)}
+
+
+def exception_handler(exc, context):
+    """
+    DRF exception handler that also turns a saturated hashing pool into a
+    fast 503 with a Retry-After hint, and rate limited requests into 429s
+    in the API's response format.
+    """
+    if isinstance(exc, HashingPoolBusy):
+        return Response(
+            hashing_busy_payload(exc),
+            status=status.HTTP_503_SERVICE_UNAVAILABLE,
+            headers={'Retry-After': '1'}
+        )
+
+    if isinstance(exc, Throttled):
+        return Response(
+            throttled_payload(exc),
+            status=exc.status_code,
+            headers=throttled_headers(exc)
+        )
+
+    return drf_exception_handler(exc, context)
@@ -0,0 +1,184 @@
+"""
+Bounded Process Pool for Password Hashing
+PBKDF2 is CPU bound, so hashing on the request thread caps throughput at
+cores x (1 / hash time). Hash work is sent to a process pool with a fixed
+number of slots; when every slot is taken callers fail fast instead of
+piling up blocked workers.
+"""
+import asyncio
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth import hashers
+
+from .conf import users_settings
+from .instrumentation import timed
+
+
+class HashingPoolBusy(Exception):
+    """Raised when the hashing pool has no free slot"""
+
+
+def _init_worker(settings_module):
+    """Configure Django in a spawned worker and warm the default hasher"""
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', settings_module)
+    import django
+    django.setup()
+    hashers.get_hasher('default')
+
+
+def _verify(password, encoded):
+    """Check a password; returns (is_correct, must_update)"""
+    if password is None or not hashers.is_password_usable(encoded):
+        return False, False
+    try:
+        hasher = hashers.identify_hasher(encoded)
+    except ValueError:
+        return False, False
+
+    preferred = hashers.get_hasher('default')
+    hasher_changed = hasher.algorithm != preferred.algorithm
+    must_update = hasher_changed or preferred.must_update(encoded)
+    is_correct = hasher.verify(password, encoded)
+
+    # Same timing mitigation as django.contrib.auth.hashers.check_password
+    if not is_correct and not hasher_changed and must_update:
+        hasher.harden_runtime(password, encoded)
+
+    return is_correct, must_update
+
+
+class HashingPool:
+    """
+    Process pool with `workers` processes and `queue_limit` extra waiting
+    slots per server process. Created lazily, and re-created after a fork.
+    """
+
+    def __init__(self):
+        self._executor = None
+        self._slots = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return users_settings.HASHING_POOL_ENABLED
+
+    def _ensure_started(self):
+        if self._executor is not None and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._executor is not None and self._pid == os.getpid():
+                return
+            workers = users_settings.HASHING_POOL_WORKERS or os.cpu_count() or 1
+            self._executor = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_init_worker,
+                initargs=(os.environ.get('DJANGO_SETTINGS_MODULE', ''),)
+            )
+            self._slots = threading.BoundedSemaphore(
+                workers + users_settings.HASHING_POOL_QUEUE_LIMIT
+            )
+            self._pid = os.getpid()
+
+    def run(self, fn, *args):
+        """Run fn(*args) in the pool and wait for the result"""
+        future = self._submit(fn, *args)
+        try:
+            return future.result(timeout=users_settings.HASHING_POOL_TIMEOUT)
+        except FutureTimeoutError:
+            future.cancel()
+            raise HashingPoolBusy('Password hashing timed out')
+        except BrokenProcessPool:
+            # A worker died; start a fresh pool on the next call
+            self.shutdown(wait=False)
+            raise HashingPoolBusy('Password hashing pool is restarting')
+
+    async def arun(self, fn, *args):
+        """Run fn(*args) in the pool without blocking the event loop"""
+        future = asyncio.wrap_future(self._submit(fn, *args))
+        try:
+            return await asyncio.wait_for(future, users_settings.HASHING_POOL_TIMEOUT)
+        except asyncio.TimeoutError:
+            raise HashingPoolBusy('Password hashing timed out')
+        except BrokenProcessPool:
+            self.shutdown(wait=False)
+            raise HashingPoolBusy('Password hashing pool is restarting')
+
+    def _submit(self, fn, *args):
+        self._ensure_started()
+        slots = self._slots
+        if not slots.acquire(blocking=False):
+            raise HashingPoolBusy('All password hashing slots are busy')
+
+        try:
+            future = self._executor.submit(fn, *args)
+        except BaseException as exc:
+            slots.release()
+            if isinstance(exc, BrokenProcessPool):
+                self.shutdown(wait=False)
+                raise HashingPoolBusy('Password hashing pool is restarting')
+            raise
+        future.add_done_callback(lambda f: slots.release())
+        return future
+
+    def shutdown(self, wait=True):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=wait, cancel_futures=True)
+            self._executor = None
+            self._pid = None
+
+
+hashing_pool = HashingPool()
+
+
+def make_password(password, salt=None, hasher='default'):
+    """Pooled equivalent of django.contrib.auth.hashers.make_password"""
+    with timed('hashing'):
+        if not hashing_pool.enabled or password is None:
+            return hashers.make_password(password, salt, hasher)
+        return hashing_pool.run(hashers.make_password, password, salt, hasher)
+
+
+def check_password(password, encoded, setter=None):
+    """Pooled equivalent of django.contrib.auth.hashers.check_password"""
+    with timed('hashing'):
+        if not hashing_pool.enabled:
+            is_correct, must_update = _verify(password, encoded)
+        else:
+            is_correct, must_update = hashing_pool.run(_verify, password, encoded)
+
+    if setter and is_correct and must_update:
+        setter(password)
+    return is_correct
+
+
+async def amake_password(password, salt=None, hasher='default'):
+    """make_password that never runs PBKDF2 on the event loop"""
+    with timed('hashing'):
+        if not hashing_pool.enabled or password is None:
+            return await sync_to_async(hashers.make_password, thread_sensitive=False)(
+                password, salt, hasher
+            )
+        return await hashing_pool.arun(hashers.make_password, password, salt, hasher)
+
+
+async def acheck_password(password, encoded, setter=None):
+    """check_password that never runs PBKDF2 on the event loop; setter is async"""
+    with timed('hashing'):
+        if not hashing_pool.enabled:
+            is_correct, must_update = await sync_to_async(_verify, thread_sensitive=False)(
+                password, encoded
+            )
+        else:
+            is_correct, must_update = await hashing_pool.arun(_verify, password, encoded)
+
+    if setter and is_correct and must_update:
+        await setter(password)
+    return is_correct
@@ -0,0 +1,239 @@
+"""
+Streaming Bulk User Import
+Rows are read lazily, validated, de-duplicated against the database one
+batch at a time, hashed across a process pool and inserted with
+bulk_create, so memory use depends on the batch size and not on the file.
+"""
+import csv
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+from django.contrib.auth.hashers import make_password
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import IntegrityError, transaction
+
+from .hashing import _init_worker
+from .conf import users_settings
+from .models import UserEvent, UserManager
+from .search import search_index
+
+TRUE_VALUES = {'1', 'true', 't', 'yes', 'y'}
+
+
+def read_csv(path):
+    """Yield (line_number, row) from a CSV file with a header row"""
+    with open(path, newline='', encoding='utf-8') as handle:
+        reader = csv.DictReader(handle)
+        for row in reader:
+            yield reader.line_num, row
+
+
+def read_jsonl(path):
+    """Yield (line_number, row) from a JSON Lines file"""
+    with open(path, encoding='utf-8') as handle:
+        for line_number, line in enumerate(handle, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError as exc:
+                row = {'__error__': 'Invalid JSON: %s' % exc}
+            yield line_number, row
+
+
+READERS = {
+    'csv': read_csv,
+    'jsonl': read_jsonl,
+}
+
+
+def _as_bool(value, default):
+    if value is None or value == '':
+        return default
+    if isinstance(value, bool):
+        return value
+    return str(value).strip().lower() in TRUE_VALUES
+
+
+def clean_row(row):
+    """Validate and normalize one input row; raises ValidationError"""
+    if not isinstance(row, dict):
+        raise ValidationError('Row must be an object')
+    if '__error__' in row:
+        raise ValidationError(row['__error__'])
+
+    email = UserManager.normalize_email(str(row.get('email') or ''))
+    if not email:
+        raise ValidationError('Email is required')
+    if len(email) > 255:
+        raise ValidationError('Email is longer than 255 characters')
+    validate_email(email)
+
+    full_name = (row.get('full_name') or '').strip()
+    if len(full_name) > 150:
+        raise ValidationError('Full name is longer than 150 characters')
+
+    return {
+        'email': email,
+        'full_name': full_name,
+        'password': row.get('password') or None,
+        'is_active': _as_bool(row.get('is_active'), True),
+        'is_staff': _as_bool(row.get('is_staff'), False),
+    }
+
+
+def _batches(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+class ImportResult:
+    """Counters of a bulk import run"""
+
+    def __init__(self):
+        self.processed = 0
+        self.created = 0
+        self.duplicates = 0
+        self.errors = 0
+        self.started = time.perf_counter()
+
+    @property
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    @property
+    def rows_per_sec(self):
+        elapsed = self.elapsed
+        return self.processed / elapsed if elapsed else 0.0
+
+    def as_dict(self):
+        return {
+            'processed': self.processed,
+            'created': self.created,
+            'duplicates': self.duplicates,
+            'errors': self.errors,
+            'elapsed_s': round(self.elapsed, 3),
+            'rows_per_sec': round(self.rows_per_sec, 1),
+        }
+
+
+def bulk_import(manager, rows, batch_size=1000, hash_workers=None,
+                on_error=None, on_batch=None):
+    """
+    Create users from an iterable of (line_number, row) pairs.
+
+    on_error(line_number, email, message) is called for every rejected row
+    (invalid or duplicate); on_batch(result) after every committed batch.
+    Returns an ImportResult.
+    """
+    result = ImportResult()
+    model = manager.model
+
+    def reject(line_number, email, message, duplicate=False):
+        if duplicate:
+            result.duplicates += 1
+        else:
+            result.errors += 1
+        if on_error:
+            on_error(line_number, email, message)
+
+    executor = ProcessPoolExecutor(
+        max_workers=hash_workers,
+        mp_context=multiprocessing.get_context('spawn'),
+        initializer=_init_worker,
+        initargs=(os.environ.get('DJANGO_SETTINGS_MODULE', ''),)
+    )
+    try:
+        for batch in _batches(rows, batch_size):
+            result.processed += len(batch)
+
+            # Validate and de-duplicate within the batch
+            cleaned = {}
+            for line_number, row in batch:
+                try:
+                    data = clean_row(row)
+                except ValidationError as exc:
+                    email = row.get('email') if isinstance(row, dict) else None
+                    reject(line_number, email, '; '.join(exc.messages))
+                    continue
+                if data['email'] in cleaned:
+                    reject(line_number, data['email'], 'Duplicate email in file', duplicate=True)
+                    continue
+                cleaned[data['email']] = (line_number, data)
+
+            # De-duplicate against the database (earlier batches included);
+            # stored emails are canonical, so this probes the unique index
+            existing = set(
+                manager.filter(email__in=list(cleaned)).values_list('email', flat=True)
+            )
+            for email in existing:
+                line_number, _ = cleaned.pop(email)
+                reject(line_number, email, 'A user with this email already exists.', duplicate=True)
+
+            if not cleaned:
+                continue
+
+            entries = list(cleaned.values())
+            passwords = [data.pop('password') for _, data in entries]
+            chunksize = max(1, len(passwords) // ((hash_workers or os.cpu_count() or 1) * 4))
+            hashed = executor.map(make_password, passwords, chunksize=chunksize)
+
+            users = []
+            for (line_number, data), encoded in zip(entries, hashed):
+                users.append(model(password=encoded, **data))
+
+            result.created += _insert(manager, users, entries, reject)
+            if on_batch:
+                on_batch(result)
+    finally:
+        executor.shutdown(cancel_futures=True)
+
+    return result
+
+
+def _insert(manager, users, entries, reject):
+    """Insert a batch in one transaction; fall back to row by row on conflict"""
+    try:
+        with transaction.atomic(using=manager.db):
+            manager.bulk_create(users)
+            missing = [user for user in users if user.pk is None]
+            if missing:
+                # The backend returns no ids from bulk inserts (e.g. MySQL)
+                ids = dict(manager.filter(email__in=[user.email for user in missing]).values_list('email', 'pk'))
+                for user in missing:
+                    user.pk = ids[user.email]
+            # bulk_create sends no post_save, so index the new users here
+            search_index.index_rows(
+                [(user.pk, user.email, user.full_name) for user in users],
+                using=manager.db
+            )
+            if users_settings.EVENTS_ENABLED:
+                UserEvent.record(
+                    [(UserEvent.CREATED, user.pk, user.created_payload()) for user in users],
+                    using=manager.db
+                )
+        return len(users)
+    except IntegrityError:
+        pass
+
+    # Another writer registered one of the emails meanwhile
+    created = 0
+    with transaction.atomic(using=manager.db):
+        for user, (line_number, data) in zip(users, entries):
+            try:
+                with transaction.atomic(using=manager.db):
+                    user.save(using=manager.db)
+                created += 1
+            except IntegrityError:
+                reject(line_number, data['email'], 'A user with this email already exists.', duplicate=True)
+    return created
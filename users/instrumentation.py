@@ -0,0 +1,323 @@
+"""
+Request Instrumentation
+With USERS['METRICS_ENABLED'] on, RequestMetricsMiddleware records for
+every request, per endpoint (URL name) and method:
+- wall time
+- database queries and their time (an execute wrapper on every connection)
+- time spent in named phases: password hashing, JWT encode/decode,
+  waiting on the SQLite writer, response rendering
+Observations go to in-memory histograms exposed in the Prometheus text
+format by /users/metrics/, and the request's own numbers are returned in a
+Server-Timing header. Metrics are kept per server process.
+"""
+import bisect
+import threading
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.core.exceptions import MiddlewareNotUsed
+from django.core.signals import setting_changed
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+from .conf import users_settings
+
+DURATION_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+QUANTILES = (0.5, 0.95, 0.99)
+
+# Metric name -> (help, buckets)
+METRICS = {
+    'users_request_duration_seconds': ('Request wall time', DURATION_BUCKETS),
+    'users_request_db_queries': ('Database queries per request', QUERY_BUCKETS),
+    'users_request_db_seconds': ('Time spent in database queries per request', DURATION_BUCKETS),
+    'users_request_phase_seconds': ('Time spent in a phase of the request', DURATION_BUCKETS),
+}
+
+_current = ContextVar('users_request_timings', default=None)
+
+
+class RequestTimings:
+    """What one request spent its time on"""
+    __slots__ = ('phases', 'queries', 'query_time')
+
+    def __init__(self):
+        self.phases = {}
+        self.queries = 0
+        self.query_time = 0.0
+
+    def add(self, phase, seconds):
+        self.phases[phase] = self.phases.get(phase, 0.0) + seconds
+
+
+def current_timings():
+    """Timings of the request being handled, None outside of one"""
+    return _current.get()
+
+
+class timed:
+    """Add the time spent in a block to a phase of the current request"""
+    __slots__ = ('phase', 'timings', 'start')
+
+    def __init__(self, phase):
+        self.phase = phase
+
+    def __enter__(self):
+        self.timings = _current.get()
+        if self.timings is not None:
+            self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        if self.timings is not None:
+            self.timings.add(self.phase, time.perf_counter() - self.start)
+
+
+def query_timer(execute, sql, params, many, context):
+    """connection.execute_wrapper counting queries of the current request"""
+    timings = _current.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timings.queries += 1
+        timings.query_time += time.perf_counter() - start
+
+
+@receiver(connection_created)
+def install_query_timer(sender, connection, **kwargs):
+    """Time the queries of every connection, whatever the alias or thread"""
+    if users_settings.METRICS_ENABLED and query_timer not in connection.execute_wrappers:
+        connection.execute_wrappers.append(query_timer)
+
+
+class Histogram:
+    """
+    Prometheus histogram (cumulative since the process started) which also
+    keeps the observations of the last `window` seconds, in `slices`
+    rotating slices, for rolling quantiles. Not thread safe: MetricsRegistry
+    serializes access.
+    """
+
+    def __init__(self, buckets, window=60, slices=6):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self.slice_seconds = window / slices
+        self.slices = [[0] * (len(buckets) + 1) for _ in range(slices)]
+        self.slice_ids = [None] * slices
+
+    def observe(self, value, now):
+        index = bisect.bisect_left(self.buckets, value)
+        self.counts[index] += 1
+        self.sum += value
+        self.count += 1
+        slice_id = int(now // self.slice_seconds)
+        position = slice_id % len(self.slices)
+        if self.slice_ids[position] != slice_id:
+            self.slices[position] = [0] * len(self.counts)
+            self.slice_ids[position] = slice_id
+        self.slices[position][index] += 1
+
+    def window_counts(self, now):
+        """Bucket counts (not cumulative) of the rolling window"""
+        oldest = int(now // self.slice_seconds) - len(self.slices)
+        counts = [0] * len(self.counts)
+        for slice_id, slice_counts in zip(self.slice_ids, self.slices):
+            if slice_id is not None and slice_id > oldest:
+                counts = [a + b for a, b in zip(counts, slice_counts)]
+        return counts
+
+    def quantile(self, q, now):
+        """Estimate of the q-quantile over the window (linear within a bucket)"""
+        counts = self.window_counts(now)
+        total = sum(counts)
+        if not total:
+            return 0.0
+        rank = q * total
+        seen = 0
+        for index, count in enumerate(counts):
+            if count and seen + count >= rank:
+                if index == len(self.buckets):
+                    return self.buckets[-1]
+                lower = self.buckets[index - 1] if index else 0.0
+                upper = self.buckets[index]
+                return lower + (upper - lower) * (rank - seen) / count
+            seen += count
+        return self.buckets[-1]
+
+
+def _format_labels(labels):
+    return ','.join('%s="%s"' % (name, str(value).replace('\\', '\\\\').replace('"', '\\"'))
+                    for name, value in labels)
+
+
+def _format_number(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class MetricsRegistry:
+    """Histograms by metric name and label values, behind one lock"""
+
+    def __init__(self):
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def _histogram(self, name, labels):
+        key = (name, labels)
+        histogram = self._histograms.get(key)
+        if histogram is None:
+            histogram = self._histograms[key] = Histogram(
+                METRICS[name][1],
+                users_settings.METRICS_WINDOW_SECONDS,
+                users_settings.METRICS_WINDOW_SLICES
+            )
+        return histogram
+
+    def observe(self, name, labels, value):
+        """Record a value for label values ((name, value), ...)"""
+        now = time.monotonic()
+        with self._lock:
+            self._histogram(name, labels).observe(value, now)
+
+    def record_request(self, endpoint, method, timings, duration):
+        """Record everything measured for one request"""
+        now = time.monotonic()
+        labels = (('endpoint', endpoint), ('method', method))
+        with self._lock:
+            self._histogram('users_request_duration_seconds', labels).observe(duration, now)
+            self._histogram('users_request_db_queries', labels).observe(timings.queries, now)
+            self._histogram('users_request_db_seconds', labels).observe(timings.query_time, now)
+            for phase, seconds in timings.phases.items():
+                self._histogram(
+                    'users_request_phase_seconds', labels + (('phase', phase),)
+                ).observe(seconds, now)
+
+    def reset(self):
+        with self._lock:
+            self._histograms = {}
+
+    def _snapshot(self):
+        now = time.monotonic()
+        with self._lock:
+            return [
+                (name, labels, list(histogram.counts), histogram.sum, histogram.count,
+                 [histogram.quantile(q, now) for q in QUANTILES], histogram.buckets)
+                for (name, labels), histogram in sorted(self._histograms.items())
+            ]
+
+    def render(self):
+        """Prometheus text exposition format (version 0.0.4)"""
+        snapshot = self._snapshot()
+        lines = []
+        for name, (help_text, _) in METRICS.items():
+            series = [row[1:] for row in snapshot if row[0] == name]
+            if not series:
+                continue
+            lines.append('# HELP %s %s' % (name, help_text))
+            lines.append('# TYPE %s histogram' % name)
+            for labels, counts, total, count, _, buckets in series:
+                cumulative = 0
+                for bound, bucket_count in zip(buckets + (float('inf'),), counts):
+                    cumulative += bucket_count
+                    lines.append('%s_bucket{%s} %d' % (
+                        name, _format_labels(labels + (('le', _format_number(bound)),)), cumulative
+                    ))
+                lines.append('%s_sum{%s} %s' % (name, _format_labels(labels), repr(total)))
+                lines.append('%s_count{%s} %d' % (name, _format_labels(labels), count))
+
+            window = '%s_window' % name
+            lines.append('# HELP %s %s, quantiles over the last %ss' % (
+                window, help_text, users_settings.METRICS_WINDOW_SECONDS
+            ))
+            lines.append('# TYPE %s gauge' % window)
+            for labels, _, _, _, quantiles, _ in series:
+                for q, value in zip(QUANTILES, quantiles):
+                    lines.append('%s{%s} %s' % (
+                        window, _format_labels(labels + (('quantile', q),)), repr(value)
+                    ))
+        return '\n'.join(lines) + '\n'
+
+
+metrics = MetricsRegistry()
+
+
+def reset_metrics(*args, **kwargs):
+    if kwargs['setting'] == 'USERS':
+        metrics.reset()
+
+
+setting_changed.connect(reset_metrics)
+
+
+def server_timing(timings, duration):
+    """Server-Timing header value, durations in milliseconds"""
+    entries = ['db;dur=%.2f;desc="%d queries"' % (timings.query_time * 1000, timings.queries)]
+    entries += ['%s;dur=%.2f' % (phase, seconds * 1000) for phase, seconds in timings.phases.items()]
+    entries.append('total;dur=%.2f' % (duration * 1000))
+    return ', '.join(entries)
+
+
+class RequestMetricsMiddleware:
+    """
+    Time each request; place it first in MIDDLEWARE so the whole stack is
+    measured. Removed from the stack unless USERS['METRICS_ENABLED'] is on.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not users_settings.METRICS_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        timings = RequestTimings()
+        token = _current.set(timings)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self._finish(request, response, timings, time.perf_counter() - start)
+
+    async def __acall__(self, request):
+        timings = RequestTimings()
+        token = _current.set(timings)
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self._finish(request, response, timings, time.perf_counter() - start)
+
+    def process_template_response(self, request, response):
+        """Time the rendering of DRF and template responses"""
+        timings = _current.get()
+        if timings is not None:
+            start = time.perf_counter()
+            response.add_post_render_callback(
+                lambda rendered: timings.add('render', time.perf_counter() - start)
+            )
+        return response
+
+    def _finish(self, request, response, timings, duration):
+        match = request.resolver_match
+        endpoint = match.view_name if match is not None else 'unmatched'
+        metrics.record_request(endpoint, request.method, timings, duration)
+        if users_settings.METRICS_SERVER_TIMING:
+            response['Server-Timing'] = server_timing(timings, duration)
+        return response
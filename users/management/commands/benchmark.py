@@ -0,0 +1,33 @@
+"""
+Run one of the users app benchmarks against a throwaway database
+"""
+import json
+from importlib import import_module
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+
+from users.benchmarks import BENCHMARKS
+
+
+class Command(BaseCommand):
+    help = 'Run a users app benchmark (%s)' % ', '.join(BENCHMARKS)
+
+    def add_arguments(self, parser):
+        parser.add_argument('--json', action='store_true', help='Print results as JSON')
+        subparsers = parser.add_subparsers(dest='benchmark', required=True)
+        for name, module_path in BENCHMARKS.items():
+            module = import_module(module_path)
+            subparser = subparsers.add_parser(name, help=(module.__doc__ or '').strip().splitlines()[0])
+            module.add_arguments(subparser)
+
+    def handle(self, *args, **options):
+        module = import_module(BENCHMARKS[options['benchmark']])
+        # Benchmarks send every request from one address: rate limits stay
+        # off unless the benchmark itself turns them on
+        users_settings = {**getattr(settings, 'USERS', {}), 'THROTTLE_ENABLED': False}
+        with override_settings(USERS=users_settings):
+            results = module.run(self.stdout, **options)
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2, default=str))
@@ -0,0 +1,39 @@
+"""
+Publish the user lifecycle events outbox (see users.events)
+"""
+from django.core.management.base import BaseCommand
+
+from users.conf import users_settings
+from users.events import Dispatcher, JsonlSink
+
+
+class Command(BaseCommand):
+    help = 'Give new user events their stream positions and append them to JSONL files, until interrupted'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=users_settings.EVENT_BATCH_SIZE,
+            help='Events numbered per transaction'
+        )
+        parser.add_argument(
+            '--interval', type=float, default=users_settings.EVENT_DISPATCH_INTERVAL,
+            help='Seconds between polls when no events are pending'
+        )
+        parser.add_argument(
+            '--sink', action='append', default=[], metavar='PATH',
+            help='JSONL file kept up to date with the stream (repeatable), resumed from its last line'
+        )
+        parser.add_argument('--once', action='store_true', help='Exit once no events are pending')
+        parser.add_argument('--no-prune', action='store_true', help='Keep events older than EVENT_RETENTION')
+
+    def handle(self, *args, **options):
+        dispatcher = Dispatcher(
+            batch_size=options['batch_size'],
+            sinks=[JsonlSink(path) for path in options['sink']],
+            prune=not options['no_prune']
+        )
+        try:
+            dispatched = dispatcher.run(interval=options['interval'], once=options['once'])
+        except KeyboardInterrupt:
+            return
+        self.stdout.write(self.style.SUCCESS('Dispatched %d user events' % dispatched))
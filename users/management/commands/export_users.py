@@ -0,0 +1,34 @@
+"""
+Stream users to a CSV or JSON Lines file
+"""
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+
+from users.exporting import DATETIME_FILTERS, ENCODERS, export_users, parse_filters
+
+
+class Command(BaseCommand):
+    help = 'Export users in (created_at, id) order without loading the table into memory'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=sorted(ENCODERS), default='jsonl')
+        parser.add_argument('--output', '-o', help='Output file (default: stdout)')
+        parser.add_argument('--chunk-size', type=int, default=2000, help='Rows per keyset page')
+        parser.add_argument('--is-active', dest='is_active', metavar='true|false')
+        parser.add_argument('--is-staff', dest='is_staff', metavar='true|false')
+        for name in DATETIME_FILTERS:
+            parser.add_argument('--%s' % name.replace('_', '-'), dest=name, metavar='ISO8601')
+
+    def handle(self, *args, **options):
+        try:
+            lookups = parse_filters(options)
+        except ValidationError as e:
+            raise CommandError('; '.join(e.messages))
+
+        lines = export_users(options['format'], lookups, options['chunk_size'])
+        if options['output']:
+            with open(options['output'], 'w', newline='', encoding='utf-8') as handle:
+                handle.writelines(lines)
+        else:
+            for line in lines:
+                self.stdout.write(line, ending='')
@@ -0,0 +1,66 @@
+"""
+Bulk import users from a CSV or JSON Lines file
+"""
+import csv
+import json
+import sys
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from users.importing import READERS
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        'Stream users from a CSV (header: email,full_name,password,is_active,is_staff) '
+        'or JSONL file and create them in batches'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='File to import')
+        parser.add_argument('--format', choices=sorted(READERS), help='Defaults to the file extension')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Rows per transaction')
+        parser.add_argument('--workers', type=int, default=None, help='Hashing processes (default: CPUs)')
+        parser.add_argument('--errors', help='Write rejected rows to this CSV file ("-" for stderr)')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        file_format = options['format'] or path.rsplit('.', 1)[-1].lower()
+        if file_format not in READERS:
+            raise CommandError('Unknown format %r, use --format' % file_format)
+
+        errors_handle = None
+        if options['errors'] == '-':
+            errors_handle = sys.stderr
+        elif options['errors']:
+            errors_handle = open(options['errors'], 'w', newline='', encoding='utf-8')
+        errors_writer = csv.writer(errors_handle) if errors_handle else None
+        if errors_writer:
+            errors_writer.writerow(['line', 'email', 'error'])
+
+        def on_error(line_number, email, message):
+            if errors_writer:
+                errors_writer.writerow([line_number, email or '', message])
+
+        def on_batch(result):
+            self.stdout.write(
+                'processed=%(processed)d created=%(created)d duplicates=%(duplicates)d '
+                'errors=%(errors)d rows/sec=%(rows_per_sec).1f' % result.as_dict()
+            )
+
+        try:
+            result = User.objects.bulk_create_users(
+                READERS[file_format](path),
+                batch_size=options['batch_size'],
+                hash_workers=options['workers'],
+                on_error=on_error,
+                on_batch=on_batch
+            )
+        finally:
+            if errors_handle and errors_handle is not sys.stderr:
+                errors_handle.close()
+
+        self.stdout.write(self.style.SUCCESS(json.dumps(result.as_dict())))
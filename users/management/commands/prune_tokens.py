@@ -0,0 +1,24 @@
+"""
+Purge expired refresh token revocations in bounded batches
+"""
+from django.core.management.base import BaseCommand
+
+from users.conf import users_settings
+from users.revocation import prune_expired
+
+
+class Command(BaseCommand):
+    help = 'Delete expired token revocations, one batch at a time'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=users_settings.REVOCATION_PRUNE_BATCH_SIZE,
+            help='Rows examined per delete statement'
+        )
+        parser.add_argument('--max-batches', type=int, default=None, help='Stop after this many batches')
+
+    def handle(self, *args, **options):
+        deleted = prune_expired(batch_size=options['batch_size'], max_batches=options['max_batches'])
+        self.stdout.write(self.style.SUCCESS(
+            'Deleted %(revoked_tokens)d revoked tokens' % deleted
+        ))
@@ -0,0 +1,30 @@
+"""
+Rebuild the user search index from the user table
+"""
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS, transaction
+
+from users.search import search_index
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Clear and rebuild the user search index'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=2000, help='Users indexed per batch')
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+
+    def handle(self, *args, **options):
+        using = options['database']
+        with transaction.atomic(using=using):
+            total = search_index.rebuild(
+                User.objects.using(using),
+                chunk_size=options['chunk_size'],
+                using=using
+            )
+        self.stdout.write(self.style.SUCCESS(
+            'Indexed %d users (%s backend)' % (total, search_index.backend(using).name)
+        ))
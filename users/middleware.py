@@ -0,0 +1,140 @@
+"""
+Users App Middleware
+"""
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured, MiddlewareNotUsed
+from django.core.handlers.base import BaseHandler
+from django.core.handlers.exception import convert_exception_to_response
+from django.utils.module_loading import import_string
+
+from .conf import users_settings
+from .routers import reset_pinning
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Start every request on the read replicas: a primary pin left by an
+    earlier request handled on the same thread (or task) is cleared
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        reset_pinning()
+        try:
+            return self.get_response(request)
+        finally:
+            reset_pinning()
+
+    async def __acall__(self, request):
+        reset_pinning()
+        try:
+            return await self.get_response(request)
+        finally:
+            reset_pinning()
+
+
+def load_chain(paths, get_response, is_async):
+    """
+    Build a middleware chain around get_response the way Django's handler
+    does: (chain, process_view, process_template_response,
+    process_exception hooks, in the order the handler calls them)
+    """
+    adapter = BaseHandler()
+    view_hooks, template_response_hooks, exception_hooks = [], [], []
+    handler = get_response
+    handler_is_async = is_async
+    for path in reversed(paths):
+        middleware = import_string(path)
+        can_sync = getattr(middleware, 'sync_capable', True)
+        can_async = getattr(middleware, 'async_capable', False)
+        if not can_sync and not can_async:
+            raise RuntimeError(
+                'Middleware %s must have at least one of sync_capable/async_capable set to True.' % path
+            )
+        middleware_is_async = can_async if handler_is_async or not can_sync else False
+        try:
+            adapted = adapter.adapt_method_mode(
+                middleware_is_async, handler, handler_is_async, debug=settings.DEBUG, name='middleware %s' % path
+            )
+            instance = middleware(adapted)
+        except MiddlewareNotUsed:
+            continue
+        if instance is None:
+            raise ImproperlyConfigured('Middleware factory %s returned None.' % path)
+
+        if hasattr(instance, 'process_view'):
+            view_hooks.insert(0, instance.process_view)
+        if hasattr(instance, 'process_template_response'):
+            template_response_hooks.append(instance.process_template_response)
+        if hasattr(instance, 'process_exception'):
+            exception_hooks.append(instance.process_exception)
+        handler = convert_exception_to_response(instance)
+        handler_is_async = middleware_is_async
+
+    chain = adapter.adapt_method_mode(is_async, handler, handler_is_async)
+    return chain, view_hooks, template_response_hooks, exception_hooks
+
+
+class RoutedMiddleware:
+    """
+    Run USERS['ROUTED_MIDDLEWARE'] (sessions, CSRF, messages...) only for
+    paths under USERS['ROUTED_MIDDLEWARE_PATHS'] (the admin); every other
+    request skips straight to the rest of MIDDLEWARE. The wrapped
+    middleware's process_view/template_response/exception hooks are called
+    for the same paths, so they behave as if listed in MIDDLEWARE here.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        paths = users_settings.ROUTED_MIDDLEWARE
+        if not paths:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+        self.prefixes = tuple(users_settings.ROUTED_MIDDLEWARE_PATHS)
+        self.chain, self.view_hooks, self.template_response_hooks, self.exception_hooks = load_chain(
+            paths, get_response, self.is_async
+        )
+
+    def routed(self, request):
+        return request.path_info.startswith(self.prefixes)
+
+    def __call__(self, request):
+        if self.routed(request):
+            return self.chain(request)
+        return self.get_response(request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if self.routed(request):
+            for hook in self.view_hooks:
+                response = hook(request, view_func, view_args, view_kwargs)
+                if response is not None:
+                    return response
+        return None
+
+    def process_template_response(self, request, response):
+        if self.routed(request):
+            for hook in self.template_response_hooks:
+                response = hook(request, response)
+        return response
+
+    def process_exception(self, request, exception):
+        if self.routed(request):
+            for hook in self.exception_hooks:
+                response = hook(request, exception)
+                if response is not None:
+                    return response
+        return None
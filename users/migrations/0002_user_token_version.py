@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-17 03:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='token_version',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Incremented to revoke every token issued to this user.', verbose_name='Token Version'),
+        ),
+    ]
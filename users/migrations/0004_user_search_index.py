@@ -0,0 +1,59 @@
+# Generated by Django 4.2.30 on 2026-10-17 04:02
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def build_search_index(apps, schema_editor):
+    """Create the FTS5 table on SQLite and index existing users"""
+    from users.conf import users_settings
+    from users.search import FTS5SearchBackend, TableSearchBackend, create_fts_table
+
+    connection = schema_editor.connection
+    if users_settings.SEARCH_BACKEND != 'table' and create_fts_table(connection):
+        backend = FTS5SearchBackend(connection.alias)
+    else:
+        backend = TableSearchBackend(connection.alias, apps.get_model('users', 'UserSearchToken'))
+
+    User = apps.get_model('users', 'User')
+    rows = User.objects.using(connection.alias).values_list('id', 'email', 'full_name')
+    chunk = []
+    for row in rows.iterator(chunk_size=2000):
+        chunk.append(row)
+        if len(chunk) >= 2000:
+            backend.index(chunk)
+            chunk = []
+    backend.index(chunk)
+
+
+def drop_fts_table(apps, schema_editor):
+    from users.search import FTS_TABLE
+
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute('DROP TABLE IF EXISTS %s' % FTS_TABLE)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0003_user_created_id_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserSearchToken',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('w', 'Word'), ('t', 'Trigram')], max_length=1)),
+                ('token', models.CharField(max_length=64)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_tokens', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'User Search Token',
+                'verbose_name_plural': 'User Search Tokens',
+                'indexes': [models.Index(fields=['kind', 'token'], name='users_search_token_idx')],
+            },
+        ),
+        migrations.RunPython(build_search_index, drop_fts_table),
+    ]
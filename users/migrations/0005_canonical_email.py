@@ -0,0 +1,57 @@
+# Generated by Django 4.2.30 on 2026-10-17 04:05
+
+from django.db import IntegrityError, migrations, models
+from django.db.models import Count, F
+from django.db.models.functions import Lower, Trim
+
+# Conflicts listed in the error, the others are counted
+MAX_LISTED_CONFLICTS = 50
+
+
+def lowercase_emails(apps, schema_editor):
+    """
+    Store every email in canonical (lowercase) form. Fails, changing
+    nothing, when users would end up sharing an email: those accounts need
+    to be merged or renamed by hand first.
+    """
+    User = apps.get_model('users', 'User')
+    db = schema_editor.connection.alias
+    users = User.objects.using(db).annotate(canonical=Lower(Trim('email')))
+    conflicts = list(
+        users.values('canonical').annotate(users=Count('pk')).filter(users__gt=1)
+        .order_by('canonical').values_list('canonical', flat=True)
+    )
+    if conflicts:
+        lines = []
+        for canonical in conflicts[:MAX_LISTED_CONFLICTS]:
+            emails = users.filter(canonical=canonical).order_by('pk').values_list('pk', 'email')
+            lines.append('  %s: %s' % (canonical, ', '.join('%s (id %s)' % (email, pk) for pk, email in emails)))
+        if len(conflicts) > MAX_LISTED_CONFLICTS:
+            lines.append('  ... and %d more' % (len(conflicts) - MAX_LISTED_CONFLICTS))
+        raise IntegrityError(
+            '%d emails belong to several users once lowercased. Merge or rename these '
+            'accounts, then migrate again:\n%s' % (len(conflicts), '\n'.join(lines))
+        )
+    rows = users.exclude(email=F('canonical')).values_list('pk', 'canonical')
+    for pk, canonical in list(rows.iterator(chunk_size=2000)):
+        User.objects.using(db).filter(pk=pk).update(email=canonical)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0004_user_search_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(lowercase_emails, migrations.RunPython.noop),
+        migrations.RemoveIndex(
+            model_name='user',
+            name='users_user_email_6f2530_idx',
+        ),
+        migrations.AlterField(
+            model_name='user',
+            name='email',
+            field=models.EmailField(error_messages={'unique': 'A user with this email already exists.'}, max_length=255, unique=True, verbose_name='Email Address'),
+        ),
+    ]
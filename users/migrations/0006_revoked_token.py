@@ -0,0 +1,47 @@
+# Generated by Django 4.2.30 on 2026-10-17 04:06
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def copy_blacklist(apps, schema_editor):
+    """Carry over the unexpired entries of the simplejwt blacklist"""
+    BlacklistedToken = apps.get_model('token_blacklist', 'BlacklistedToken')
+    RevokedToken = apps.get_model('users', 'RevokedToken')
+    db = schema_editor.connection.alias
+    rows = (
+        BlacklistedToken.objects.using(db)
+        .filter(token__expires_at__gt=timezone.now())
+        .values_list('token__jti', 'token__expires_at')
+    )
+    batch = []
+    for jti, expires_at in rows.iterator(chunk_size=2000):
+        batch.append(RevokedToken(jti=jti, expires_at=expires_at))
+        if len(batch) >= 2000:
+            RevokedToken.objects.using(db).bulk_create(batch, ignore_conflicts=True)
+            batch = []
+    RevokedToken.objects.using(db).bulk_create(batch, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0005_canonical_email'),
+        ('token_blacklist', '0012_alter_outstandingtoken_user'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RevokedToken',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('jti', models.CharField(max_length=255, unique=True)),
+                ('expires_at', models.DateTimeField()),
+            ],
+            options={
+                'verbose_name': 'Revoked Token',
+                'verbose_name_plural': 'Revoked Tokens',
+            },
+        ),
+        migrations.RunPython(copy_blacklist, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 4.2.30 on 2026-10-17 05:06
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0006_revoked_token'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('user.created', 'Created'), ('user.updated', 'Updated'), ('user.password_changed', 'Password changed'), ('user.deactivated', 'Deactivated'), ('user.activated', 'Activated'), ('user.deleted', 'Deleted')], max_length=32)),
+                ('user_id', models.BigIntegerField()),
+                ('payload', models.JSONField(default=dict)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('position', models.BigIntegerField(editable=False, help_text='Stream position, set when the event is dispatched.', null=True, unique=True)),
+            ],
+            options={
+                'verbose_name': 'User Event',
+                'verbose_name_plural': 'User Events',
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 4.2.30 on 2026-10-17 09:12
+
+from django.db import migrations
+
+
+def create_vocab_table(apps, schema_editor):
+    """Trigram frequencies for fuzzy search, where the FTS5 index exists"""
+    from users.search import FTS5SearchBackend, create_fts_vocab_table
+
+    if FTS5SearchBackend.is_available(schema_editor.connection):
+        create_fts_vocab_table(schema_editor.connection)
+
+
+def drop_vocab_table(apps, schema_editor):
+    from users.search import FTS_VOCAB_TABLE
+
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute('DROP TABLE IF EXISTS %s' % FTS_VOCAB_TABLE)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0007_user_event'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_vocab_table, drop_vocab_table),
+    ]
@@ -2,7 +2,12 @@
 Custom User Model with Email Authentication
 """
 from django.contrib.auth.models import AbstractBaseUser, PermissionsMixin, BaseUserManager
-from django.db import models
+from django.db import models, router, transaction
+from django.utils import timezone
+
+from . import hashing
+from .conf import users_settings
+from .sqlite import write_queue
 
 
 class UserManager(BaseUserManager):
@@ -10,6 +15,18 @@ class UserManager(BaseUserManager):
     Custom User Manager for email-based authentication
     """
     
+    @classmethod
+    def normalize_email(cls, email):
+        """
+        Canonical form of an email address: the whole address lowercased, so
+        case-insensitive lookups are plain equality on the unique index
+        """
+        return super().normalize_email(email or '').strip().lower()
+    
+    def get_by_natural_key(self, username):
+        """Look a user up by email, whatever its case (used by authenticate())"""
+        return self.get(**{self.model.USERNAME_FIELD: self.normalize_email(username)})
+    
     def create_user(self, email, password=None, **extra_fields):
         """Create and save a regular user"""
         if not email:
@@ -21,6 +38,34 @@ class UserManager(BaseUserManager):
         user.save(using=self._db)
         return user
     
+    async def acreate_user(self, email, password=None, **extra_fields):
+        """Async version of create_user (hashing runs off the event loop)"""
+        if not email:
+            raise ValueError("User must have an email address")
+        
+        email = self.normalize_email(email)
+        user = self.model(email=email, **extra_fields)
+        await user.aset_password(password)
+        await user.asave(using=self._db)
+        return user
+    
+    def bulk_create_users(self, rows, batch_size=1000, hash_workers=None,
+                          on_error=None, on_batch=None):
+        """
+        Create users from an iterable of (line_number, row dict) pairs in
+        batches: rows are validated, de-duplicated case-insensitively against
+        the database, hashed in a process pool and inserted with bulk_create.
+        Returns a users.importing.ImportResult.
+        """
+        from .importing import bulk_import
+        return bulk_import(
+            self, rows,
+            batch_size=batch_size,
+            hash_workers=hash_workers,
+            on_error=on_error,
+            on_batch=on_batch
+        )
+    
     def create_superuser(self, email, password, **extra_fields):
         """Create and save a superuser"""
         extra_fields.setdefault('is_staff', True)
@@ -44,7 +89,6 @@ class User(AbstractBaseUser, PermissionsMixin):
         verbose_name='Email Address',
         max_length=255,
         unique=True,
-        db_index=True,
         error_messages={
             'unique': 'A user with this email already exists.',
         }
@@ -68,6 +112,13 @@ class User(AbstractBaseUser, PermissionsMixin):
         help_text='Designates whether the user can log into the admin site.'
     )
     
+    token_version = models.PositiveIntegerField(
+        verbose_name='Token Version',
+        default=0,
+        editable=False,
+        help_text='Incremented to revoke every token issued to this user.'
+    )
+    
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
@@ -81,17 +132,218 @@ class User(AbstractBaseUser, PermissionsMixin):
         verbose_name_plural = 'Users'
         ordering = ['-created_at']
         indexes = [
-            models.Index(fields=['email']),
+            # email needs no index of its own: the unique constraint is one
             models.Index(fields=['-created_at']),
+            models.Index(fields=['created_at', 'id'], name='users_created_id_idx'),
         ]
     
     def __str__(self):
         return self.email
     
-    def get_full_name(self):
-        """Return the full name"""
-        return self.full_name if self.full_name else self.email
+    # Changes of these fields are published as user.updated events
+    EVENT_FIELDS = ('email', 'full_name')
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """Remember the loaded active status and profile to detect changes on save"""
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_is_active = instance.__dict__.get('is_active')
+        instance._loaded_profile = {name: instance.__dict__.get(name) for name in cls.EVENT_FIELDS}
+        return instance
+    
+    def clean(self):
+        """Canonical email before validation, so forms check its uniqueness as stored"""
+        super().clean()
+        self.email = type(self).objects.normalize_email(self.email)
+
+    def save(self, *args, **kwargs):
+        """Store the canonical email and revoke tokens when the active status changes"""
+        self.email = type(self).objects.normalize_email(self.email)
+        
+        loaded_is_active = getattr(self, '_loaded_is_active', None)
+        if loaded_is_active is not None and loaded_is_active != self.is_active:
+            self.revoke_tokens()
+        
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and getattr(self, '_tokens_revoked', False):
+            kwargs['update_fields'] = {*update_fields, 'token_version'}
+        
+        events = self.lifecycle_events(kwargs.get('update_fields')) if users_settings.EVENTS_ENABLED else []
+        
+        # Serialized with the other writes on SQLite (users.sqlite)
+        write_queue.run(self._save_with_events, events, *args, **kwargs)
+        self._loaded_is_active = self.is_active
+        self._loaded_profile = {name: self.__dict__.get(name) for name in self.EVENT_FIELDS}
+        self._tokens_revoked = False
+    
+    def _save_with_events(self, events, *args, **kwargs):
+        """Save and write the outbox events of the change in one transaction"""
+        if not events:
+            return super().save(*args, **kwargs)
+        using = kwargs.get('using') or router.db_for_write(type(self), instance=self)
+        # Joins the writer's (or the caller's) transaction if there is one
+        with transaction.atomic(using=using, savepoint=False):
+            super().save(*args, **kwargs)
+            UserEvent.record([(kind, self.pk, payload) for kind, payload in events], using=using)
+    
+    def lifecycle_events(self, update_fields=None):
+        """(kind, payload) of the UserEvents saving this user now publishes"""
+        if self._state.adding:
+            return [(UserEvent.CREATED, self.created_payload())]
+        
+        def saved(name):
+            return update_fields is None or name in update_fields
+        
+        events = []
+        # Deferred fields were not loaded (None): their changes are unknown
+        changed = {
+            name: getattr(self, name)
+            for name, loaded in getattr(self, '_loaded_profile', {}).items()
+            if loaded is not None and saved(name) and getattr(self, name) != loaded
+        }
+        if changed:
+            events.append((UserEvent.UPDATED, changed))
+        # Set by set_password() only, not by hash upgrades on login
+        if self._password is not None and saved('password'):
+            events.append((UserEvent.PASSWORD_CHANGED, {}))
+        loaded_is_active = getattr(self, '_loaded_is_active', None)
+        if loaded_is_active is not None and saved('is_active') and loaded_is_active != self.is_active:
+            events.append((UserEvent.ACTIVATED if self.is_active else UserEvent.DEACTIVATED, {}))
+        return events
+    
+    def created_payload(self):
+        return {
+            'email': self.email,
+            'full_name': self.full_name,
+            'is_active': self.is_active,
+            'is_staff': self.is_staff,
+        }
+    
+    def set_password(self, raw_password):
+        """Hash the password (in the hashing pool) and revoke old tokens"""
+        self.password = hashing.make_password(raw_password)
+        self._password = raw_password
+        self.revoke_tokens()
+    
+    def check_password(self, raw_password):
+        """Verify the password in the hashing pool, upgrading old hashes"""
+        def setter(raw_password):
+            # Re-hash with the preferred hasher; not a password change
+            self.password = hashing.make_password(raw_password)
+            self._password = None
+            self.save(update_fields=['password'])
+        
+        return hashing.check_password(raw_password, self.password, setter)
+    
+    async def aset_password(self, raw_password):
+        """Async version of set_password"""
+        self.password = await hashing.amake_password(raw_password)
+        self._password = raw_password
+        self.revoke_tokens()
+    
+    async def acheck_password(self, raw_password):
+        """Async version of check_password"""
+        async def setter(raw_password):
+            self.password = await hashing.amake_password(raw_password)
+            self._password = None
+            await self.asave(update_fields=['password'])
+        
+        return await hashing.acheck_password(raw_password, self.password, setter)
+    
+    def revoke_tokens(self):
+        """Invalidate every token issued before this call (persisted on save)"""
+        self.token_version += 1
+        self._tokens_revoked = True
+
+
+class UserSearchToken(models.Model):
+    """
+    Generic search index row: a normalized word or trigram of a user's
+    email or full name (see users.search)
+    """
+    WORD = 'w'
+    TRIGRAM = 't'
+    KIND_CHOICES = [
+        (WORD, 'Word'),
+        (TRIGRAM, 'Trigram'),
+    ]
+    
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='search_tokens')
+    kind = models.CharField(max_length=1, choices=KIND_CHOICES)
+    token = models.CharField(max_length=64)
+    
+    class Meta:
+        verbose_name = 'User Search Token'
+        verbose_name_plural = 'User Search Tokens'
+        indexes = [
+            models.Index(fields=['kind', 'token'], name='users_search_token_idx'),
+        ]
+    
+    def __str__(self):
+        return self.token
+
+
+class RevokedToken(models.Model):
+    """
+    Compact revocation record: one row per revoked refresh token, looked up
+    by jti only and deleted once the token has expired (see users.revocation)
+    """
+    
+    jti = models.CharField(max_length=255, unique=True)
+    expires_at = models.DateTimeField()
+    
+    class Meta:
+        verbose_name = 'Revoked Token'
+        verbose_name_plural = 'Revoked Tokens'
+    
+    def __str__(self):
+        return self.jti
+
+
+class UserEvent(models.Model):
+    """
+    Transactional outbox row: a user lifecycle change, written in the
+    transaction that made it. The dispatcher (see users.events) gives
+    committed rows a gap-free position, in commit order, which consumers
+    read and resume from.
+    """
+    CREATED = 'user.created'
+    UPDATED = 'user.updated'
+    PASSWORD_CHANGED = 'user.password_changed'
+    DEACTIVATED = 'user.deactivated'
+    ACTIVATED = 'user.activated'
+    DELETED = 'user.deleted'
+    KIND_CHOICES = [
+        (CREATED, 'Created'),
+        (UPDATED, 'Updated'),
+        (PASSWORD_CHANGED, 'Password changed'),
+        (DEACTIVATED, 'Deactivated'),
+        (ACTIVATED, 'Activated'),
+        (DELETED, 'Deleted'),
+    ]
+    
+    kind = models.CharField(max_length=32, choices=KIND_CHOICES)
+    # Not a foreign key: events outlive the users they are about
+    user_id = models.BigIntegerField()
+    payload = models.JSONField(default=dict)
+    created_at = models.DateTimeField(default=timezone.now)
+    position = models.BigIntegerField(
+        null=True,
+        unique=True,
+        editable=False,
+        help_text='Stream position, set when the event is dispatched.'
+    )
+    
+    class Meta:
+        verbose_name = 'User Event'
+        verbose_name_plural = 'User Events'
+    
+    def __str__(self):
+        return '%s %s' % (self.kind, self.user_id)
     
-    def get_short_name(self):
-        """Return the short name (email username)"""
-        return self.email.split('@')[0]
\ No newline at end of file
+    @classmethod
+    def record(cls, events, using=None):
+        """Write (kind, user_id, payload) events; call inside the change's transaction"""
+        cls.objects.using(using).bulk_create([
+            cls(kind=kind, user_id=user_id, payload=payload) for kind, user_id, payload in events
+        ])
@@ -0,0 +1,25 @@
+"""
+Cursor Pagination for User Listings
+Pages are addressed by an opaque cursor holding the last created_at seen,
+so every page is an index range scan on created_at: no COUNT(*) and no
+growing OFFSET, page 10,000 costs the same as page 1. DRF's cursor holds
+that one field only: rows sharing the last created_at are skipped with an
+OFFSET over the tie (microsecond timestamps rarely tie, a bulk import's
+can).
+"""
+from rest_framework.pagination import CursorPagination
+
+
+class UserCursorPagination(CursorPagination):
+    """Newest first, walking the -created_at index; id only orders rows within a tie"""
+    ordering = ('-created_at', '-id')
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+
+    def get_paginated_data(self, data):
+        return {
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data
+        }
@@ -0,0 +1,212 @@
+"""
+Cached Permission Resolution
+PermissionsMixin resolves has_perm() through ModelBackend, which queries
+the user's own and group permissions once per user instance, i.e. once per
+request. PermissionCache keeps each user's effective permissions in the
+Django cache (PERMISSION_CACHE_ALIAS) as a compact entry:
+    (generation, is_superuser, bitset of permission ids)
+decoded per process into a frozenset of 'app_label.codename' names, shared
+by every user with the same permissions.
+
+Invalidation (users.signals):
+- a user's groups, permissions, status or superuser flag change: the
+  user's entry is dropped
+- a group's permissions, a group or a permission change: the generation
+  is bumped, which invalidates every entry at once
+
+CachedModelBackend (AUTHENTICATION_BACKENDS) serves has_perm() from the
+cache; HasPermissions checks a view's required_permissions from the token's
+user id, without loading the user.
+"""
+import random
+import threading
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.contrib.auth.models import Group, Permission
+from django.core.cache import caches
+from django.db import transaction
+from rest_framework.permissions import BasePermission
+
+from .cache import shared_timeout
+from .conf import users_settings
+
+User = get_user_model()
+
+PERMISSION_CACHE_KEY = 'users:perms:{}'
+PERMISSION_GENERATION_KEY = 'users:perms:generation'
+
+
+class PermissionCache:
+    """Effective permissions of users, keyed by user id and generation"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._generation = None
+        self._names = {}
+        self._decoded = {}
+
+    @property
+    def shared(self):
+        return caches[users_settings.PERMISSION_CACHE_ALIAS]
+
+    @staticmethod
+    def timeout(timeout):
+        # A per-process cache never sees other workers' invalidations (nor
+        # generation bumps): its entries only live for seconds
+        return shared_timeout(users_settings.PERMISSION_CACHE_ALIAS, timeout)
+
+    def generation(self):
+        generation = self.shared.get(PERMISSION_GENERATION_KEY)
+        if generation is None:
+            generation = self._new_generation()
+        return generation
+
+    def _new_generation(self):
+        # Random start: entries written before the key was evicted never
+        # become valid again
+        self.shared.add(PERMISSION_GENERATION_KEY, random.getrandbits(62), timeout=self.timeout(None))
+        return self.shared.get(PERMISSION_GENERATION_KEY)
+
+    def _entry(self, user_id):
+        """(generation, is_superuser, bitset) of a user, None if it does not exist"""
+        key = PERMISSION_CACHE_KEY.format(user_id)
+        found = self.shared.get_many([PERMISSION_GENERATION_KEY, key])
+        generation = found.get(PERMISSION_GENERATION_KEY)
+        if generation is None:
+            generation = self._new_generation()
+        entry = found.get(key)
+        if entry is not None and entry[0] == generation:
+            return entry
+
+        entry = self._load(user_id, generation)
+        if entry is not None:
+            self.shared.set(key, entry, self.timeout(users_settings.PERMISSION_CACHE_TIMEOUT))
+        return entry
+
+    @staticmethod
+    def _load(user_id, generation):
+        status = User.objects.filter(pk=user_id).values_list('is_active', 'is_superuser').first()
+        if status is None:
+            return None
+        is_active, is_superuser = status
+        if not is_active:
+            return (generation, False, 0)
+        if is_superuser:
+            return (generation, True, 0)
+
+        # ModelBackend's two queries, as one on the through tables
+        own = User.user_permissions.through.objects.filter(
+            user_id=user_id
+        ).values_list('permission_id', flat=True)
+        inherited = Group.permissions.through.objects.filter(
+            group__user=user_id
+        ).values_list('permission_id', flat=True)
+        bitset = 0
+        for permission_id in own.union(inherited):
+            bitset |= 1 << permission_id
+        return (generation, False, bitset)
+
+    def _permission_names(self, generation):
+        """{id: 'app_label.codename'} of every permission, loaded once per generation"""
+        if self._generation != generation:
+            with self._lock:
+                if self._generation != generation:
+                    self._names = {
+                        pk: '%s.%s' % (app_label, codename)
+                        for pk, app_label, codename in Permission.objects.values_list(
+                            'pk', 'content_type__app_label', 'codename'
+                        )
+                    }
+                    self._decoded = {}
+                    self._generation = generation
+        return self._names
+
+    def _decode(self, generation, bitset):
+        names = self._permission_names(generation)
+        permissions = self._decoded.get(bitset)
+        if permissions is None:
+            held = set()
+            rest = bitset
+            while rest:
+                lowest = rest & -rest
+                pk = lowest.bit_length() - 1
+                if pk in names:
+                    held.add(names[pk])
+                rest ^= lowest
+            permissions = frozenset(held)
+            if len(self._decoded) >= 1024:
+                self._decoded = {}
+            self._decoded[bitset] = permissions
+        return permissions
+
+    def get(self, user_id):
+        """
+        Frozenset of the user's permission names, every permission for an
+        active superuser, empty for inactive or unknown users
+        """
+        entry = self._entry(user_id)
+        if entry is None:
+            return frozenset()
+        generation, is_superuser, bitset = entry
+        if is_superuser:
+            return frozenset(self._permission_names(generation).values())
+        return self._decode(generation, bitset)
+
+    def has_perms(self, user_id, perms):
+        """Whether the user holds every permission of `perms` (superusers hold all)"""
+        entry = self._entry(user_id)
+        if entry is None:
+            return False
+        if entry[1]:
+            return True
+        permissions = self._decode(entry[0], entry[2])
+        return all(perm in permissions for perm in perms)
+
+    def invalidate(self, user_ids):
+        """Drop the entries of some users, again once the transaction commits"""
+        keys = [PERMISSION_CACHE_KEY.format(user_id) for user_id in user_ids]
+
+        def drop():
+            self.shared.delete_many(keys)
+
+        drop()
+        transaction.on_commit(drop)
+
+    def invalidate_all(self):
+        """Start a new generation: every entry is stale"""
+        def bump():
+            try:
+                self.shared.incr(PERMISSION_GENERATION_KEY)
+            except ValueError:
+                self._new_generation()
+
+        bump()
+        transaction.on_commit(bump)
+
+
+permission_cache = PermissionCache()
+
+
+class CachedModelBackend(ModelBackend):
+    """ModelBackend answering has_perm() and friends from permission_cache"""
+
+    def get_all_permissions(self, user_obj, obj=None):
+        if not user_obj.is_active or user_obj.is_anonymous or obj is not None:
+            return set()
+        if not hasattr(user_obj, '_perm_cache'):
+            user_obj._perm_cache = permission_cache.get(user_obj.pk)
+        return user_obj._perm_cache
+
+
+class HasPermissions(BasePermission):
+    """
+    Authenticated users holding every permission of the view's
+    required_permissions ('app_label.codename' strings)
+    """
+
+    def has_permission(self, request, view):
+        user = request.user
+        if not user or not user.is_authenticated:
+            return False
+        return permission_cache.has_perms(user.pk, getattr(view, 'required_permissions', ()))
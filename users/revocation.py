@@ -0,0 +1,246 @@
+"""
+Refresh Token Revocation Store
+Revoked refresh tokens are stored as compact RevokedToken rows (jti and
+expiry) and mirrored in memory by Bloom filters bucketed by token expiry:
+- a jti missing from its bucket's filter is not revoked, without a query
+- a filter hit is confirmed with a lookup on the unique jti index
+- buckets are dropped as soon as every token in them has expired
+Each process picks up revocations made elsewhere by reading the rows added
+since the last sync (a primary key range scan), at most once per
+REVOCATION_SYNC_INTERVAL seconds. Expired rows are purged in bounded
+batches by the prune_tokens command or a background scheduler.
+"""
+import hashlib
+import logging
+import math
+import os
+import threading
+import time
+from datetime import datetime, timezone as dt_timezone
+
+from django.core.cache import caches
+from django.core.signals import setting_changed
+from django.db import connection
+from django.utils import timezone
+
+from .conf import users_settings
+from .models import RevokedToken
+from .sqlite import write_queue
+
+logger = logging.getLogger(__name__)
+
+PRUNE_LOCK_KEY = 'users:revocation:prune_lock'
+
+# Rows below the last seen id re-read on every sync: ids of concurrent
+# transactions can commit out of order
+SYNC_OVERLAP = 100
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings"""
+
+    def __init__(self, capacity, error_rate=0.01):
+        capacity = max(1, capacity)
+        self.size = max(8, int(math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)))
+        self.hashes = max(1, int(round(self.size / capacity * math.log(2))))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key):
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    def add(self, key):
+        for position in self._positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, key):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+
+def _exp(expires_at):
+    return int(expires_at.timestamp())
+
+
+class RevocationIndex:
+    """
+    In-memory view of the revoked jtis of this process, loaded lazily and
+    re-loaded after a fork
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._pid = None
+        self._buckets = {}
+        self._last_id = 0
+        self._synced_at = 0.0
+        self._scheduler = None
+
+    def _bucket(self, exp):
+        return exp // users_settings.REVOCATION_BUCKET_SECONDS
+
+    def _add(self, jti, exp):
+        bucket = self._bucket(exp)
+        bloom = self._buckets.get(bucket)
+        if bloom is None:
+            bloom = self._buckets[bucket] = BloomFilter(
+                users_settings.REVOCATION_BUCKET_CAPACITY,
+                users_settings.REVOCATION_ERROR_RATE
+            )
+        bloom.add(jti)
+
+    def _load_rows(self, queryset):
+        for pk, jti, expires_at in queryset.order_by('pk').values_list('pk', 'jti', 'expires_at').iterator(chunk_size=5000):
+            self._add(jti, _exp(expires_at))
+            self._last_id = max(self._last_id, pk)
+
+    def _ensure_loaded(self):
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._buckets = {}
+            self._last_id = 0
+            self._load_rows(RevokedToken.objects.filter(expires_at__gt=timezone.now()))
+            self._synced_at = time.monotonic()
+            self._pid = os.getpid()
+            self._scheduler = None
+        self._start_scheduler()
+
+    def sync(self, force=False):
+        """Pick up revocations recorded by other processes"""
+        self._ensure_loaded()
+        if not force and time.monotonic() - self._synced_at < users_settings.REVOCATION_SYNC_INTERVAL:
+            return
+        with self._lock:
+            self._load_rows(RevokedToken.objects.filter(pk__gt=self._last_id - SYNC_OVERLAP))
+            self._synced_at = time.monotonic()
+
+    def add(self, jti, exp):
+        """Record a revocation made by this process"""
+        self._ensure_loaded()
+        with self._lock:
+            self._add(jti, exp)
+
+    def might_be_revoked(self, jti, exp):
+        """False means certainly not revoked (as of the last sync)"""
+        self.sync()
+        bloom = self._buckets.get(self._bucket(exp))
+        return bloom is not None and jti in bloom
+
+    def drop_expired(self, now=None):
+        """Forget buckets whose tokens have all expired"""
+        now = int(now if now is not None else time.time())
+        size = users_settings.REVOCATION_BUCKET_SECONDS
+        with self._lock:
+            for bucket in [bucket for bucket in self._buckets if (bucket + 1) * size <= now]:
+                del self._buckets[bucket]
+
+    def reset(self):
+        """Reload from the database on next use (e.g. after settings change)"""
+        with self._lock:
+            self._pid = None
+
+    def stats(self):
+        with self._lock:
+            return {
+                'buckets': len(self._buckets),
+                'entries': sum(bloom.count for bloom in self._buckets.values()),
+                'bytes': sum(len(bloom.bits) for bloom in self._buckets.values()),
+                'last_id': self._last_id,
+            }
+
+    def _start_scheduler(self):
+        interval = users_settings.REVOCATION_PRUNE_INTERVAL
+        if not interval or self._scheduler is not None:
+            return
+        self._scheduler = threading.Thread(
+            target=self._prune_forever, args=(interval,), name='users-revocation-prune', daemon=True
+        )
+        self._scheduler.start()
+
+    def _prune_forever(self, interval):
+        pid = os.getpid()
+        while self._pid == pid:
+            time.sleep(interval)
+            try:
+                # One process per interval does the deletes, every process
+                # drops its own expired buckets
+                lock_cache = caches[users_settings.TOKEN_STATE_CACHE_ALIAS]
+                if lock_cache.add(PRUNE_LOCK_KEY, pid, interval):
+                    prune_expired()
+                self.drop_expired()
+            except Exception:
+                logger.exception('Pruning expired tokens failed')
+            finally:
+                connection.close()
+
+
+revocation_index = RevocationIndex()
+
+
+def reset_revocation_index(*args, **kwargs):
+    if kwargs['setting'] in ('USERS', 'DATABASES'):
+        revocation_index.reset()
+
+
+setting_changed.connect(reset_revocation_index)
+
+
+def revoke(jti, exp):
+    """Revoke a refresh token until it expires"""
+    write_queue.run(
+        RevokedToken.objects.bulk_create,
+        [RevokedToken(jti=jti, expires_at=datetime.fromtimestamp(exp, tz=dt_timezone.utc))],
+        ignore_conflicts=True
+    )
+    if users_settings.REVOCATION_FILTER_ENABLED:
+        revocation_index.add(jti, exp)
+
+
+def is_revoked(jti, exp):
+    """Whether the token was revoked; the database is only asked on a filter hit"""
+    if users_settings.REVOCATION_FILTER_ENABLED and not revocation_index.might_be_revoked(jti, exp):
+        return False
+    return RevokedToken.objects.filter(jti=jti).exists()
+
+
+def _prune_model(model, batch_size, max_batches, now):
+    """
+    Delete expired rows of a model with an expires_at field, walking the
+    primary key in batches so no statement scans or locks the whole table
+    """
+    deleted = 0
+    last_pk = 0
+    batches = 0
+    while max_batches is None or batches < max_batches:
+        page = list(
+            model.objects.filter(pk__gt=last_pk)
+            .order_by('pk')
+            .values_list('pk', 'expires_at')[:batch_size]
+        )
+        if not page:
+            break
+        last_pk = page[-1][0]
+        expired = [pk for pk, expires_at in page if expires_at <= now]
+        if expired:
+            counts = write_queue.run(model.objects.filter(pk__in=expired).delete)[1]
+            deleted += counts.get(model._meta.label, 0)
+        batches += 1
+    return deleted
+
+
+def prune_expired(batch_size=None, max_batches=None, now=None):
+    """
+    Purge expired revocations. Returns the deleted counts. (Issued tokens
+    are not recorded, see UserRefreshToken.for_user)
+    """
+    batch_size = batch_size or users_settings.REVOCATION_PRUNE_BATCH_SIZE
+    now = now or timezone.now()
+    return {
+        'revoked_tokens': _prune_model(RevokedToken, batch_size, max_batches, now),
+    }
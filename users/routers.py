@@ -0,0 +1,102 @@
+"""
+Primary / Read-Replica Database Router
+Reads of users app models go to one of USERS['READ_REPLICAS'], writes to
+the primary (default). Reads switch back to the primary:
+- for the rest of a request (or task) once it has written anything
+- for REPLICA_STICKY_SECONDS after any write to a user, for requests
+  authenticated as that user, so they always read their own writes
+- inside transactions on the primary
+"""
+import random
+from contextvars import ContextVar
+
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from .conf import users_settings
+
+STICKY_KEY = 'users:primary_pin:{}'
+
+# Models whose reads must never lag behind the primary
+PRIMARY_ONLY_MODELS = {'revokedtoken'}
+
+_pinned = ContextVar('users_primary_pinned', default=False)
+
+
+def replicas_enabled():
+    return bool(users_settings.READ_REPLICAS)
+
+
+def pin_primary():
+    """Send the remaining reads of this request (or task) to the primary"""
+    if replicas_enabled():
+        _pinned.set(True)
+
+
+def reset_pinning():
+    """Forget the pin, at the start and end of every request"""
+    _pinned.set(False)
+
+
+def is_pinned():
+    return _pinned.get()
+
+
+def _sticky_cache():
+    return caches[users_settings.REPLICA_STICKY_CACHE_ALIAS]
+
+
+def stick_to_primary(user_id):
+    """Pin the user's requests to the primary for REPLICA_STICKY_SECONDS"""
+    if replicas_enabled():
+        _sticky_cache().set(STICKY_KEY.format(user_id), 1, users_settings.REPLICA_STICKY_SECONDS)
+
+
+def set_request_user(user_id):
+    """Pin this request if its user wrote recently"""
+    if replicas_enabled() and _sticky_cache().get(STICKY_KEY.format(user_id)):
+        _pinned.set(True)
+
+
+async def aset_request_user(user_id):
+    """Async version of set_request_user"""
+    if replicas_enabled() and await _sticky_cache().aget(STICKY_KEY.format(user_id)):
+        _pinned.set(True)
+
+
+class PrimaryReplicaRouter:
+    """Route users app reads to replicas and every write to the primary"""
+
+    app_label = 'users'
+
+    def _routed(self, model):
+        return (
+            model._meta.app_label == self.app_label
+            and model._meta.model_name not in PRIMARY_ONLY_MODELS
+        )
+
+    def db_for_read(self, model, **hints):
+        if not self._routed(model):
+            return None
+        replicas = users_settings.READ_REPLICAS
+        if not replicas or is_pinned() or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        if model._meta.app_label != self.app_label:
+            return None
+        pin_primary()
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *users_settings.READ_REPLICAS}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas receive the schema from the primary
+        if db in users_settings.READ_REPLICAS:
+            return False
+        return None
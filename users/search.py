@@ -0,0 +1,371 @@
+"""
+User Search Index
+Email local part, domain and full name words are normalized (lowercase,
+accents stripped) and indexed as words for prefix search and as padded
+trigrams for typo-tolerant search, so lookups are index probes instead of
+icontains scans over the user table.
+
+Two backends keep the same index:
+- fts5: an SQLite FTS5 virtual table (users_user_fts, rowid = user id),
+  with an fts5vocab table over it for trigram frequencies
+- table: UserSearchToken rows, works on every database
+"""
+import math
+import re
+import unicodedata
+from functools import reduce
+from operator import or_
+
+from django.core.signals import setting_changed
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.models import Count, Q
+
+from .conf import users_settings
+
+FTS_TABLE = 'users_user_fts'
+FTS_VOCAB_TABLE = 'users_user_fts_vocab'
+
+WORD_RE = re.compile(r'[^\W_]+')
+PAD = '$'
+MAX_TOKEN_LENGTH = 64
+
+# Extra candidates fetched from FTS5 before trigram similarity is computed
+FUZZY_CANDIDATES = 5
+
+
+def normalize(text):
+    """Lowercase and strip accents"""
+    text = unicodedata.normalize('NFKD', text or '')
+    return ''.join(ch for ch in text if not unicodedata.combining(ch)).lower()
+
+
+def split_words(text):
+    return [word[:MAX_TOKEN_LENGTH] for word in WORD_RE.findall(normalize(text))]
+
+
+def user_words(email, full_name):
+    """Indexed words of a user, e.g. jane.doe@mail.example.com, "Jane Doe"
+    -> jane, doe, janedoe, mail, example, com"""
+    local, _, domain = (email or '').partition('@')
+    local_words = split_words(local)
+    words = list(local_words)
+    if len(local_words) > 1:
+        words.append(''.join(local_words)[:MAX_TOKEN_LENGTH])
+    words += split_words(domain)
+    words += split_words(full_name)
+    return list(dict.fromkeys(words))
+
+
+def trigrams(words):
+    """Padded trigrams, like pg_trgm: "jon" -> $$j $jo jon on$"""
+    grams = set()
+    for word in words:
+        padded = PAD * 2 + word + PAD
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def similarity(query_grams, grams):
+    """Share of trigrams in common (0..1)"""
+    if not query_grams or not grams:
+        return 0.0
+    return len(query_grams & grams) / len(query_grams | grams)
+
+
+def word_similarity(words, indexed_words):
+    """Mean, over the query words, of the best similarity to an indexed word"""
+    if not words or not indexed_words:
+        return 0.0
+    indexed_grams = [trigrams([word]) for word in indexed_words]
+    total = 0.0
+    for word in words:
+        grams = trigrams([word])
+        total += max(similarity(grams, other) for other in indexed_grams)
+    return total / len(words)
+
+
+def min_shared_trigrams(words, threshold):
+    """
+    Fewest query trigrams a user must have to reach `threshold`: a word's
+    similarity is at most shared / its trigrams, and the mean over the
+    query words is at most the best of them
+    """
+    fewest = min(len(trigrams([word])) for word in words)
+    # Rounding must not make 0.3 * 10 require 4
+    return max(1, math.ceil(threshold * fewest - 1e-9))
+
+
+def _rank(words, prefix_hits, fuzzy_hits, limit):
+    """
+    Merge prefix and fuzzy hits into [(user_id, score)], best first.
+    Prefix hits are (user_id, query words matching a whole word) and score
+    1 + their share, fuzzy hits score their trigram similarity.
+    """
+    results = {}
+    for user_id, exact in prefix_hits:
+        results[user_id] = 1.0 + exact / len(words)
+    for user_id, score in fuzzy_hits:
+        results.setdefault(user_id, score)
+    ranked = sorted(results.items(), key=lambda item: (-item[1], -item[0]))
+    return ranked[:limit]
+
+
+class TableSearchBackend:
+    """Search index stored as UserSearchToken rows"""
+    name = 'table'
+
+    def __init__(self, using=DEFAULT_DB_ALIAS, token_model=None):
+        self.using = using
+        self._token_model = token_model
+
+    @property
+    def token_model(self):
+        if self._token_model is None:
+            from .models import UserSearchToken
+            self._token_model = UserSearchToken
+        return self._token_model
+
+    def index(self, rows):
+        """(Re)index (user_id, email, full_name) rows"""
+        rows = list(rows)
+        if not rows:
+            return
+        model = self.token_model
+        tokens = []
+        for user_id, email, full_name in rows:
+            words = user_words(email, full_name)
+            tokens += [model(user_id=user_id, kind='w', token=word) for word in words]
+            tokens += [model(user_id=user_id, kind='t', token=gram) for gram in trigrams(words)]
+        manager = model._default_manager.using(self.using)
+        manager.filter(user_id__in=[row[0] for row in rows]).delete()
+        manager.bulk_create(tokens, batch_size=500)
+
+    def remove(self, user_ids):
+        self.token_model._default_manager.using(self.using).filter(user_id__in=user_ids).delete()
+
+    def clear(self):
+        self.token_model._default_manager.using(self.using).all().delete()
+
+    def search(self, query, limit=20, fuzzy=True):
+        words = split_words(query)
+        if not words:
+            return []
+        manager = self.token_model._default_manager.using(self.using)
+        prefix_hits = self._prefix(manager, words, limit)
+        fuzzy_hits = []
+        if fuzzy and len(prefix_hits) < limit:
+            fuzzy_hits = self._fuzzy(manager, words, limit)
+        return _rank(words, prefix_hits, fuzzy_hits, limit)
+
+    def _prefix(self, manager, words, limit):
+        # Users having, for every query word, an indexed word starting with
+        # it, ranked and limited by the same query. Ranges instead of
+        # startswith, so that the (kind, token) index is used regardless of
+        # the database's LIKE collation
+        prefixes = [Q(token__gte=word, token__lt=word + '\uffff') for word in dict.fromkeys(words)]
+        matches = {'prefix%d' % i: Count('id', filter=prefix) for i, prefix in enumerate(prefixes)}
+        return list(
+            manager.filter(reduce(or_, prefixes), kind='w')
+            .values('user_id')
+            .annotate(exact=Count('id', filter=Q(token__in=words)), **matches)
+            .filter(**{'%s__gt' % name: 0 for name in matches})
+            .order_by('-exact', '-user_id')
+            .values_list('user_id', 'exact')[:limit]
+        )
+
+    def _fuzzy(self, manager, words, limit):
+        # Candidates share the most trigrams with the query (at least as
+        # many as the threshold needs), then are scored word by word
+        threshold = users_settings.SEARCH_FUZZY_THRESHOLD
+        shared = (
+            manager.filter(kind='t', token__in=trigrams(words))
+            .values('user_id')
+            .annotate(shared=Count('id'))
+            .filter(shared__gte=min_shared_trigrams(words, threshold))
+            .order_by('-shared', '-user_id')[:limit * FUZZY_CANDIDATES]
+        )
+        user_ids = [row['user_id'] for row in shared]
+        indexed = {}
+        for user_id, token in manager.filter(kind='w', user_id__in=user_ids).values_list('user_id', 'token'):
+            indexed.setdefault(user_id, []).append(token)
+        hits = [(user_id, word_similarity(words, indexed.get(user_id, ()))) for user_id in user_ids]
+        return [hit for hit in hits if hit[1] >= threshold]
+
+
+class FTS5SearchBackend:
+    """Search index stored in an SQLite FTS5 virtual table"""
+    name = 'fts5'
+
+    def __init__(self, using=DEFAULT_DB_ALIAS):
+        self.using = using
+
+    @property
+    def connection(self):
+        return connections[self.using]
+
+    @staticmethod
+    def is_available(connection):
+        if connection.vendor != 'sqlite':
+            return False
+        with connection.cursor() as cursor:
+            return FTS_TABLE in connection.introspection.table_names(cursor)
+
+    def index(self, rows):
+        rows = list(rows)
+        if not rows:
+            return
+        params = []
+        for user_id, email, full_name in rows:
+            words = user_words(email, full_name)
+            params.append((user_id, ' '.join(words), ' '.join(sorted(trigrams(words)))))
+        with self.connection.cursor() as cursor:
+            cursor.executemany('DELETE FROM %s WHERE rowid = %%s' % FTS_TABLE, [(row[0],) for row in params])
+            cursor.executemany(
+                'INSERT INTO %s (rowid, words, grams) VALUES (%%s, %%s, %%s)' % FTS_TABLE, params
+            )
+
+    def remove(self, user_ids):
+        with self.connection.cursor() as cursor:
+            cursor.executemany('DELETE FROM %s WHERE rowid = %%s' % FTS_TABLE, [(pk,) for pk in user_ids])
+
+    def clear(self):
+        with self.connection.cursor() as cursor:
+            cursor.execute('DELETE FROM %s' % FTS_TABLE)
+
+    def search(self, query, limit=20, fuzzy=True):
+        words = split_words(query)
+        if not words:
+            return []
+
+        # Tokens only contain letters, digits and $, so quoting is enough
+        match = 'words : (%s)' % ' AND '.join('"%s"*' % word for word in words)
+        # Ranked like _rank() does, by the query words matching a whole word
+        unique = list(dict.fromkeys(words))
+        exact = ' + '.join(["(instr(' ' || words || ' ', %s) > 0)"] * len(unique))
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT rowid, %s AS exact FROM %s WHERE %s MATCH %%s ORDER BY exact DESC, rowid DESC LIMIT %%s'
+                % (exact, FTS_TABLE, FTS_TABLE),
+                [' %s ' % word for word in unique] + [match, limit]
+            )
+            prefix_hits = cursor.fetchall()
+
+            fuzzy_hits = []
+            if fuzzy and len(prefix_hits) < limit:
+                fuzzy_hits = self._fuzzy(cursor, words, limit)
+
+        return _rank(words, prefix_hits, fuzzy_hits, limit)
+
+    def _fuzzy(self, cursor, words, limit):
+        # A user sharing `needed` of the n indexed query trigrams has one of
+        # any n - needed + 1 of them: matching only the rarest ones finds
+        # every candidate while reading the shortest posting lists
+        threshold = users_settings.SEARCH_FUZZY_THRESHOLD
+        needed = min_shared_trigrams(words, threshold)
+        query_grams = sorted(trigrams(words))
+        cursor.execute(
+            "SELECT term FROM %s WHERE col = 'grams' AND term IN (%s) ORDER BY doc, term"
+            % (FTS_VOCAB_TABLE, ', '.join(['%s'] * len(query_grams))),
+            query_grams
+        )
+        indexed_grams = [row[0] for row in cursor.fetchall()]
+        if len(indexed_grams) < needed:
+            return []
+        match = 'grams : (%s)' % ' OR '.join(
+            '"%s"' % gram for gram in indexed_grams[:len(indexed_grams) - needed + 1]
+        )
+        cursor.execute(
+            'SELECT rowid, words FROM %s WHERE %s MATCH %%s ORDER BY rank LIMIT %%s' % (FTS_TABLE, FTS_TABLE),
+            [match, limit * FUZZY_CANDIDATES]
+        )
+        hits = [(user_id, word_similarity(words, indexed.split())) for user_id, indexed in cursor.fetchall()]
+        return [hit for hit in hits if hit[1] >= threshold]
+
+
+def create_fts_table(connection):
+    """Create the FTS5 table; returns False when FTS5 is not compiled in"""
+    if connection.vendor != 'sqlite':
+        return False
+    with connection.cursor() as cursor:
+        try:
+            cursor.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS %s USING fts5("
+                "words, grams, tokenize = \"unicode61 tokenchars '$'\")" % FTS_TABLE
+            )
+            create_fts_vocab_table(connection)
+        except Exception:
+            return False
+    return True
+
+
+def create_fts_vocab_table(connection):
+    """Create the fts5vocab table giving, per column, the rows holding each term"""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS %s USING fts5vocab(%s, 'col')" % (FTS_VOCAB_TABLE, FTS_TABLE)
+        )
+
+
+def get_backend(using=DEFAULT_DB_ALIAS):
+    """Backend selected by USERS['SEARCH_BACKEND'] ('auto', 'fts5' or 'table')"""
+    name = users_settings.SEARCH_BACKEND
+    if name == 'auto':
+        name = 'fts5' if FTS5SearchBackend.is_available(connections[using]) else 'table'
+    if name == 'fts5':
+        return FTS5SearchBackend(using)
+    return TableSearchBackend(using)
+
+
+class SearchIndex:
+    """Entry point used by views, the admin, signals and commands"""
+
+    def __init__(self):
+        self._backends = {}
+
+    def backend(self, using=DEFAULT_DB_ALIAS):
+        if using not in self._backends:
+            self._backends[using] = get_backend(using)
+        return self._backends[using]
+
+    def reset(self):
+        """Forget the selected backends (e.g. after settings change)"""
+        self._backends = {}
+
+    def index_user(self, user, using=DEFAULT_DB_ALIAS):
+        self.backend(using).index([(user.pk, user.email, user.full_name)])
+
+    def index_rows(self, rows, using=DEFAULT_DB_ALIAS):
+        self.backend(using).index(rows)
+
+    def remove_user(self, user_id, using=DEFAULT_DB_ALIAS):
+        self.backend(using).remove([user_id])
+
+    def search(self, query, limit=20, fuzzy=True, using=DEFAULT_DB_ALIAS):
+        """Return [(user_id, score)] ranked best first"""
+        return self.backend(using).search(query, limit=limit, fuzzy=fuzzy)
+
+    def rebuild(self, queryset, chunk_size=2000, using=DEFAULT_DB_ALIAS):
+        """Re-index every user of queryset; returns the number of users"""
+        backend = self.backend(using)
+        backend.clear()
+        total = 0
+        chunk = []
+        for row in queryset.values_list('id', 'email', 'full_name').iterator(chunk_size=chunk_size):
+            chunk.append(row)
+            if len(chunk) >= chunk_size:
+                backend.index(chunk)
+                total += len(chunk)
+                chunk = []
+        backend.index(chunk)
+        return total + len(chunk)
+
+
+search_index = SearchIndex()
+
+
+def reset_search_backend(*args, **kwargs):
+    if kwargs['setting'] in ('USERS', 'DATABASES'):
+        search_index.reset()
+
+
+setting_changed.connect(reset_search_backend)
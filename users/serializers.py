@@ -2,11 +2,15 @@
 User Serializers for Authentication and Profile Management
 Compatible with email-based User model
 """
+from functools import lru_cache
+
 from rest_framework import serializers
 from django.contrib.auth import authenticate, get_user_model
 from django.contrib.auth.password_validation import validate_password
 from django.core.exceptions import ValidationError
 
+from .routers import pin_primary
+
 User = get_user_model()
 
 
@@ -32,14 +36,19 @@ class RegisterSerializer(serializers.ModelSerializer):
         fields = ['email', 'full_name', 'password', 'password2']
         extra_kwargs = {
             'full_name': {'required': True},
-            'email': {'required': True}
+            # Uniqueness is checked once, in validate_email
+            'email': {'required': True, 'validators': []}
         }
 
     def validate_email(self, value):
         """Validate email uniqueness"""
-        if User.objects.filter(email__iexact=value).exists():
+        # Async views look the email up themselves and pass the result
+        email_taken = self.context.get('email_taken')
+        if email_taken is None:
+            email_taken = User.objects.filter(email=User.objects.normalize_email(value)).exists()
+        if email_taken:
             raise serializers.ValidationError('A user with this email already exists.')
-        return value.lower()
+        return User.objects.normalize_email(value)
 
     def validate(self, attrs):
         """Validate password match and strength"""
@@ -81,6 +90,11 @@ class LoginSerializer(serializers.Serializer):
         style={'input_type': 'password'}
     )
 
+    default_error_messages = {
+        'invalid_credentials': 'Invalid credentials. Please try again.',
+        'inactive': 'This account has been deactivated.',
+    }
+
     def validate(self, attrs):
         """Authenticate user credentials"""
         email = attrs.get('email')
@@ -91,32 +105,73 @@ class LoginSerializer(serializers.Serializer):
                 'Both email and password are required.'
             )
 
+        # Async views authenticate off the event loop and only validate here
+        if self.context.get('defer_authentication'):
+            return attrs
+
+        # Credentials are always checked against the primary: a replica
+        # could still accept a password that was just changed
+        pin_primary()
+
         # Authenticate with email
         user = authenticate(
             request=self.context.get('request'),
-            username=email.lower(),  # USERNAME_FIELD is email
+            username=email,  # USERNAME_FIELD is email, normalized by get_by_natural_key
             password=password
         )
 
         if not user:
-            raise serializers.ValidationError(
-                'Invalid credentials. Please try again.'
-            )
+            self.fail('invalid_credentials')
 
         if not user.is_active:
-            raise serializers.ValidationError(
-                'This account has been deactivated.'
-            )
+            self.fail('inactive')
 
         attrs['user'] = user
         return attrs
 
 
+@lru_cache(maxsize=None)
+def _readable_fields(serializer_class, only):
+    """
+    Readable fields of a serializer class (restricted to `only`), built once:
+    ModelSerializer otherwise rebuilds them from the model for every instance
+    """
+    return tuple(serializer_class(fields=only)._readable_fields)
+
+
 class ProfileSerializer(serializers.ModelSerializer):
     """
     Serializer for user profile (read-only)
+    Pass fields=[...] to render a subset of the fields.
     """
 
+    def __init__(self, *args, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.only = None if fields is None else frozenset(fields)
+
+    def get_fields(self):
+        fields = super().get_fields()
+        if self.only is not None:
+            for name in set(fields) - self.only:
+                fields.pop(name)
+        return fields
+
+    def to_representation(self, instance):
+        return self.represent(instance, self.only)
+
+    @classmethod
+    def represent(cls, instance, fields=None):
+        """
+        Representation of instance as a plain dict, in Meta.fields order,
+        without a serializer instance or the ReturnDict copy made by .data
+        """
+        only = None if fields is None else frozenset(fields)
+        ret = {}
+        for field in _readable_fields(cls, only):
+            attribute = field.get_attribute(instance)
+            ret[field.field_name] = None if attribute is None else field.to_representation(attribute)
+        return ret
+
     class Meta:
         model = User
         fields = [
@@ -134,16 +189,22 @@ class ProfileUpdateSerializer(serializers.ModelSerializer):
         model = User
         fields = ['full_name', 'email']
         extra_kwargs = {
-            'email': {'required': False},
+            # Uniqueness is checked once, in validate_email
+            'email': {'required': False, 'validators': []},
             'full_name': {'required': False}
         }
 
     def validate_email(self, value):
         """Validate email uniqueness (exclude current user)"""
         user = self.instance
-        if User.objects.filter(email__iexact=value).exclude(pk=user.pk).exists():
+        email_taken = self.context.get('email_taken')
+        if email_taken is None:
+            email_taken = User.objects.filter(
+                email=User.objects.normalize_email(value)
+            ).exclude(pk=user.pk).exists()
+        if email_taken:
             raise serializers.ValidationError('A user with this email already exists.')
-        return value.lower()
+        return User.objects.normalize_email(value)
 
     def update(self, instance, validated_data):
         """Update user profile"""
@@ -0,0 +1,102 @@
+"""
+User Model Signal Handlers
+"""
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group, Permission
+from django.db.models.signals import m2m_changed, post_delete, post_migrate, post_save
+from django.dispatch import receiver
+
+from .authentication import store_token_state, clear_token_state
+from .cache import user_cache
+from .conf import users_settings
+from .models import UserEvent
+from .permissions import permission_cache
+from .routers import stick_to_primary
+from .search import search_index
+
+User = get_user_model()
+
+
+@receiver(post_save, sender=User)
+def refresh_token_state(sender, instance, **kwargs):
+    """Publish the new token version / status so revocation is immediate"""
+    store_token_state(instance)
+
+
+@receiver(post_save, sender=User)
+def invalidate_cached_user(sender, instance, **kwargs):
+    """Evict the cached copy on every write (serializers, views, admin, manager)"""
+    user_cache.invalidate(instance.pk)
+
+
+@receiver(post_save, sender=User)
+def pin_writer_to_primary(sender, instance, **kwargs):
+    """Let the user read their own write while replicas catch up"""
+    stick_to_primary(instance.pk)
+
+
+@receiver(post_save, sender=User)
+def update_search_index(sender, instance, using, update_fields=None, **kwargs):
+    """Re-index the searchable fields when they may have changed"""
+    if update_fields is not None and not {'email', 'full_name'} & set(update_fields):
+        return
+    search_index.index_user(instance, using=using)
+
+
+@receiver(post_save, sender=User)
+def invalidate_user_permissions(sender, instance, **kwargs):
+    """Active status and superuser flag decide the cached permissions"""
+    permission_cache.invalidate([instance.pk])
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+@receiver(m2m_changed, sender=User.user_permissions.through)
+def invalidate_member_permissions(sender, instance, action, reverse, pk_set, **kwargs):
+    """A user's groups or own permissions changed"""
+    if not action.startswith('post_'):
+        return
+    if not reverse:
+        permission_cache.invalidate([instance.pk])
+    elif pk_set is not None:
+        # From the group / permission side: pk_set holds the users
+        permission_cache.invalidate(pk_set)
+    else:
+        # Cleared from the group / permission side: members unknown
+        permission_cache.invalidate_all()
+
+
+@receiver(m2m_changed, sender=Group.permissions.through)
+def invalidate_group_permissions(sender, action, **kwargs):
+    """A group's permissions changed: every member may be affected"""
+    if action.startswith('post_'):
+        permission_cache.invalidate_all()
+
+
+@receiver(post_delete, sender=Group)
+@receiver(post_save, sender=Permission)
+@receiver(post_delete, sender=Permission)
+@receiver(post_migrate)
+def invalidate_all_permissions(sender, **kwargs):
+    """Groups or permissions were removed or created (migrate bulk-creates them)"""
+    permission_cache.invalidate_all()
+
+
+@receiver(post_delete, sender=User)
+def drop_token_state(sender, instance, **kwargs):
+    """Forget the token state of a deleted user"""
+    clear_token_state(instance.pk)
+    user_cache.invalidate(instance.pk)
+    permission_cache.invalidate([instance.pk])
+
+
+@receiver(post_delete, sender=User)
+def remove_from_search_index(sender, instance, using, **kwargs):
+    """Drop a deleted user from the search index"""
+    search_index.remove_user(instance.pk, using=using)
+
+
+@receiver(post_delete, sender=User)
+def record_user_deleted(sender, instance, using, **kwargs):
+    """Publish the deletion, in the deleting transaction"""
+    if users_settings.EVENTS_ENABLED:
+        UserEvent.record([(UserEvent.DELETED, instance.pk, {'email': instance.email})], using=using)
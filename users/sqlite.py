@@ -0,0 +1,112 @@
+"""
+Production SQLite Support
+- PRAGMAs from USERS['SQLITE_PRAGMAS'] (WAL, synchronous, busy_timeout,
+  mmap_size, cache_size...) are applied to every new connection
+- a single-writer queue: with USERS['SQLITE_WRITE_QUEUE'] on, autocommit
+  writes of the users app run one at a time on a dedicated thread, so
+  request threads never compete for SQLite's write lock while reads keep
+  running concurrently under WAL
+"""
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.db import DEFAULT_DB_ALIAS, close_old_connections, connections, transaction
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+from .conf import users_settings
+from .instrumentation import timed
+from .routers import pin_primary
+
+
+@receiver(connection_created)
+def apply_sqlite_pragmas(sender, connection, **kwargs):
+    """Tune each new SQLite connection"""
+    if connection.vendor != 'sqlite':
+        return
+    pragmas = users_settings.SQLITE_PRAGMAS
+    if not pragmas:
+        return
+    with connection.cursor() as cursor:
+        for name, value in pragmas.items():
+            cursor.execute('PRAGMA %s = %s' % (name, value))
+
+
+class WriteQueue:
+    """
+    One writer thread per process. Writes submitted from inside a
+    transaction (or from the writer itself) run inline, so transactional
+    code and tests keep their semantics.
+    """
+
+    def __init__(self, using=DEFAULT_DB_ALIAS):
+        self.using = using
+        self._executor = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    @property
+    def enabled(self):
+        return (
+            users_settings.SQLITE_WRITE_QUEUE
+            and connections[self.using].vendor == 'sqlite'
+        )
+
+    def _should_queue(self):
+        return (
+            self.enabled
+            and not getattr(self._local, 'is_writer', False)
+            and not connections[self.using].in_atomic_block
+        )
+
+    def _ensure_started(self):
+        if self._executor is not None and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._executor is not None and self._pid == os.getpid():
+                return
+            self._executor = ThreadPoolExecutor(
+                max_workers=1,
+                thread_name_prefix='users-sqlite-writer',
+                initializer=self._init_writer
+            )
+            self._pid = os.getpid()
+
+    def _init_writer(self):
+        self._local.is_writer = True
+
+    def _call(self, fn, args, kwargs):
+        # The writer's connection is long lived: honour CONN_MAX_AGE and
+        # health checks like the request cycle does
+        close_old_connections()
+        with transaction.atomic(using=self.using):
+            return fn(*args, **kwargs)
+
+    def run(self, fn, *args, **kwargs):
+        """Run the write fn(*args, **kwargs) on the writer thread and wait"""
+        if not self._should_queue():
+            return fn(*args, **kwargs)
+        self._ensure_started()
+        # The router only sees the write on the writer thread: pin the
+        # caller's remaining reads to the primary here
+        pin_primary()
+        try:
+            future = self._executor.submit(self._call, fn, args, kwargs)
+        except RuntimeError:
+            # The interpreter is exiting (e.g. atexit flushes): no new
+            # threads, write inline
+            return self._call(fn, args, kwargs)
+        with timed('db_write'):
+            return future.result()
+
+    def shutdown(self, wait=True):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=wait)
+            self._executor = None
+            self._pid = None
+
+
+write_queue = WriteQueue()
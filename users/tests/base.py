@@ -0,0 +1,55 @@
+"""
+Shared test setup: background threads and process pools off, caches and
+throttle budgets empty
+"""
+from django.conf import settings
+from django.core.cache import caches
+from django.test import override_settings
+from rest_framework.test import APITestCase
+
+from ..cache import user_cache
+from ..throttling import throttle_stores
+
+PASSWORD = 'Str0ngPass!x'
+
+# Everything runs inline on the test's connection and transaction
+TEST_USERS = {
+    **settings.USERS,
+    'HASHING_POOL_ENABLED': False,
+    'LAST_LOGIN_BUFFER_ENABLED': False,
+    'SQLITE_WRITE_QUEUE': False,
+    'REVOCATION_PRUNE_INTERVAL': None,
+    'THROTTLE_ENABLED': False,
+    'BATCH_WORKERS': 1,
+    'EVENTS_ENABLED': False,
+}
+
+
+@override_settings(
+    USERS=TEST_USERS,
+    PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'],
+)
+class UsersTestCase(APITestCase):
+
+    def setUp(self):
+        for cache in caches.all():
+            cache.clear()
+        user_cache.clear_local()
+        throttle_stores.reset()
+
+    def register(self, email, password=PASSWORD, full_name='Test User'):
+        return self.client.post('/users/register/', {
+            'email': email, 'full_name': full_name, 'password': password, 'password2': password
+        }, format='json')
+
+    def login(self, email, password=PASSWORD):
+        return self.client.post('/users/login/', {'email': email, 'password': password}, format='json')
+
+    def tokens(self, email, password=PASSWORD):
+        """Access and refresh tokens of a new account"""
+        response = self.register(email, password)
+        self.assertEqual(response.status_code, 201, response.content)
+        return response.json()['data']['tokens']
+
+    def bearer(self, access):
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer %s' % access)
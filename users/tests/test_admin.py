@@ -0,0 +1,160 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.admin import site
+from django.contrib.auth import get_user_model
+from django.core.paginator import EmptyPage
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from ..changelist import EstimatedCountPaginator, KeysetChangeList
+from .base import TEST_USERS, UsersTestCase
+
+User = get_user_model()
+
+
+class UserAdminFormTests(UsersTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.admin = User.objects.create_superuser('admin@example.com', 'x', full_name='Admin')
+        self.client.force_login(self.admin)
+        self.jane = User.objects.create_user('jane@example.com', 'x', full_name='Jane')
+
+    def test_add_case_variant_of_existing_email(self):
+        response = self.client.post('/admin/users/user/add/', {
+            'email': 'JANE@Example.com', 'full_name': 'Other Jane',
+            'password1': 'An0ther!Passw0rd', 'password2': 'An0ther!Passw0rd',
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('email', response.context['adminform'].form.errors)
+        self.assertEqual(User.objects.filter(full_name='Other Jane').count(), 0)
+
+    def test_add_stores_canonical_email(self):
+        response = self.client.post('/admin/users/user/add/', {
+            'email': 'John@Example.com', 'full_name': 'John',
+            'password1': 'An0ther!Passw0rd', 'password2': 'An0ther!Passw0rd',
+        })
+        self.assertEqual(response.status_code, 302)
+        self.assertTrue(User.objects.filter(email='john@example.com').exists())
+
+    def test_change_to_case_variant_of_other_email(self):
+        john = User.objects.create_user('john@example.com', 'x', full_name='John')
+        response = self.client.post('/admin/users/user/%d/change/' % john.pk, {
+            'email': 'Jane@EXAMPLE.com', 'full_name': 'John', 'is_active': 'on',
+            'last_login_0': '', 'last_login_1': '',
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('email', response.context['adminform'].form.errors)
+        john.refresh_from_db()
+        self.assertEqual(john.email, 'john@example.com')
+
+
+@override_settings(USERS={**TEST_USERS, 'ADMIN_SCALABLE_CHANGELIST': True})
+class KeysetChangeListTests(UsersTestCase):
+
+    def setUp(self):
+        super().setUp()
+        start = timezone.now() - timedelta(days=1)
+        self.admin = User.objects.create_superuser('admin@example.com', 'x', full_name='Admin')
+        User.objects.filter(pk=self.admin.pk).update(created_at=start)
+        for number in range(1, 7):
+            user = User.objects.create_user('user%d@example.com' % number, 'x', full_name='User %d' % number)
+            # Users 3 and 4 share their creation time
+            User.objects.filter(pk=user.pk).update(created_at=start + timedelta(minutes=min(number, 3)))
+        self.client.force_login(self.admin)
+        patcher = mock.patch.object(site._registry[User], 'list_per_page', 2)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def changelist(self, query=''):
+        response = self.client.get('/admin/users/user/' + query)
+        self.assertEqual(response.status_code, 200)
+        return response.context['cl']
+
+    def test_next_links_walk_every_row_once(self):
+        expected = list(User.objects.order_by('-created_at', '-pk').values_list('email', flat=True))
+        emails = []
+        cl = self.changelist()
+        self.assertIsInstance(cl, KeysetChangeList)
+        while True:
+            emails += [user.email for user in cl.result_list]
+            if cl.next_page_url is None:
+                break
+            self.assertIn('after=', cl.next_page_url)
+            cl = self.changelist(cl.next_page_url)
+        self.assertEqual(emails, expected)
+
+    def test_cursor_pages_are_index_ranges(self):
+        cl = self.changelist()
+        with CaptureQueriesContext(connection) as queries:
+            self.changelist(cl.next_page_url)
+        self.assertFalse([query for query in queries if 'OFFSET' in query['sql']])
+
+    def test_invalid_cursor_starts_over(self):
+        cl = self.changelist('?after=garbage')
+        self.assertEqual([user.email for user in cl.result_list], ['user6@example.com', 'user5@example.com'])
+
+    def test_other_orderings_page_by_number(self):
+        cl = self.changelist('?o=1')
+        self.assertIsNone(cl.next_page_url)
+        self.assertEqual(cl.paginator.num_pages, 4)
+
+    def test_password_hash_is_not_loaded(self):
+        cl = self.changelist()
+        self.assertIn('password', cl.result_list[0].get_deferred_fields())
+
+    def test_counted_boolean_filters(self):
+        response = self.client.get('/admin/users/user/')
+        self.assertContains(response, 'Yes (1)')
+        self.assertContains(response, 'No (6)')
+
+    @override_settings(USERS={**TEST_USERS, 'ADMIN_SCALABLE_CHANGELIST': True, 'ADMIN_COUNT_LIMIT': 3})
+    def test_counts_past_the_limit_are_estimates(self):
+        response = self.client.get('/admin/users/user/')
+        self.assertContains(response, 'about 7 Users')
+        response = self.client.get('/admin/users/user/?is_active__exact=1')
+        self.assertContains(response, 'about 4 Users')
+
+
+class EstimatedCountPaginatorTests(UsersTestCase):
+
+    def setUp(self):
+        super().setUp()
+        for number in range(1, 6):
+            User.objects.create_user('user%d@example.com' % number, 'x', full_name='User %d' % number)
+
+    def test_exact_count_under_the_limit(self):
+        paginator = EstimatedCountPaginator(User.objects.all(), 2, count_limit=10)
+        self.assertEqual(paginator.count, 5)
+        self.assertFalse(paginator.estimated)
+        with self.assertRaises(EmptyPage):
+            paginator.page(4)
+
+    def test_unfiltered_count_from_statistics(self):
+        User.objects.get(email='user1@example.com').delete()
+        paginator = EstimatedCountPaginator(User.objects.all(), 2, count_limit=3)
+        # Without ANALYZE statistics SQLite's estimate is the highest rowid
+        self.assertEqual(paginator.count, User.objects.get(email='user5@example.com').pk)
+        self.assertGreater(paginator.count, 4)
+        self.assertTrue(paginator.estimated)
+        self.assertEqual(list(paginator.page(4)), [])
+
+    def test_filtered_count_stops_at_the_limit(self):
+        paginator = EstimatedCountPaginator(User.objects.filter(is_active=True), 2, count_limit=3)
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(paginator.count, 4)
+        self.assertIn('LIMIT 4', queries[0]['sql'])
+        self.assertTrue(paginator.estimated)
+
+    def test_deep_pages_use_a_deferred_join(self):
+        queryset = User.objects.order_by('email')
+        paginator = EstimatedCountPaginator(queryset, 2, count_limit=10)
+        paginator.deferred_join_offset = 2
+        self.assertEqual(paginator.count, 5)
+        with CaptureQueriesContext(connection) as queries:
+            page = list(paginator.page(2))
+        self.assertEqual([user.email for user in page], ['user3@example.com', 'user4@example.com'])
+        self.assertEqual(len(queries), 2)
@@ -0,0 +1,113 @@
+import json
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.test import override_settings
+
+from ..events import dispatch_batch
+from .base import PASSWORD, TEST_USERS, UsersTestCase
+
+User = get_user_model()
+
+NEW_PASSWORD = 'N3wer!Passw0rd'
+
+
+class AsyncViewsTests(UsersTestCase):
+
+    async def post(self, path, data, access=None, **headers):
+        if access:
+            headers['Authorization'] = 'Bearer %s' % access
+        return await self.async_client.post(
+            '/users/async/' + path, json.dumps(data), content_type='application/json', headers=headers
+        )
+
+    async def get(self, path, access=None, **headers):
+        if access:
+            headers['Authorization'] = 'Bearer %s' % access
+        return await self.async_client.get('/users/async/' + path, headers=headers)
+
+    async def register(self, email='jane@example.com'):
+        response = await self.post('register/', {
+            'email': email, 'full_name': 'Jane', 'password': PASSWORD, 'password2': PASSWORD
+        })
+        self.assertEqual(response.status_code, 201, response.content)
+        return response.json()['data']['tokens']
+
+    async def test_register_and_login(self):
+        await self.register('Jane@Example.com')
+        response = await self.post('login/', {'email': 'JANE@example.com', 'password': PASSWORD})
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(response.json()['data']['user']['email'], 'jane@example.com')
+
+        response = await self.post('login/', {'email': 'jane@example.com', 'password': 'wrong'})
+        self.assertEqual(response.status_code, 400)
+        response = await self.post('register/', {
+            'email': 'jane@example.com', 'full_name': 'Jane', 'password': PASSWORD, 'password2': PASSWORD
+        })
+        self.assertEqual(response.status_code, 400)
+
+    async def test_profile_requires_authentication(self):
+        response = await self.get('profile/')
+        self.assertEqual(response.status_code, 401)
+        self.assertIn('WWW-Authenticate', response)
+        self.assertEqual((await self.get('profile/', access='not-a-token')).status_code, 401)
+
+    async def test_conditional_profile(self):
+        access = (await self.register())['access']
+        response = await self.get('profile/', access)
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+        self.assertEqual((await self.get('profile/', access, If_None_Match=etag)).status_code, 304)
+
+        response = await self.async_client.patch(
+            '/users/async/profile/', json.dumps({'full_name': 'Jane Doe'}), content_type='application/json',
+            headers={'Authorization': 'Bearer %s' % access, 'If-Match': etag}
+        )
+        self.assertEqual(response.status_code, 200, response.content)
+        response = await self.async_client.patch(
+            '/users/async/profile/', json.dumps({'full_name': 'Lost Update'}), content_type='application/json',
+            headers={'Authorization': 'Bearer %s' % access, 'If-Match': etag}
+        )
+        self.assertEqual(response.status_code, 412)
+        self.assertEqual((await self.get('profile/', access)).json()['data']['full_name'], 'Jane Doe')
+
+    async def test_password_change_revokes_tokens(self):
+        tokens = await self.register()
+        response = await self.post('profile/change-password/', {
+            'old_password': PASSWORD, 'new_password': NEW_PASSWORD, 'new_password2': NEW_PASSWORD
+        }, tokens['access'])
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual((await self.get('profile/', tokens['access'])).status_code, 401)
+        response = await self.post('token/refresh/', {'refresh': tokens['refresh']})
+        self.assertEqual(response.status_code, 401)
+
+    async def test_refresh_and_logout(self):
+        tokens = await self.register()
+        response = await self.post('token/refresh/', {'refresh': tokens['refresh']})
+        self.assertEqual(response.status_code, 200, response.content)
+        access = response.json()['data']['access']
+        self.assertEqual((await self.get('profile/', access)).status_code, 200)
+
+        response = await self.post('logout/', {'refresh': tokens['refresh']}, access)
+        self.assertEqual(response.status_code, 200, response.content)
+        response = await self.post('token/refresh/', {'refresh': tokens['refresh']})
+        self.assertEqual(response.status_code, 401)
+
+    async def test_invalid_json(self):
+        response = await self.async_client.post(
+            '/users/async/login/', '{not json', content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 400)
+
+    @override_settings(USERS={**TEST_USERS, 'EVENTS_ENABLED': True})
+    async def test_events_are_staff_only(self):
+        access = (await self.register())['access']
+        self.assertEqual((await self.get('events/', access)).status_code, 403)
+
+        await User.objects.acreate_user('admin@example.com', PASSWORD, full_name='Admin', is_staff=True)
+        await sync_to_async(dispatch_batch)()
+        response = await self.post('login/', {'email': 'admin@example.com', 'password': PASSWORD})
+        admin_access = response.json()['data']['tokens']['access']
+        data = (await self.get('events/?after=0', admin_access)).json()['data']
+        self.assertEqual([event['position'] for event in data['events']], [1, 2])
+        self.assertEqual(data['next'], 2)
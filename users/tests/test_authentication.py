@@ -0,0 +1,116 @@
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.test import override_settings
+from django.utils import timezone
+from rest_framework_simplejwt.token_blacklist.models import OutstandingToken
+
+from ..models import RevokedToken
+from ..revocation import prune_expired
+from .base import PASSWORD, TEST_USERS, UsersTestCase
+
+User = get_user_model()
+
+NEW_PASSWORD = 'N3wer!Passw0rd'
+
+
+class TokenRevocationTests(UsersTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.tokens = self.tokens('jane@example.com')
+        self.bearer(self.tokens['access'])
+
+    def test_access_token_works(self):
+        self.assertEqual(self.client.get('/users/profile/').status_code, 200)
+
+    def test_password_change_revokes_tokens(self):
+        response = self.client.post('/users/profile/change-password/', {
+            'old_password': PASSWORD, 'new_password': NEW_PASSWORD, 'new_password2': NEW_PASSWORD
+        }, format='json')
+        self.assertEqual(response.status_code, 200, response.content)
+
+        self.assertEqual(self.client.get('/users/profile/').status_code, 401)
+        response = self.client.post('/users/token/refresh/', {'refresh': self.tokens['refresh']}, format='json')
+        self.assertEqual(response.status_code, 401)
+
+        # Tokens issued after the change work
+        self.client.credentials()
+        access = self.login('jane@example.com', NEW_PASSWORD).json()['data']['tokens']['access']
+        self.bearer(access)
+        self.assertEqual(self.client.get('/users/profile/').status_code, 200)
+
+    def test_deactivation_revokes_tokens(self):
+        user = User.objects.get(email='jane@example.com')
+        user.is_active = False
+        user.save()
+        self.assertEqual(self.client.get('/users/profile/').status_code, 401)
+        response = self.client.post('/users/token/refresh/', {'refresh': self.tokens['refresh']}, format='json')
+        self.assertEqual(response.status_code, 401)
+
+    def test_logout_revokes_refresh_token(self):
+        response = self.client.post('/users/logout/', {'refresh': self.tokens['refresh']}, format='json')
+        self.assertEqual(response.status_code, 200, response.content)
+        response = self.client.post('/users/token/refresh/', {'refresh': self.tokens['refresh']}, format='json')
+        self.assertEqual(response.status_code, 401)
+
+
+class TokenIssueTests(UsersTestCase):
+
+    def test_issuing_tokens_writes_nothing(self):
+        self.tokens('jane@example.com')
+        self.assertEqual(self.login('jane@example.com').status_code, 200)
+        self.assertFalse(OutstandingToken.objects.exists())
+        self.assertFalse(RevokedToken.objects.exists())
+
+    def test_prune_deletes_expired_revocations(self):
+        now = timezone.now()
+        RevokedToken.objects.create(jti='expired', expires_at=now - timedelta(seconds=1))
+        RevokedToken.objects.create(jti='current', expires_at=now + timedelta(days=1))
+        self.assertEqual(prune_expired(now=now), {'revoked_tokens': 1})
+        self.assertEqual(list(RevokedToken.objects.values_list('jti', flat=True)), ['current'])
+
+
+class CanonicalEmailTests(UsersTestCase):
+
+    def test_email_is_stored_lowercased(self):
+        self.assertEqual(self.register('Jane.Doe@Example.COM').status_code, 201)
+        self.assertTrue(User.objects.filter(email='jane.doe@example.com').exists())
+
+    def test_login_ignores_case(self):
+        self.register('jane@example.com')
+        response = self.login('JANE@Example.com')
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(response.json()['data']['user']['email'], 'jane@example.com')
+
+    def test_case_variant_cannot_register(self):
+        self.register('jane@example.com')
+        response = self.register('Jane@Example.com')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('email', response.json()['errors'])
+
+
+@override_settings(USERS={
+    **TEST_USERS,
+    'THROTTLE_ENABLED': True,
+    'THROTTLE_STORE': 'local',
+    'THROTTLE_RATES': {'login_email': '2/min', 'register_ip': '3/hour'},
+})
+class ThrottleTests(UsersTestCase):
+
+    def test_login_attempts_per_email(self):
+        self.register('jane@example.com')
+        for _ in range(2):
+            self.assertEqual(self.login('jane@example.com', 'wrong').status_code, 400)
+        response = self.login('jane@example.com')
+        self.assertEqual(response.status_code, 429)
+        self.assertIn('Retry-After', response)
+        # Case variants share the budget, other accounts have their own
+        self.assertEqual(self.login('JANE@example.com').status_code, 429)
+        self.assertEqual(self.login('john@example.com').status_code, 400)
+
+    def test_registrations_per_ip(self):
+        for i in range(3):
+            self.assertEqual(self.register('user%d@example.com' % i).status_code, 201)
+        self.assertEqual(self.register('user3@example.com').status_code, 429)
+        self.assertFalse(User.objects.filter(email='user3@example.com').exists())
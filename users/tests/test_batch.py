@@ -0,0 +1,65 @@
+from django.contrib.auth import get_user_model
+
+from .base import UsersTestCase
+
+User = get_user_model()
+
+
+class BatchAuthenticationTests(UsersTestCase):
+
+    def batch(self, *requests):
+        response = self.client.post('/users/batch/', {'requests': list(requests)}, format='json')
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()['data']
+
+    def test_anonymous_sub_requests_are_unauthorized(self):
+        results = self.batch({'method': 'GET', 'path': '/users/profile/'})
+        self.assertEqual(results[0]['status'], 401)
+
+    def test_sub_request_header_cannot_authenticate(self):
+        access = self.tokens('jane@example.com')['access']
+        results = self.batch({
+            'method': 'GET', 'path': '/users/profile/',
+            'headers': {'Authorization': 'Bearer %s' % access}
+        })
+        self.assertEqual(results[0]['status'], 401)
+
+    def test_permissions_are_checked_per_sub_request(self):
+        self.bearer(self.tokens('jane@example.com')['access'])
+        results = self.batch(
+            {'method': 'GET', 'path': '/users/profile/'},
+            {'method': 'GET', 'path': '/users/'},
+            {'method': 'GET', 'path': '/users/search/?q=jane'},
+        )
+        self.assertEqual([result['status'] for result in results], [200, 403, 403])
+        self.assertEqual(results[0]['body']['data']['email'], 'jane@example.com')
+
+    def test_staff_sub_requests(self):
+        User.objects.create_user('admin@example.com', 'Adm1n!Passw0rd', full_name='Admin', is_staff=True)
+        self.bearer(self.login('admin@example.com', 'Adm1n!Passw0rd').json()['data']['tokens']['access'])
+        results = self.batch(
+            {'method': 'GET', 'path': '/users/profile/'},
+            {'method': 'GET', 'path': '/users/?fields=id,email'},
+        )
+        self.assertEqual([result['status'] for result in results], [200, 200])
+        admin_id = results[0]['body']['data']['id']
+        self.assertEqual(results[1]['body']['data']['results'], [{'id': admin_id, 'email': 'admin@example.com'}])
+
+    def test_revoked_token_fails_whole_batch(self):
+        self.bearer(self.tokens('jane@example.com')['access'])
+        user = User.objects.get(email='jane@example.com')
+        user.is_active = False
+        user.save()
+        response = self.client.post(
+            '/users/batch/', {'requests': [{'method': 'GET', 'path': '/users/profile/'}]}, format='json'
+        )
+        self.assertEqual(response.status_code, 401)
+
+    def test_writes_are_seen_by_later_reads(self):
+        self.bearer(self.tokens('jane@example.com')['access'])
+        results = self.batch(
+            {'method': 'PATCH', 'path': '/users/profile/', 'body': {'full_name': 'Jane Doe'}},
+            {'method': 'GET', 'path': '/users/profile/'},
+        )
+        self.assertEqual(results[0]['status'], 200)
+        self.assertEqual(results[1]['body']['data']['full_name'], 'Jane Doe')
@@ -0,0 +1,85 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase
+
+from ..cache import LocalLRUCache, user_cache
+from ..tokens import profile_stamp
+from .base import UsersTestCase
+
+User = get_user_model()
+
+
+class UserCacheTests(UsersTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user('jane@example.com', 'x', full_name='Jane')
+        user_cache.reset_stats()
+
+    def test_read_through(self):
+        with self.assertNumQueries(1):
+            user_cache.get(self.user.pk)
+        with self.assertNumQueries(0):
+            user_cache.get(self.user.pk)
+        user_cache.clear_local()
+        with self.assertNumQueries(0):
+            user_cache.get(self.user.pk)
+        stats = user_cache.stats()
+        self.assertEqual((stats['misses'], stats['local_hits'], stats['shared_hits']), (1, 1, 1))
+
+    def test_callers_get_their_own_copy(self):
+        first = user_cache.get(self.user.pk)
+        first.full_name = 'Changed, not saved'
+        self.assertEqual(user_cache.get(self.user.pk).full_name, 'Jane')
+
+    def test_save_invalidates_both_tiers(self):
+        user_cache.get(self.user.pk)
+        user = User.objects.get(pk=self.user.pk)
+        user.full_name = 'Jane Doe'
+        user.save()
+        with self.assertNumQueries(1):
+            self.assertEqual(user_cache.get(self.user.pk).full_name, 'Jane Doe')
+
+    def test_delete_invalidates(self):
+        user_cache.get(self.user.pk)
+        User.objects.get(pk=self.user.pk).delete()
+        with self.assertRaises(User.DoesNotExist):
+            user_cache.get(self.user.pk)
+
+    def test_older_revision_is_a_miss(self):
+        cached = user_cache.get(self.user.pk)
+        # Another process saved: the token carries the newer revision
+        User.objects.filter(pk=self.user.pk).update(full_name='Jane Doe')
+        with self.assertNumQueries(0):
+            self.assertEqual(user_cache.get(self.user.pk).full_name, 'Jane')
+        revision = profile_stamp(cached.updated_at) + 1
+        with self.assertNumQueries(1):
+            self.assertEqual(user_cache.get(self.user.pk, revision=revision).full_name, 'Jane Doe')
+
+    def test_authenticated_request_sees_profile_change(self):
+        access = self.login('jane@example.com', 'x').json()['data']['tokens']['access']
+        self.bearer(access)
+        self.client.patch('/users/profile/', {'full_name': 'Jane Doe'}, format='json')
+        self.assertEqual(self.client.get('/users/profile/').json()['data']['full_name'], 'Jane Doe')
+
+
+class LocalLRUCacheTests(SimpleTestCase):
+
+    def test_least_recently_used_is_evicted(self):
+        cache = LocalLRUCache(maxsize=2, ttl=60)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)
+        self.assertEqual((cache.get('a'), cache.get('b'), cache.get('c')), (1, None, 3))
+
+    def test_entries_expire(self):
+        cache = LocalLRUCache(maxsize=2, ttl=30)
+        with mock.patch('users.cache.time.monotonic', return_value=1000.0):
+            cache.set('a', 1)
+        with mock.patch('users.cache.time.monotonic', return_value=1029.0):
+            self.assertEqual(cache.get('a'), 1)
+        with mock.patch('users.cache.time.monotonic', return_value=1030.0):
+            self.assertIsNone(cache.get('a'))
+        self.assertEqual(len(cache), 0)
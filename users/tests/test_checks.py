@@ -0,0 +1,48 @@
+from unittest import mock
+
+from django.test import SimpleTestCase, override_settings
+
+from ..cache import shared_timeout
+from ..checks import check_shared_caches
+from .base import TEST_USERS
+
+LOCMEM = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+SHARED = {
+    **LOCMEM,
+    'shared': {'BACKEND': 'django.core.cache.backends.db.DatabaseCache', 'LOCATION': 'users_cache'},
+}
+
+
+@override_settings(CACHES=LOCMEM, USERS={**TEST_USERS, 'LOCAL_CACHE_TIMEOUT': 5})
+class SharedCacheCheckTests(SimpleTestCase):
+
+    def test_single_process(self):
+        with mock.patch.dict('os.environ', {'WEB_CONCURRENCY': '1'}):
+            self.assertEqual(check_shared_caches(None), [])
+
+    def test_workers_need_shared_caches(self):
+        with mock.patch.dict('os.environ', {'WEB_CONCURRENCY': '4'}):
+            errors = check_shared_caches(None)
+        self.assertEqual([error.id for error in errors], ['users.E001'] * 3)
+
+    @override_settings(CACHES=SHARED, USERS={
+        **TEST_USERS,
+        'WORKER_PROCESSES': 4,
+        'TOKEN_STATE_CACHE_ALIAS': 'shared',
+        'USER_CACHE_ALIAS': 'shared',
+        'PERMISSION_CACHE_ALIAS': 'default',
+    })
+    def test_only_process_local_aliases_are_reported(self):
+        errors = check_shared_caches(None)
+        self.assertEqual(len(errors), 1)
+        self.assertIn('PERMISSION_CACHE_ALIAS', errors[0].msg)
+
+    def test_process_local_timeouts_are_capped(self):
+        self.assertEqual(shared_timeout('default', 60 * 60), 5)
+        self.assertEqual(shared_timeout('default', None), 5)
+        self.assertEqual(shared_timeout('default', 1), 1)
+
+    @override_settings(CACHES=SHARED)
+    def test_shared_timeouts_are_kept(self):
+        self.assertEqual(shared_timeout('shared', 60 * 60), 60 * 60)
+        self.assertIsNone(shared_timeout('shared', None))
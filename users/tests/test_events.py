@@ -0,0 +1,97 @@
+import os
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.test import override_settings
+
+from ..events import JsonlSink, dispatch_batch, prune_published, read_events, read_jsonl
+from ..models import UserEvent
+from .base import TEST_USERS, UsersTestCase
+
+User = get_user_model()
+
+
+@override_settings(USERS={**TEST_USERS, 'EVENTS_ENABLED': True})
+class OutboxTests(UsersTestCase):
+
+    def create_user(self, email):
+        return User.objects.create_user(email, 'x', full_name='Test User')
+
+    def test_events_are_published_in_commit_order(self):
+        user = self.create_user('jane@example.com')
+        user.full_name = 'Jane Doe'
+        user.save()
+        user.set_password('Other!Passw0rd')
+        user.save()
+        user.is_active = False
+        user.save()
+        user_id = user.pk
+        user.delete()
+
+        self.assertEqual(read_events(), [])
+        events = dispatch_batch()
+        self.assertEqual([event.position for event in events], [1, 2, 3, 4, 5])
+        self.assertEqual([event.kind for event in read_events()], [
+            UserEvent.CREATED, UserEvent.UPDATED, UserEvent.PASSWORD_CHANGED,
+            UserEvent.DEACTIVATED, UserEvent.DELETED,
+        ])
+        self.assertTrue(all(event.user_id == user_id for event in events))
+        self.assertEqual(dispatch_batch(), [])
+
+    def test_batches_continue_numbering(self):
+        for i in range(5):
+            self.create_user('user%d@example.com' % i)
+        self.assertEqual([event.position for event in dispatch_batch(batch_size=3)], [1, 2, 3])
+        self.assertEqual([event.position for event in dispatch_batch(batch_size=3)], [4, 5])
+
+    def test_readers_resume_after_a_position(self):
+        for i in range(5):
+            self.create_user('user%d@example.com' % i)
+        dispatch_batch()
+        self.assertEqual([event.position for event in read_events(after=3)], [4, 5])
+        self.assertEqual([event.position for event in read_events(after=1, limit=2)], [2, 3])
+
+    def test_events_endpoint(self):
+        admin = User.objects.create_user('admin@example.com', 'x', full_name='Admin', is_staff=True)
+        for i in range(3):
+            self.create_user('user%d@example.com' % i)
+        dispatch_batch()
+        self.client.force_authenticate(admin)
+
+        data = self.client.get('/users/events/?after=0&limit=2').json()['data']
+        self.assertEqual([event['position'] for event in data['events']], [1, 2])
+        self.assertEqual(data['next'], 2)
+        data = self.client.get('/users/events/?after=%d' % data['next']).json()['data']
+        self.assertEqual([event['position'] for event in data['events']], [3, 4])
+        data = self.client.get('/users/events/?after=%d' % data['next']).json()['data']
+        self.assertEqual(data, {'events': [], 'next': 4})
+        self.assertEqual(self.client.get('/users/events/?after=-1').status_code, 400)
+
+    def test_prune_keeps_the_newest_event(self):
+        for i in range(3):
+            self.create_user('user%d@example.com' % i)
+        dispatch_batch()
+        self.assertEqual(prune_published(retention=0), 2)
+        self.assertEqual([event.position for event in read_events()], [3])
+
+        self.create_user('user3@example.com')
+        self.assertEqual([event.position for event in dispatch_batch()], [4])
+
+    def test_jsonl_sink_resumes(self):
+        for i in range(3):
+            self.create_user('user%d@example.com' % i)
+        dispatch_batch()
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'events.jsonl')
+            self.assertEqual(JsonlSink(path).sync(), 3)
+
+            # A line cut short by a crash is dropped and written again
+            with open(path, 'rb+') as file:
+                file.truncate(file.seek(0, os.SEEK_END) - 5)
+            self.create_user('user3@example.com')
+            dispatch_batch()
+            sink = JsonlSink(path)
+            self.assertEqual(sink.position, 2)
+            self.assertEqual(sink.sync(), 2)
+            self.assertEqual([event['position'] for event in read_jsonl(path)], [1, 2, 3, 4])
+            self.assertEqual([event['position'] for event in read_jsonl(path, after=3)], [4])
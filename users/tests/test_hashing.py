@@ -0,0 +1,63 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.test import override_settings
+
+from ..hashing import HashingPoolBusy, check_password, hashing_pool, make_password
+from .base import PASSWORD, TEST_USERS, UsersTestCase
+
+User = get_user_model()
+
+
+@override_settings(USERS={
+    **TEST_USERS,
+    'HASHING_POOL_ENABLED': True,
+    'HASHING_POOL_WORKERS': 1,
+    'HASHING_POOL_QUEUE_LIMIT': 0,
+    'HASHING_POOL_TIMEOUT': 30,
+})
+class HashingPoolTests(UsersTestCase):
+
+    def setUp(self):
+        super().setUp()
+        # The sleeping job is left to finish on its own
+        self.addCleanup(hashing_pool.shutdown, wait=False)
+
+    def occupy_pool(self, seconds):
+        """Take the only slot for `seconds`; returns the future"""
+        future = hashing_pool._submit(time.sleep, seconds)
+        self.addCleanup(future.cancel)
+        return future
+
+    def test_hashes_in_the_pool(self):
+        encoded = make_password(PASSWORD)
+        self.assertTrue(check_password(PASSWORD, encoded))
+        self.assertFalse(check_password('wrong', encoded))
+
+    def test_full_pool_raises_busy(self):
+        self.occupy_pool(2)
+        with self.assertRaises(HashingPoolBusy):
+            make_password(PASSWORD)
+
+    def test_full_pool_answers_login_with_503(self):
+        User.objects.create_user('jane@example.com', 'x', full_name='Jane')
+        self.occupy_pool(2)
+        response = self.login('jane@example.com', 'x')
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response['Retry-After'], '1')
+        self.assertEqual(response.json()['success'], False)
+
+    def test_full_pool_answers_registration_with_503(self):
+        self.occupy_pool(2)
+        self.assertEqual(self.register('jane@example.com').status_code, 503)
+        self.assertFalse(User.objects.filter(email='jane@example.com').exists())
+
+    def test_slot_is_released(self):
+        self.occupy_pool(0).result(timeout=30)
+        # The slot is given back by a done callback, right after the result
+        for _ in range(100):
+            if hashing_pool._slots.acquire(blocking=False):
+                hashing_pool._slots.release()
+                break
+            time.sleep(0.01)
+        self.assertTrue(check_password(PASSWORD, make_password(PASSWORD)))
@@ -0,0 +1,88 @@
+import csv
+import json
+import os
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.conf import global_settings
+from django.core.management import call_command
+from django.db import connection
+from django.test import override_settings
+
+from ..models import UserEvent
+from ..search import search_index
+from .base import TEST_USERS, UsersTestCase
+
+User = get_user_model()
+
+ROWS = [
+    {'email': 'Jane@Example.com', 'full_name': 'Jane Doe', 'password': 'Imp0rted!Pass'},
+    {'email': 'john@example.com', 'full_name': 'John Smith', 'is_staff': 'yes'},
+    {'email': 'JANE@example.com', 'full_name': 'Jane Again'},
+    {'email': 'taken@example.com', 'full_name': 'Taken'},
+    {'email': 'not-an-email', 'full_name': 'Nobody'},
+    {'full_name': 'No Email'},
+]
+
+
+# Passwords are hashed by worker processes, with the project's hashers
+@override_settings(
+    USERS={**TEST_USERS, 'EVENTS_ENABLED': True},
+    PASSWORD_HASHERS=global_settings.PASSWORD_HASHERS,
+)
+class ImportUsersTests(UsersTestCase):
+
+    def setUp(self):
+        super().setUp()
+        User.objects.create_user('taken@example.com', 'x', full_name='Already There')
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'users.jsonl')
+        self.errors = os.path.join(directory.name, 'errors.csv')
+        with open(self.path, 'w') as file:
+            file.writelines(json.dumps(row) + '\n' for row in ROWS)
+            file.write('{not json\n')
+
+    def run_import(self):
+        out = StringIO()
+        call_command('import_users', self.path, '--workers', '1', '--errors', self.errors, stdout=out)
+        return json.loads(out.getvalue().splitlines()[-1])
+
+    def check_import(self):
+        result = self.run_import()
+        self.assertEqual(
+            {key: result[key] for key in ('processed', 'created', 'duplicates', 'errors')},
+            {'processed': 7, 'created': 2, 'duplicates': 2, 'errors': 3}
+        )
+        with open(self.errors, newline='') as file:
+            rejected = {int(row['line']): row['error'] for row in csv.DictReader(file)}
+        self.assertEqual(sorted(rejected), [3, 4, 5, 6, 7])
+        self.assertEqual(rejected[3], 'Duplicate email in file')
+        self.assertEqual(rejected[4], 'A user with this email already exists.')
+        self.assertIn('Invalid JSON', rejected[7])
+
+        jane = User.objects.get(email='jane@example.com')
+        self.assertTrue(jane.check_password('Imp0rted!Pass'))
+        john = User.objects.get(email='john@example.com')
+        self.assertTrue(john.is_staff)
+        self.assertFalse(john.has_usable_password())
+        self.assertEqual(User.objects.get(email='taken@example.com').full_name, 'Already There')
+
+        # The side effects post_save would have had
+        self.assertEqual(search_index.search('jane doe', fuzzy=False)[0][0], jane.pk)
+        created = UserEvent.objects.filter(kind=UserEvent.CREATED, user_id__in=[jane.pk, john.pk])
+        self.assertEqual(created.count(), 2)
+
+    def test_import(self):
+        self.check_import()
+
+    def test_import_without_returned_ids(self):
+        with mock.patch.object(type(connection.features), 'can_return_rows_from_bulk_insert', False):
+            self.check_import()
+
+    def test_second_run_only_finds_duplicates(self):
+        self.run_import()
+        result = self.run_import()
+        self.assertEqual((result['created'], result['duplicates']), (0, 4))
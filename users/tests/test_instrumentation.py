@@ -0,0 +1,129 @@
+import re
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import SimpleTestCase, override_settings
+
+from ..instrumentation import (
+    Histogram, MetricsRegistry, RequestTimings, metrics, query_timer, server_timing,
+)
+from .base import TEST_USERS, UsersTestCase
+
+User = get_user_model()
+
+METRICS_ON = {**TEST_USERS, 'METRICS_ENABLED': True}
+
+
+class HistogramTests(SimpleTestCase):
+
+    def test_buckets_and_quantiles(self):
+        histogram = Histogram((1, 2, 5), window=60, slices=6)
+        for value in (0.5, 1.5, 1.5, 4, 9):
+            histogram.observe(value, now=0)
+        self.assertEqual(histogram.counts, [1, 2, 1, 1])
+        self.assertEqual(histogram.count, 5)
+        self.assertEqual(histogram.sum, 16.5)
+        self.assertEqual(histogram.quantile(0.5, now=0), 1.75)
+        # Beyond the last bucket the estimate is its bound
+        self.assertEqual(histogram.quantile(0.99, now=0), 5)
+
+    def test_quantiles_cover_the_window_only(self):
+        histogram = Histogram((1, 2, 5), window=60, slices=6)
+        histogram.observe(4, now=0)
+        histogram.observe(0.5, now=30)
+        self.assertEqual(histogram.window_counts(now=30), [1, 0, 1, 0])
+        self.assertEqual(histogram.window_counts(now=65), [1, 0, 0, 0])
+        self.assertEqual(histogram.window_counts(now=100), [0, 0, 0, 0])
+        self.assertEqual(histogram.quantile(0.5, now=100), 0.0)
+        # The cumulative counts keep everything
+        self.assertEqual(histogram.count, 2)
+
+
+@override_settings(USERS=METRICS_ON)
+class MetricsRegistryTests(SimpleTestCase):
+
+    def test_prometheus_text(self):
+        registry = MetricsRegistry()
+        timings = RequestTimings()
+        timings.queries = 3
+        timings.query_time = 0.002
+        timings.add('hashing', 0.2)
+        registry.record_request('users:login', 'POST', timings, 0.3)
+        text = registry.render()
+
+        labels = 'endpoint="users:login",method="POST"'
+        self.assertIn('# TYPE users_request_duration_seconds histogram', text)
+        self.assertIn('users_request_duration_seconds_bucket{%s,le="0.25"} 0' % labels, text)
+        self.assertIn('users_request_duration_seconds_bucket{%s,le="0.5"} 1' % labels, text)
+        self.assertIn('users_request_duration_seconds_bucket{%s,le="+Inf"} 1' % labels, text)
+        self.assertIn('users_request_duration_seconds_count{%s} 1' % labels, text)
+        self.assertIn('users_request_db_queries_bucket{%s,le="3"} 1' % labels, text)
+        self.assertIn('users_request_phase_seconds_sum{%s,phase="hashing"} 0.2' % labels, text)
+        self.assertIn('# TYPE users_request_duration_seconds_window gauge', text)
+        self.assertIn('users_request_duration_seconds_window{%s,quantile="0.5"}' % labels, text)
+
+    def test_label_values_are_escaped(self):
+        registry = MetricsRegistry()
+        registry.record_request('a"b\\c', 'GET', RequestTimings(), 0.1)
+        self.assertIn('endpoint="a\\"b\\\\c"', registry.render())
+
+    def test_server_timing(self):
+        timings = RequestTimings()
+        timings.queries = 2
+        timings.query_time = 0.0015
+        timings.add('jwt_encode', 0.001)
+        timings.add('jwt_encode', 0.001)
+        self.assertEqual(
+            server_timing(timings, 0.01),
+            'db;dur=1.50;desc="2 queries", jwt_encode;dur=2.00, total;dur=10.00'
+        )
+
+
+@override_settings(USERS=METRICS_ON)
+class RequestMetricsTests(UsersTestCase):
+
+    def setUp(self):
+        super().setUp()
+        metrics.reset()
+        # The test connection was opened before metrics were turned on
+        wrapper = connection.execute_wrapper(query_timer)
+        wrapper.__enter__()
+        self.addCleanup(wrapper.__exit__, None, None, None)
+
+    def test_server_timing_header(self):
+        response = self.register('jane@example.com')
+        self.assertEqual(response.status_code, 201)
+        header = response['Server-Timing']
+        queries = int(re.search(r'db;dur=[\d.]+;desc="(\d+) queries"', header).group(1))
+        self.assertGreater(queries, 0)
+        for phase in ('hashing', 'jwt_encode', 'render', 'total'):
+            self.assertRegex(header, r'\b%s;dur=[\d.]+' % phase)
+
+    @override_settings(USERS={**METRICS_ON, 'METRICS_SERVER_TIMING': False})
+    def test_server_timing_can_be_turned_off(self):
+        self.assertNotIn('Server-Timing', self.register('jane@example.com'))
+
+    def test_metrics_endpoint(self):
+        self.register('jane@example.com')
+        User.objects.create_user('admin@example.com', 'x', full_name='Admin', is_staff=True)
+        self.client.force_authenticate(User.objects.get(email='admin@example.com'))
+        response = self.client.get('/users/metrics/')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        text = response.content.decode()
+        self.assertRegex(text, r'users_request_duration_seconds_count\{endpoint="users:register",method="POST"\} 1')
+        self.assertRegex(text, r'users_request_phase_seconds_count\{[^}]*phase="hashing"\} 1')
+
+    def test_metrics_endpoint_is_staff_only(self):
+        self.bearer(self.tokens('jane@example.com')['access'])
+        self.assertEqual(self.client.get('/users/metrics/').status_code, 403)
+
+
+class MetricsDisabledTests(UsersTestCase):
+
+    def test_no_header_and_no_endpoint(self):
+        response = self.register('jane@example.com')
+        self.assertNotIn('Server-Timing', response)
+        User.objects.create_user('admin@example.com', 'x', full_name='Admin', is_staff=True)
+        self.client.force_authenticate(User.objects.get(email='admin@example.com'))
+        self.assertEqual(self.client.get('/users/metrics/').status_code, 404)
@@ -0,0 +1,148 @@
+from asgiref.sync import async_to_sync
+from django.contrib.auth import get_user_model
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import HttpResponse
+from django.template.response import SimpleTemplateResponse
+from django.test import Client, RequestFactory, SimpleTestCase, override_settings
+
+from ..middleware import RoutedMiddleware
+from .base import PASSWORD, TEST_USERS, UsersTestCase
+
+User = get_user_model()
+
+calls = []
+
+
+class RecordingMiddleware:
+    """Records what Django's handler would have called on it"""
+    name = 'outer'
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        calls.append((self.name, 'call'))
+        return self.get_response(request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        calls.append((self.name, 'view'))
+
+    def process_template_response(self, request, response):
+        calls.append((self.name, 'template_response'))
+        return response
+
+    def process_exception(self, request, exception):
+        calls.append((self.name, 'exception'))
+
+
+class InnerMiddleware(RecordingMiddleware):
+    name = 'inner'
+
+    def process_exception(self, request, exception):
+        calls.append((self.name, 'exception'))
+        return HttpResponse('handled', status=500)
+
+
+class UnusedMiddleware:
+    def __init__(self, get_response):
+        raise MiddlewareNotUsed
+
+
+ROUTED = {
+    **TEST_USERS,
+    'ROUTED_MIDDLEWARE': [
+        'users.tests.test_middleware.RecordingMiddleware',
+        'users.tests.test_middleware.UnusedMiddleware',
+        'users.tests.test_middleware.InnerMiddleware',
+    ],
+    'ROUTED_MIDDLEWARE_PATHS': ['/admin/'],
+}
+
+
+def view(request):
+    calls.append(('view', 'call'))
+    return HttpResponse('ok')
+
+
+@override_settings(USERS=ROUTED)
+class RoutedMiddlewareTests(SimpleTestCase):
+
+    def setUp(self):
+        calls.clear()
+        self.factory = RequestFactory()
+
+    def middleware(self, get_response=view):
+        return RoutedMiddleware(get_response)
+
+    def test_routed_paths_run_the_chain(self):
+        response = self.middleware()(self.factory.get('/admin/'))
+        self.assertEqual(response.content, b'ok')
+        self.assertEqual(calls, [('outer', 'call'), ('inner', 'call'), ('view', 'call')])
+
+    def test_other_paths_skip_the_chain(self):
+        request = self.factory.get('/users/profile/')
+        middleware = self.middleware()
+        self.assertEqual(middleware(request).content, b'ok')
+        self.assertIsNone(middleware.process_view(request, view, (), {}))
+        middleware.process_template_response(request, SimpleTemplateResponse('x'))
+        self.assertIsNone(middleware.process_exception(request, ValueError()))
+        self.assertEqual(calls, [('view', 'call')])
+
+    def test_hooks_run_in_handler_order(self):
+        request = self.factory.get('/admin/')
+        middleware = self.middleware()
+        middleware.process_view(request, view, (), {})
+        middleware.process_template_response(request, SimpleTemplateResponse('x'))
+        self.assertEqual(calls, [
+            ('outer', 'view'), ('inner', 'view'),
+            ('inner', 'template_response'), ('outer', 'template_response'),
+        ])
+
+    def test_exception_hooks_stop_at_a_response(self):
+        response = self.middleware().process_exception(self.factory.get('/admin/'), ValueError())
+        self.assertEqual(response.content, b'handled')
+        self.assertEqual(calls, [('inner', 'exception')])
+
+    def test_async_chain(self):
+        async def async_view(request):
+            calls.append(('view', 'call'))
+            return HttpResponse('ok')
+
+        async def run():
+            return await self.middleware(async_view)(self.factory.get('/admin/'))
+
+        self.assertEqual(async_to_sync(run)().content, b'ok')
+        self.assertEqual(calls, [('outer', 'call'), ('inner', 'call'), ('view', 'call')])
+
+    @override_settings(USERS={**ROUTED, 'ROUTED_MIDDLEWARE': []})
+    def test_nothing_to_route(self):
+        with self.assertRaises(MiddlewareNotUsed):
+            self.middleware()
+
+
+class RoutedMiddlewareStackTests(UsersTestCase):
+
+    def test_api_skips_sessions_and_clickjacking(self):
+        response = self.register('jane@example.com')
+        self.assertEqual(response.status_code, 201)
+        self.assertNotIn('X-Frame-Options', response)
+        self.assertFalse(response.cookies)
+
+    def test_admin_runs_the_admin_middleware(self):
+        response = self.client.get('/admin/login/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['X-Frame-Options'], 'DENY')
+        self.assertIn('csrftoken', response.cookies)
+
+    def test_admin_checks_csrf(self):
+        client = Client(enforce_csrf_checks=True)
+        response = client.post('/admin/login/', {'username': 'a@example.com', 'password': 'x'})
+        self.assertEqual(response.status_code, 403)
+
+    def test_admin_session_login(self):
+        self.register('admin@example.com')
+        User.objects.filter(email='admin@example.com').update(is_staff=True, is_superuser=True)
+        response = self.client.post('/admin/login/', {'username': 'admin@example.com', 'password': PASSWORD})
+        self.assertEqual(response.status_code, 302)
+        self.assertIn('sessionid', response.cookies)
+        self.assertEqual(self.client.get('/admin/').status_code, 200)
@@ -0,0 +1,106 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group, Permission
+
+from ..permissions import permission_cache
+from .base import UsersTestCase
+
+User = get_user_model()
+
+VIEW_USER = 'users.view_user'
+CHANGE_USER = 'users.change_user'
+
+
+class PermissionCacheTests(UsersTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.jane = User.objects.create_user('jane@example.com', 'x', full_name='Jane')
+        self.john = User.objects.create_user('john@example.com', 'x', full_name='John')
+        self.view_user = Permission.objects.get(codename='view_user', content_type__app_label='users')
+        self.change_user = Permission.objects.get(codename='change_user', content_type__app_label='users')
+        self.group = Group.objects.create(name='Support')
+
+    def perms(self, user):
+        return permission_cache.get(user.pk)
+
+    def test_entries_are_cached(self):
+        self.jane.user_permissions.add(self.view_user)
+        self.assertEqual(self.perms(self.jane), {VIEW_USER})
+        with self.assertNumQueries(0):
+            self.assertEqual(self.perms(self.jane), {VIEW_USER})
+            self.assertTrue(permission_cache.has_perms(self.jane.pk, [VIEW_USER]))
+
+    def test_own_permissions_changes(self):
+        self.assertEqual(self.perms(self.jane), frozenset())
+        self.jane.user_permissions.add(self.view_user)
+        self.assertEqual(self.perms(self.jane), {VIEW_USER})
+        self.jane.user_permissions.remove(self.view_user)
+        self.assertEqual(self.perms(self.jane), frozenset())
+        self.jane.user_permissions.set([self.change_user])
+        self.assertEqual(self.perms(self.jane), {CHANGE_USER})
+        self.jane.user_permissions.clear()
+        self.assertEqual(self.perms(self.jane), frozenset())
+
+    def test_membership_changes(self):
+        self.group.permissions.add(self.view_user)
+        self.assertEqual(self.perms(self.jane), frozenset())
+        self.jane.groups.add(self.group)
+        self.assertEqual(self.perms(self.jane), {VIEW_USER})
+        self.jane.groups.remove(self.group)
+        self.assertEqual(self.perms(self.jane), frozenset())
+
+    def test_membership_changes_from_the_group_side(self):
+        self.group.permissions.add(self.view_user)
+        self.assertEqual(self.perms(self.jane), frozenset())
+        self.assertEqual(self.perms(self.john), frozenset())
+        self.group.user_set.add(self.jane)
+        self.assertEqual(self.perms(self.jane), {VIEW_USER})
+        self.assertEqual(self.perms(self.john), frozenset())
+        self.group.user_set.clear()
+        self.assertEqual(self.perms(self.jane), frozenset())
+
+    def test_permission_holders_change_from_the_permission_side(self):
+        self.assertEqual(self.perms(self.jane), frozenset())
+        self.view_user.user_set.add(self.jane)
+        self.assertEqual(self.perms(self.jane), {VIEW_USER})
+        self.view_user.user_set.clear()
+        self.assertEqual(self.perms(self.jane), frozenset())
+
+    def test_group_permission_changes(self):
+        self.jane.groups.add(self.group)
+        self.john.groups.add(self.group)
+        self.assertEqual(self.perms(self.jane), frozenset())
+        self.group.permissions.add(self.view_user, self.change_user)
+        self.assertEqual(self.perms(self.jane), {VIEW_USER, CHANGE_USER})
+        self.assertEqual(self.perms(self.john), {VIEW_USER, CHANGE_USER})
+        self.change_user.group_set.remove(self.group)
+        self.assertEqual(self.perms(self.john), {VIEW_USER})
+        self.group.delete()
+        self.assertEqual(self.perms(self.jane), frozenset())
+
+    def test_status_changes(self):
+        self.jane.user_permissions.add(self.view_user)
+        self.assertEqual(self.perms(self.jane), {VIEW_USER})
+        self.jane.is_active = False
+        self.jane.save()
+        self.assertEqual(self.perms(self.jane), frozenset())
+        self.jane.is_active = True
+        self.jane.is_superuser = True
+        self.jane.save()
+        self.assertIn(CHANGE_USER, self.perms(self.jane))
+        self.assertTrue(permission_cache.has_perms(self.jane.pk, ['users.delete_user']))
+
+    def test_deleted_users_hold_nothing(self):
+        self.jane.user_permissions.add(self.view_user)
+        self.assertEqual(self.perms(self.jane), {VIEW_USER})
+        pk = self.jane.pk
+        self.jane.delete()
+        self.assertEqual(permission_cache.get(pk), frozenset())
+        self.assertFalse(permission_cache.has_perms(pk, []))
+
+    def test_has_perm_goes_through_the_cache(self):
+        self.group.permissions.add(self.view_user)
+        self.jane.groups.add(self.group)
+        jane = User.objects.get(pk=self.jane.pk)
+        self.assertTrue(jane.has_perm(VIEW_USER))
+        self.assertFalse(jane.has_perm(CHANGE_USER))
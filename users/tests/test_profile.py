@@ -0,0 +1,45 @@
+from .base import UsersTestCase
+
+
+class ConditionalProfileTests(UsersTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.bearer(self.tokens('jane@example.com')['access'])
+        response = self.client.get('/users/profile/')
+        self.assertEqual(response.status_code, 200)
+        self.etag = response['ETag']
+
+    def test_current_copy_is_not_modified(self):
+        response = self.client.get('/users/profile/', HTTP_IF_NONE_MATCH=self.etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], self.etag)
+        self.assertEqual(response.content, b'')
+
+    def test_update_changes_etag(self):
+        response = self.client.patch('/users/profile/', {'full_name': 'Jane Doe'}, format='json')
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertNotEqual(response['ETag'], self.etag)
+        response = self.client.get('/users/profile/', HTTP_IF_NONE_MATCH=self.etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['data']['full_name'], 'Jane Doe')
+
+    def test_update_with_current_etag(self):
+        response = self.client.patch(
+            '/users/profile/', {'full_name': 'Jane Doe'}, format='json', HTTP_IF_MATCH=self.etag
+        )
+        self.assertEqual(response.status_code, 200, response.content)
+
+    def test_update_with_stale_etag_is_refused(self):
+        self.client.patch('/users/profile/', {'full_name': 'Jane Doe'}, format='json')
+        response = self.client.patch(
+            '/users/profile/', {'full_name': 'Lost Update'}, format='json', HTTP_IF_MATCH=self.etag
+        )
+        self.assertEqual(response.status_code, 412)
+        self.assertEqual(self.client.get('/users/profile/').json()['data']['full_name'], 'Jane Doe')
+
+    def test_weak_etag_never_matches(self):
+        response = self.client.patch(
+            '/users/profile/', {'full_name': 'Jane Doe'}, format='json', HTTP_IF_MATCH='W/' + self.etag
+        )
+        self.assertEqual(response.status_code, 412)
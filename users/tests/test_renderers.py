@@ -0,0 +1,87 @@
+import datetime
+import decimal
+import io
+import unittest
+import uuid
+from unittest import mock
+
+from django.test import SimpleTestCase
+from django.utils.functional import lazy
+from rest_framework import parsers, renderers
+from rest_framework.exceptions import ParseError
+from rest_framework.utils.serializer_helpers import ReturnDict, ReturnList
+
+from .. import renderers as fast
+from .base import UsersTestCase
+
+lazy_str = lazy(lambda: 'lazy', str)
+
+SAMPLES = [
+    None,
+    [],
+    {'success': True, 'message': 'ok', 'data': None},
+    {'naïve': 'café ☕', 'count': 3, 'ratio': 0.5, 'nested': [1, {'a': None}]},
+    {1: 'int key', 'when': datetime.datetime(2024, 5, 1, 12, 30, 15, 123456, tzinfo=datetime.timezone.utc)},
+    {'naive': datetime.datetime(2024, 5, 1, 12, 30), 'date': datetime.date(2024, 5, 1),
+     'time': datetime.time(8, 0, 1)},
+    {'id': uuid.UUID('12345678-1234-5678-1234-567812345678'), 'amount': decimal.Decimal('1.10')},
+    {'lazy': lazy_str(), 'separators': 'line\u2028paragraph\u2029end', 'control': 'tab\tquote"'},
+    ReturnDict({'email': 'jane@example.com'}, serializer=None),
+    ReturnList([{'email': 'jane@example.com'}], serializer=None),
+]
+
+
+class RendererTests(SimpleTestCase):
+
+    def assertSameAsDRF(self, data, media_type='application/json', context=None):
+        expected = renderers.JSONRenderer().render(data, media_type, context)
+        self.assertEqual(fast.JSONRenderer().render(data, media_type, context), expected)
+
+    @unittest.skipIf(fast.orjson is None, 'orjson is not installed')
+    def test_orjson_is_used(self):
+        self.assertEqual(fast.BACKEND, 'orjson')
+
+    def test_output_matches_drf(self):
+        for data in SAMPLES:
+            with self.subTest(data=data):
+                self.assertSameAsDRF(data)
+
+    def test_indented_output_matches_drf(self):
+        data = {'a': [1, 2]}
+        self.assertSameAsDRF(data, 'application/json; indent=2')
+        self.assertSameAsDRF(data, context={'indent': 4})
+
+    def test_output_matches_drf_without_orjson(self):
+        with mock.patch.object(fast, 'orjson', None):
+            for data in SAMPLES:
+                with self.subTest(data=data):
+                    self.assertSameAsDRF(data)
+
+
+class ParserTests(SimpleTestCase):
+
+    def parse(self, parser, body, encoding='utf-8'):
+        return parser.parse(io.BytesIO(body), 'application/json', {'encoding': encoding})
+
+    def test_parsing_matches_drf(self):
+        body = '{"email": "jané@example.com", "n": [1, 2.5, null, true]}'.encode()
+        self.assertEqual(self.parse(fast.JSONParser(), body), self.parse(parsers.JSONParser(), body))
+
+    def test_invalid_json(self):
+        for body in (b'{"a": ', b'{"a": NaN}', b'\xff'):
+            with self.subTest(body=body):
+                with self.assertRaises(ParseError):
+                    self.parse(fast.JSONParser(), body)
+
+    def test_other_encodings_go_to_drf(self):
+        body = '{"name": "café"}'.encode('latin-1')
+        self.assertEqual(self.parse(fast.JSONParser(), body, 'latin-1'), {'name': 'café'})
+
+
+class RenderedResponseTests(UsersTestCase):
+
+    def test_api_responses_are_compact_utf8(self):
+        response = self.register('jane@example.com', full_name='Jané')
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual(response['Content-Type'], 'application/json')
+        self.assertIn('"full_name":"Jané"'.encode(), response.content)
@@ -0,0 +1,122 @@
+import os
+import shutil
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.core.management import call_command
+from django.db import DEFAULT_DB_ALIAS, connections, router, transaction
+from django.test import SimpleTestCase, override_settings
+
+from ..cache import user_cache
+from ..models import RevokedToken
+from ..routers import reset_pinning, set_request_user, stick_to_primary
+from .base import PASSWORD, TEST_USERS
+
+User = get_user_model()
+
+
+@override_settings(
+    USERS={**TEST_USERS, 'READ_REPLICAS': ['replica']},
+    PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'],
+)
+class PrimaryReplicaRouterTests(SimpleTestCase):
+    """
+    The primary and its replica are two SQLite files; replicate() copies
+    the primary over the replica, which lags behind until then
+    """
+    databases = {DEFAULT_DB_ALIAS}
+
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.mkdtemp()
+        cls.test_connection = connections[DEFAULT_DB_ALIAS]
+        primary = {**cls.test_connection.settings_dict, 'NAME': os.path.join(cls.directory, 'primary.sqlite3')}
+        connections[DEFAULT_DB_ALIAS] = cls.test_connection.__class__(primary, DEFAULT_DB_ALIAS)
+        super().setUpClass()
+        # Added after the test case set up its database checks: the alias
+        # only exists for these tests
+        connections.settings['replica'] = {**primary, 'NAME': os.path.join(cls.directory, 'replica.sqlite3')}
+        call_command('migrate', database=DEFAULT_DB_ALIAS, verbosity=0)
+
+    @classmethod
+    def tearDownClass(cls):
+        for alias in (DEFAULT_DB_ALIAS, 'replica'):
+            connections[alias].close()
+        connections[DEFAULT_DB_ALIAS] = cls.test_connection
+        del connections['replica']
+        del connections.settings['replica']
+        shutil.rmtree(cls.directory)
+        super().tearDownClass()
+
+    def setUp(self):
+        User.objects.all().delete()
+        self.replicate()
+        for cache in caches.all():
+            cache.clear()
+        user_cache.clear_local()
+        reset_pinning()
+        self.addCleanup(reset_pinning)
+
+    def replicate(self):
+        primary, replica = connections[DEFAULT_DB_ALIAS], connections['replica']
+        primary.ensure_connection()
+        replica.ensure_connection()
+        primary.connection.backup(replica.connection)
+
+    def create_user(self, email):
+        user = User.objects.create_user(email, PASSWORD, full_name='Test User')
+        reset_pinning()
+        return user
+
+    def test_reads_go_to_the_replica(self):
+        self.create_user('jane@example.com')
+        self.assertEqual(router.db_for_read(User), 'replica')
+        self.assertFalse(User.objects.filter(email='jane@example.com').exists())
+        self.replicate()
+        self.assertTrue(User.objects.filter(email='jane@example.com').exists())
+
+    def test_writes_go_to_the_primary_and_pin_its_reads(self):
+        User.objects.create_user('jane@example.com', PASSWORD, full_name='Jane')
+        self.assertEqual(router.db_for_read(User), DEFAULT_DB_ALIAS)
+        self.assertTrue(User.objects.filter(email='jane@example.com').exists())
+        self.assertFalse(User.objects.using('replica').filter(email='jane@example.com').exists())
+
+    def test_transactions_read_the_primary(self):
+        self.create_user('jane@example.com')
+        with transaction.atomic():
+            self.assertTrue(User.objects.filter(email='jane@example.com').exists())
+
+    def test_recent_writers_read_the_primary(self):
+        jane = self.create_user('jane@example.com')
+        john = self.create_user('john@example.com')
+        caches['default'].clear()
+        stick_to_primary(jane.pk)
+        set_request_user(john.pk)
+        self.assertEqual(router.db_for_read(User), 'replica')
+        set_request_user(jane.pk)
+        self.assertEqual(router.db_for_read(User), DEFAULT_DB_ALIAS)
+
+    def test_revoked_tokens_are_read_from_the_primary(self):
+        self.assertEqual(router.db_for_read(RevokedToken), DEFAULT_DB_ALIAS)
+
+    def test_users_read_their_own_writes_over_the_api(self):
+        response = self.client.post('/users/register/', {
+            'email': 'jane@example.com', 'full_name': 'Jane', 'password': PASSWORD, 'password2': PASSWORD
+        }, content_type='application/json')
+        self.assertEqual(response.status_code, 201, response.content)
+        headers = {'Authorization': 'Bearer %s' % response.json()['data']['tokens']['access']}
+
+        response = self.client.get('/users/profile/', headers=headers)
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(response.json()['data']['email'], 'jane@example.com')
+
+        # Once the stickiness has passed the replica answers
+        for cache in caches.all():
+            cache.clear()
+        user_cache.clear_local()
+        response = self.client.get('/users/profile/', headers=headers)
+        self.assertEqual(response.status_code, 401, response.content)
+        self.replicate()
+        response = self.client.get('/users/profile/', headers=headers)
+        self.assertEqual(response.status_code, 200, response.content)
@@ -0,0 +1,68 @@
+from django.contrib.auth import get_user_model
+from django.test import override_settings
+
+from ..search import min_shared_trigrams, search_index, trigrams
+from .base import TEST_USERS, UsersTestCase
+
+User = get_user_model()
+
+
+class SearchTestMixin:
+
+    def setUp(self):
+        super().setUp()
+        self.users = {}
+        for i in range(30):
+            User.objects.create_user('filler%d@example.com' % i, 'x', full_name='Jo Filler')
+        for name in ('John Smith', 'Johnny Appleseed', 'Jane Doe', 'Jon Snow'):
+            email = '%s@mail.test' % name.split()[0].lower()
+            self.users[name] = User.objects.create_user(email, 'x', full_name=name).pk
+
+    def search(self, query, limit=20, fuzzy=True):
+        return search_index.search(query, limit=limit, fuzzy=fuzzy)
+
+    def test_whole_words_rank_first(self):
+        ranked = self.search('john', limit=2, fuzzy=False)
+        self.assertEqual(
+            [user_id for user_id, _ in ranked], [self.users['John Smith'], self.users['Johnny Appleseed']]
+        )
+
+    def test_limit_does_not_hide_best_matches(self):
+        # 30 users match "jo" as a whole word, 3 more by prefix only
+        ranked = self.search('jo', limit=40, fuzzy=False)
+        self.assertEqual(len(ranked), 33)
+        self.assertTrue(all(score == 2.0 for _, score in ranked[:30]))
+        self.assertEqual(ranked[:5], self.search('jo', limit=5, fuzzy=False))
+
+    def test_every_query_word_must_match(self):
+        ranked = self.search('jane doe', fuzzy=False)
+        self.assertEqual([user_id for user_id, _ in ranked], [self.users['Jane Doe']])
+
+    def test_typos(self):
+        ranked = self.search('johny appleseeed', limit=5)
+        self.assertEqual(ranked[0][0], self.users['Johnny Appleseed'])
+        self.assertLess(ranked[0][1], 1.0)
+
+    def test_unrelated_query(self):
+        self.assertEqual(self.search('zzzzzz'), [])
+
+
+@override_settings(USERS={**TEST_USERS, 'SEARCH_BACKEND': 'fts5'})
+class FTS5SearchTests(SearchTestMixin, UsersTestCase):
+    pass
+
+
+@override_settings(USERS={**TEST_USERS, 'SEARCH_BACKEND': 'table'})
+class TableSearchTests(SearchTestMixin, UsersTestCase):
+    pass
+
+
+class MinSharedTrigramsTests(UsersTestCase):
+
+    def test_bound(self):
+        self.assertEqual(len(trigrams(['jonathan'])), 9)
+        self.assertEqual(min_shared_trigrams(['jonathan'], 0.3), 3)
+        # 0.3 * 10 is 3.0000000000000004 in floating point
+        self.assertEqual(min_shared_trigrams(['abcdefghi'], 0.3), 3)
+        self.assertEqual(min_shared_trigrams(['jo', 'jonathan'], 0.3), 1)
+        self.assertEqual(min_shared_trigrams(['jonathan'], 0), 1)
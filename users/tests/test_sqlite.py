@@ -0,0 +1,66 @@
+import threading
+
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError, connection, transaction
+from django.test import TransactionTestCase, override_settings
+
+from ..sqlite import WriteQueue
+from .base import TEST_USERS, UsersTestCase
+
+User = get_user_model()
+
+QUEUED = {**TEST_USERS, 'SQLITE_WRITE_QUEUE': True}
+
+
+def current_thread():
+    return threading.current_thread().name
+
+
+@override_settings(USERS=QUEUED)
+class WriteQueueInlineTests(UsersTestCase):
+
+    def test_writes_in_a_transaction_run_inline(self):
+        # Each TestCase test runs in a transaction
+        queue = WriteQueue()
+        self.assertEqual(queue.run(current_thread), threading.current_thread().name)
+        self.assertIsNone(queue._executor)
+
+    @override_settings(USERS=TEST_USERS)
+    def test_queue_is_off_unless_configured(self):
+        self.assertFalse(WriteQueue().enabled)
+
+
+@override_settings(USERS=QUEUED)
+class WriteQueueThreadTests(TransactionTestCase):
+
+    def setUp(self):
+        self.queue = WriteQueue()
+        self.addCleanup(self.queue.shutdown)
+
+    def test_autocommit_writes_run_on_the_writer(self):
+        self.assertTrue(self.queue.run(current_thread).startswith('users-sqlite-writer'))
+
+    def test_writes_inside_atomic_run_inline(self):
+        with transaction.atomic():
+            self.assertEqual(self.queue.run(current_thread), threading.current_thread().name)
+        self.assertIsNone(self.queue._executor)
+
+    def test_writes_from_the_writer_run_inline(self):
+        def nested():
+            return self.queue.run(current_thread)
+        self.assertTrue(self.queue.run(nested).startswith('users-sqlite-writer'))
+
+    def test_writer_commits(self):
+        user = self.queue.run(User.objects.create_user, 'jane@example.com', 'x', full_name='Jane')
+        self.assertFalse(connection.in_atomic_block)
+        self.assertTrue(User.objects.filter(pk=user.pk).exists())
+
+    def test_errors_reach_the_caller_and_roll_back(self):
+        def create_twice():
+            User.objects.create_user('jane@example.com', 'x', full_name='Jane')
+            User.objects.create_user('JANE@example.com', 'x', full_name='Jane')
+        with self.assertRaises(IntegrityError):
+            self.queue.run(create_twice)
+        self.assertFalse(User.objects.exists())
+        # The writer survives the error
+        self.assertTrue(self.queue.run(current_thread).startswith('users-sqlite-writer'))
@@ -0,0 +1,103 @@
+import time
+from unittest import mock
+
+from django.test import SimpleTestCase, override_settings
+
+from ..tokens import UserAccessToken, VerifiedTokenCache, verified_tokens
+from .base import PASSWORD, TEST_USERS, UsersTestCase
+
+NEW_PASSWORD = 'N3wer!Passw0rd'
+
+
+class VerifiedTokenCacheTests(SimpleTestCase):
+
+    def payload(self, lifetime=60, **claims):
+        return {'exp': int(time.time()) + lifetime, **claims}
+
+    def test_least_recently_used_entries_are_evicted(self):
+        cache = VerifiedTokenCache(maxsize=2)
+        cache.set('a', self.payload())
+        cache.set('b', self.payload())
+        cache.get('a')
+        cache.set('c', self.payload())
+        self.assertEqual(len(cache), 2)
+        self.assertIsNone(cache.get('b'))
+        self.assertIsNotNone(cache.get('a'))
+        self.assertIsNotNone(cache.get('c'))
+
+    def test_entries_expire_with_the_token(self):
+        cache = VerifiedTokenCache()
+        payload = self.payload(lifetime=60)
+        cache.set('a', payload)
+        with mock.patch('users.tokens.time.time', return_value=payload['exp'] - 1):
+            self.assertEqual(cache.get('a'), payload)
+        with mock.patch('users.tokens.time.time', return_value=payload['exp']):
+            self.assertIsNone(cache.get('a'))
+        self.assertEqual(len(cache), 0)
+
+    def test_payloads_without_exp_are_not_cached(self):
+        cache = VerifiedTokenCache()
+        cache.set('a', {'user_id': 1})
+        self.assertEqual(len(cache), 0)
+
+    def test_size_zero_disables_the_cache(self):
+        cache = VerifiedTokenCache(maxsize=0)
+        cache.set('a', self.payload())
+        self.assertIsNone(cache.get('a'))
+
+    def test_callers_get_copies(self):
+        cache = VerifiedTokenCache()
+        cache.set('a', self.payload(email='jane@example.com'))
+        cache.get('a')['email'] = 'changed'
+        self.assertEqual(cache.get('a')['email'], 'jane@example.com')
+
+
+@override_settings(USERS={**TEST_USERS, 'VERIFIED_TOKEN_CACHE_ENABLED': True})
+class VerifiedTokenDecodeTests(UsersTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.tokens = self.tokens('jane@example.com')
+        self.bearer(self.tokens['access'])
+        backend = UserAccessToken(self.tokens['access']).token_backend.backend
+        verified_tokens.clear()
+        patcher = mock.patch.object(backend, 'decode', wraps=backend.decode)
+        self.decode = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_repeated_requests_skip_the_decode(self):
+        self.assertEqual(self.client.get('/users/profile/').status_code, 200)
+        self.assertEqual(self.client.get('/users/profile/').status_code, 200)
+        self.assertEqual(self.decode.call_count, 1)
+
+    def test_expired_entries_are_decoded_again(self):
+        self.client.get('/users/profile/')
+        exp = UserAccessToken(self.tokens['access'])['exp']
+        with mock.patch('users.tokens.time.time', return_value=exp):
+            self.assertEqual(self.client.get('/users/profile/').status_code, 200)
+        self.assertEqual(self.decode.call_count, 2)
+
+    def test_revoked_tokens_are_rejected_from_the_cache(self):
+        # Logging out decodes (and caches) the access and refresh tokens
+        response = self.client.post('/users/logout/', {'refresh': self.tokens['refresh']}, format='json')
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(self.decode.call_count, 2)
+
+        response = self.client.post('/users/token/refresh/', {'refresh': self.tokens['refresh']}, format='json')
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(self.decode.call_count, 2)
+
+    def test_password_change_rejects_cached_access_tokens(self):
+        self.assertEqual(self.client.get('/users/profile/').status_code, 200)
+        response = self.client.post('/users/profile/change-password/', {
+            'old_password': PASSWORD, 'new_password': NEW_PASSWORD, 'new_password2': NEW_PASSWORD
+        }, format='json')
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(self.client.get('/users/profile/').status_code, 401)
+        self.assertIn(verified_tokens.key(self.tokens['access']), verified_tokens._data)
+
+    def test_bad_signatures_are_not_cached(self):
+        self.bearer(self.tokens['access'][:-2] + 'xx')
+        self.assertEqual(self.client.get('/users/profile/').status_code, 401)
+        self.assertEqual(self.client.get('/users/profile/').status_code, 401)
+        self.assertEqual(self.decode.call_count, 2)
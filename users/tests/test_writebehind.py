@@ -0,0 +1,115 @@
+import os
+import time
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.db import OperationalError
+from django.test import TransactionTestCase, override_settings
+from django.utils import timezone
+
+from ..cache import user_cache
+from ..writebehind import LastLoginBuffer
+from .base import TEST_USERS, UsersTestCase
+
+User = get_user_model()
+
+BUFFERED = {**TEST_USERS, 'LAST_LOGIN_BUFFER_ENABLED': True, 'LAST_LOGIN_FLUSH_SIZE': 3}
+
+
+@override_settings(USERS=BUFFERED)
+class LastLoginBufferTests(UsersTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.buffer = LastLoginBuffer()
+        # Flushed by the tests rather than by the background thread
+        self.buffer._pid = os.getpid()
+        self.jane = User.objects.create_user('jane@example.com', 'x', full_name='Jane')
+        self.john = User.objects.create_user('john@example.com', 'x', full_name='John')
+
+    def test_logins_are_coalesced_per_user(self):
+        now = timezone.now()
+        self.buffer.record(self.jane.pk, now)
+        self.buffer.record(self.jane.pk, now - timedelta(seconds=5))
+        self.buffer.record(self.john.pk, now)
+        self.assertEqual(self.buffer.pending(), 2)
+        self.assertIsNone(User.objects.get(pk=self.jane.pk).last_login)
+
+        with self.assertNumQueries(1):
+            self.assertEqual(self.buffer.flush(), 2)
+        self.assertEqual(self.buffer.pending(), 0)
+        self.assertEqual(User.objects.get(pk=self.jane.pk).last_login, now)
+        self.assertEqual(self.buffer.flush(), 0)
+
+    def test_flush_leaves_updated_at_alone(self):
+        self.buffer.record(self.jane.pk)
+        self.buffer.flush()
+        self.assertEqual(User.objects.get(pk=self.jane.pk).updated_at, self.jane.updated_at)
+
+    def test_flush_evicts_cached_users(self):
+        user_cache.get(self.jane.pk)
+        self.buffer.record(self.jane.pk)
+        self.buffer.flush()
+        self.assertIsNotNone(user_cache.get(self.jane.pk).last_login)
+
+    def test_failed_flush_keeps_entries(self):
+        now = timezone.now()
+        self.buffer.record(self.jane.pk, now)
+        self.buffer.record(self.john.pk, now)
+        with mock.patch('users.writebehind.write_queue.run', side_effect=OperationalError('locked')):
+            with self.assertRaises(OperationalError):
+                self.buffer.flush()
+        self.assertEqual(self.buffer.pending(), 2)
+        self.assertEqual(self.buffer.flush(), 2)
+        self.assertEqual(User.objects.get(pk=self.john.pk).last_login, now)
+
+    def test_flush_size_wakes_the_thread(self):
+        for user_id in (self.jane.pk, self.john.pk):
+            self.buffer.record(user_id)
+        self.assertFalse(self.buffer._wakeup.is_set())
+        self.buffer.record(User.objects.create_user('jo@example.com', 'x', full_name='Jo').pk)
+        self.assertTrue(self.buffer._wakeup.is_set())
+
+    def test_drain_at_exit(self):
+        self.buffer.record(self.jane.pk)
+        self.buffer.drain()
+        self.assertIsNotNone(User.objects.get(pk=self.jane.pk).last_login)
+
+    def test_drain_in_another_process_writes_nothing(self):
+        self.buffer.record(self.jane.pk)
+        # A forked child inherits the entries, the parent writes them
+        self.buffer._pid = os.getpid() + 1
+        self.buffer.drain()
+        self.assertIsNone(User.objects.get(pk=self.jane.pk).last_login)
+
+    def test_first_use_starts_the_thread_and_registers_the_drain(self):
+        buffer = LastLoginBuffer()
+        with mock.patch('users.writebehind.threading.Thread') as thread, \
+                mock.patch('users.writebehind.atexit.register') as register:
+            buffer.record(self.jane.pk)
+            buffer.record(self.john.pk)
+        thread.return_value.start.assert_called_once_with()
+        register.assert_called_once_with(buffer.drain)
+
+    @override_settings(USERS={**TEST_USERS, 'LAST_LOGIN_BUFFER_ENABLED': False})
+    def test_disabled_buffer_writes_on_login(self):
+        self.buffer.record(self.jane.pk)
+        self.assertEqual(self.buffer.pending(), 0)
+        self.assertIsNotNone(User.objects.get(pk=self.jane.pk).last_login)
+
+
+@override_settings(USERS={**BUFFERED, 'LAST_LOGIN_FLUSH_INTERVAL': 0.05})
+class LastLoginThreadTests(TransactionTestCase):
+
+    def test_background_thread_writes_logins(self):
+        user = User.objects.create_user('jane@example.com', 'x', full_name='Jane')
+        buffer = LastLoginBuffer()
+        with mock.patch('users.writebehind.atexit.register'):
+            buffer.record(user.pk)
+        self.addCleanup(setattr, buffer, '_pid', None)  # stops the thread
+        deadline = time.monotonic() + 5
+        while User.objects.get(pk=user.pk).last_login is None and time.monotonic() < deadline:
+            time.sleep(0.02)
+        self.assertIsNotNone(User.objects.get(pk=user.pk).last_login)
+        self.assertEqual(buffer.pending(), 0)
@@ -0,0 +1,220 @@
+"""
+Rate Limiting of the Unauthenticated Endpoints
+Login, registration and token refresh are open to anyone, so a credential
+stuffing burst would otherwise turn into unbounded password hashing and
+database writes. AuthRateThrottle runs before the view handler (DRF calls
+throttles after authentication and permissions, the async views right
+after parsing the body) and checks, in order, a budget:
+- per client IP (DRF's get_ident: set REST_FRAMEWORK['NUM_PROXIES'],
+  X-Forwarded-For is trusted blindly when it is None)
+- per account: the normalized email of the request body
+- shared by every client (protects the hashing capacity)
+Rates come from USERS['THROTTLE_RATES'], keyed '<throttle_scope>_<kind>'
+({'login_ip': '30/min', ...}); a missing or None rate is not enforced.
+
+Budgets live in USERS['THROTTLE_STORE']:
+- 'local': token buckets in a sharded in-process dict; each server process
+  enforces the rates on its own
+- 'cache': sliding window counters in the Django cache
+  (THROTTLE_CACHE_ALIAS), shared by every worker
+"""
+import hashlib
+import threading
+import time
+from functools import lru_cache
+
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.core.signals import setting_changed
+from rest_framework.throttling import BaseThrottle
+
+from .conf import users_settings
+
+User = get_user_model()
+
+THROTTLE_CACHE_KEY = 'users:throttle:{}:{}'
+PERIODS = {'s': 1, 'm': 60, 'h': 60 * 60, 'd': 60 * 60 * 24}
+
+
+@lru_cache(maxsize=None)
+def parse_rate(rate):
+    """'<requests>/<period>' as (requests, seconds); periods: s, min, hour, day"""
+    num, period = rate.split('/')
+    return int(num), PERIODS[period[0]]
+
+
+class LocalBucketStore:
+    """
+    Token buckets (capacity `limit`, refilled at limit/period per second)
+    spread over `shards` dicts, each behind its own lock, so concurrent
+    requests rarely wait for each other. Buckets that are full again carry
+    no information and are dropped when a shard outgrows its share of
+    `max_keys`; past that, the oldest keys go first.
+    """
+    blocking = False
+
+    def __init__(self, shards=64, max_keys=100000):
+        self._shards = [({}, threading.Lock()) for _ in range(shards)]
+        self._max_shard_keys = max(1, max_keys // shards)
+
+    def consume(self, key, limit, period):
+        """Take one request from the key's budget; returns 0 if allowed, else seconds to wait"""
+        now = time.monotonic()
+        rate = limit / period
+        buckets, lock = self._shards[hash(key) % len(self._shards)]
+        with lock:
+            bucket = buckets.get(key)
+            if bucket is None:
+                tokens = limit
+            else:
+                tokens = min(limit, bucket[0] + (now - bucket[1]) * rate)
+            if tokens < 1:
+                return (1 - tokens) / rate
+            tokens -= 1
+            # (tokens, updated, when the bucket is full again)
+            buckets[key] = (tokens, now, now + (limit - tokens) / rate)
+            if len(buckets) > self._max_shard_keys:
+                self._evict(buckets, now)
+            return 0.0
+
+    def _evict(self, buckets, now):
+        for key in [key for key, bucket in buckets.items() if bucket[2] <= now]:
+            del buckets[key]
+        # Leave room so the next inserts do not scan again
+        excess = len(buckets) - self._max_shard_keys * 9 // 10
+        for key in list(buckets)[:max(excess, 0)]:
+            del buckets[key]
+
+    def clear(self):
+        for buckets, lock in self._shards:
+            with lock:
+                buckets.clear()
+
+    def __len__(self):
+        return sum(len(buckets) for buckets, _ in self._shards)
+
+
+class CacheWindowStore:
+    """
+    Sliding window counters in the Django cache: the count of the current
+    fixed window plus the previous window's, weighted by how much of it
+    still overlaps the sliding window. add() + incr() keep the count exact
+    under concurrency on memcached and Redis. Rejected requests are counted
+    too, so a client that keeps hammering stays blocked.
+    """
+    blocking = True
+
+    def __init__(self, alias='default'):
+        self.alias = alias
+
+    def consume(self, key, limit, period):
+        """Count one request against the key's budget; returns 0 if allowed, else seconds to wait"""
+        cache = caches[self.alias]
+        now = time.time()
+        window, elapsed = divmod(now, period)
+        # Emails stay out of the cache, and keys stay memcached-safe
+        digest = hashlib.blake2b(repr(key).encode(), digest_size=16).hexdigest()
+        current_key = THROTTLE_CACHE_KEY.format(digest, int(window))
+
+        previous = cache.get(THROTTLE_CACHE_KEY.format(digest, int(window) - 1), 0)
+        cache.add(current_key, 0, timeout=int(period * 2) + 1)
+        try:
+            current = cache.incr(current_key)
+        except ValueError:
+            # Expired between add() and incr()
+            cache.set(current_key, 1, timeout=int(period * 2) + 1)
+            current = 1
+
+        remaining = (period - elapsed) / period
+        if previous * remaining + current <= limit:
+            return 0.0
+        # Wait until the weighted count leaves room for one more request
+        if current >= limit:
+            return period - elapsed + period * (1 - (limit - 1) / current)
+        return max(period - elapsed - period * (limit - 1 - current) / previous, 0.001)
+
+
+class ThrottleStores:
+    """The configured store, built on first use"""
+
+    def __init__(self):
+        self._store = None
+        self._lock = threading.Lock()
+
+    def get(self):
+        if self._store is None:
+            with self._lock:
+                if self._store is None:
+                    if users_settings.THROTTLE_STORE == 'cache':
+                        self._store = CacheWindowStore(users_settings.THROTTLE_CACHE_ALIAS)
+                    else:
+                        self._store = LocalBucketStore(
+                            max_keys=users_settings.THROTTLE_LOCAL_MAX_KEYS
+                        )
+        return self._store
+
+    def reset(self):
+        self._store = None
+
+
+throttle_stores = ThrottleStores()
+
+
+def reset_throttle_store(*args, **kwargs):
+    if kwargs['setting'] == 'USERS':
+        throttle_stores.reset()
+
+
+setting_changed.connect(reset_throttle_store)
+
+
+class AuthRateThrottle(BaseThrottle):
+    """
+    IP, account and global budgets of the view's throttle_scope; stops at
+    the first one exhausted
+    """
+    kinds = ('ip', 'email', 'global')
+
+    def __init__(self):
+        self._wait = None
+
+    def get_identity(self, request, kind):
+        if kind == 'ip':
+            return self.get_ident(request)
+        if kind == 'email':
+            data = request.data
+            email = data.get('email') if hasattr(data, 'get') else None
+            if not isinstance(email, str):
+                return None
+            # The canonical form authenticate() looks up: case variants share a budget
+            return User.objects.normalize_email(email) or None
+        return ''
+
+    def allow_request(self, request, view):
+        scope = getattr(view, 'throttle_scope', None)
+        if not users_settings.THROTTLE_ENABLED or scope is None:
+            return True
+
+        rates = users_settings.THROTTLE_RATES
+        store = throttle_stores.get()
+        for kind in self.kinds:
+            rate = rates.get('%s_%s' % (scope, kind))
+            if not rate:
+                continue
+            identity = self.get_identity(request, kind)
+            if identity is None:
+                continue
+            limit, period = parse_rate(rate)
+            wait = store.consume((scope, kind, identity), limit, period)
+            if wait:
+                self._wait = wait
+                return False
+        return True
+
+    def wait(self):
+        return self._wait
+
+
+def blocking_throttles():
+    """Whether checking the throttles may block on I/O (a shared store)"""
+    return users_settings.THROTTLE_ENABLED and throttle_stores.get().blocking
@@ -0,0 +1,193 @@
+"""
+JWT Token Classes carrying signed user claims
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+
+from django.core.signals import setting_changed
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import AccessToken, BlacklistMixin, RefreshToken
+
+from .conf import users_settings
+from .instrumentation import timed
+from .revocation import is_revoked, revoke
+
+
+# Claims copied from the user into every token; the access token inherits
+# them from its refresh token.
+USER_CLAIMS = ('email', 'full_name', 'is_active', 'is_staff')
+TOKEN_VERSION_CLAIM = 'token_version'
+CREATED_STAMP_CLAIM = 'created_ts'
+PROFILE_STAMP_CLAIM = 'profile_ts'
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+MICROSECOND = timedelta(microseconds=1)
+
+
+def profile_stamp(value):
+    """Exact integer stamp of a datetime (microseconds since epoch)"""
+    if value is None:
+        return 0
+    return (value - EPOCH) // MICROSECOND
+
+
+def stamp_to_datetime(stamp):
+    """Inverse of profile_stamp"""
+    return EPOCH + stamp * MICROSECOND
+
+
+def user_claims(token):
+    """Return the user attributes carried by a token"""
+    claims = {claim: token[claim] for claim in USER_CLAIMS}
+    claims['created_at'] = stamp_to_datetime(token[CREATED_STAMP_CLAIM])
+    claims['updated_at'] = stamp_to_datetime(token[PROFILE_STAMP_CLAIM])
+    return claims
+
+
+class VerifiedTokenCache:
+    """
+    Bounded LRU of token payloads whose signature and registered claims
+    (exp, aud, iss) were verified, keyed by a digest of the raw token and
+    dropped at the token's exp. Only the decode is skipped: Token.verify()
+    (expiry, type, jti, blacklist) and the token state check still run on
+    every request, so revocation applies as before.
+    """
+
+    def __init__(self, maxsize=4096):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(token):
+        if isinstance(token, str):
+            token = token.encode()
+        return hashlib.blake2b(token, digest_size=32).digest()
+
+    def get(self, key):
+        """A copy of the verified payload, None if absent or expired"""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            exp, payload = entry
+            if exp <= time.time():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+        # Callers may change claims (refresh rotation)
+        return dict(payload)
+
+    def set(self, key, payload):
+        exp = payload.get('exp')
+        if self.maxsize <= 0 or not isinstance(exp, (int, float)):
+            return
+        with self._lock:
+            self._data[key] = (exp, dict(payload))
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class TimedTokenBackend:
+    """
+    simplejwt's token backend, reporting encode/decode time to
+    users.instrumentation and serving verified decodes from
+    verified_tokens when USERS['VERIFIED_TOKEN_CACHE_ENABLED'] is on
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+
+    def encode(self, payload):
+        with timed('jwt_encode'):
+            return self.backend.encode(payload)
+
+    def decode(self, token, verify=True):
+        with timed('jwt_decode'):
+            if not verify or not users_settings.VERIFIED_TOKEN_CACHE_ENABLED:
+                return self.backend.decode(token, verify=verify)
+            key = VerifiedTokenCache.key(token)
+            payload = verified_tokens.get(key)
+            if payload is None:
+                # Raises for bad signatures and expired tokens: nothing cached
+                payload = self.backend.decode(token, verify=True)
+                verified_tokens.set(key, payload)
+            return payload
+
+    def __getattr__(self, name):
+        return getattr(self.backend, name)
+
+
+verified_tokens = VerifiedTokenCache(users_settings.VERIFIED_TOKEN_CACHE_MAXSIZE)
+
+
+def reset_verified_tokens(*args, **kwargs):
+    """Signing keys or cache size changed: forget every verified token"""
+    if kwargs['setting'] in ('SIMPLE_JWT', 'SECRET_KEY', 'USERS'):
+        verified_tokens.clear()
+        verified_tokens.maxsize = users_settings.VERIFIED_TOKEN_CACHE_MAXSIZE
+
+
+setting_changed.connect(reset_verified_tokens)
+
+
+class TimedTokenMixin:
+    _timed_token_backend = None
+
+    @property
+    def token_backend(self):
+        if TimedTokenMixin._timed_token_backend is None:
+            TimedTokenMixin._timed_token_backend = TimedTokenBackend(super().token_backend)
+        return TimedTokenMixin._timed_token_backend
+
+
+class UserAccessToken(TimedTokenMixin, AccessToken):
+    """Access token (SIMPLE_JWT['AUTH_TOKEN_CLASSES'])"""
+
+
+class UserRefreshToken(TimedTokenMixin, RefreshToken):
+    """
+    Refresh token embedding the profile claims needed to authenticate
+    requests without loading the user from the database
+    """
+    access_token_class = UserAccessToken
+
+    @classmethod
+    def for_user(cls, user):
+        """Issue a token for the user with profile claims attached"""
+        # Skips BlacklistMixin.for_user: revocation uses RevokedToken rows,
+        # so recording every issued token in OutstandingToken was a write
+        # per login that nothing read
+        token = super(BlacklistMixin, cls).for_user(user)
+        token.set_user_claims(user)
+        return token
+
+    def check_blacklist(self):
+        """Reject revoked tokens, usually without a database query"""
+        if is_revoked(self.payload[api_settings.JTI_CLAIM], self.payload['exp']):
+            raise TokenError(_('Token is blacklisted'))
+    
+    def blacklist(self):
+        """Revoke this token until it expires (users.revocation)"""
+        revoke(self.payload[api_settings.JTI_CLAIM], self.payload['exp'])
+    
+    def set_user_claims(self, user):
+        """Copy the current profile claims and token version from the user"""
+        for claim in USER_CLAIMS:
+            self[claim] = getattr(user, claim)
+        self[TOKEN_VERSION_CLAIM] = user.token_version
+        self[CREATED_STAMP_CLAIM] = profile_stamp(user.created_at)
+        self[PROFILE_STAMP_CLAIM] = profile_stamp(user.updated_at)
@@ -8,7 +8,13 @@ from .views import (
     LogoutAPIView,
     ProfileAPIView,
     TokenRefreshAPIView,
-    ChangePasswordAPIView
+    ChangePasswordAPIView,
+    UserListAPIView,
+    UserSearchAPIView,
+    UserExportAPIView,
+    MetricsAPIView,
+    UserEventsAPIView,
+    BatchAPIView
 )
 
 app_name = 'users'
@@ -23,4 +29,14 @@ urlpatterns = [
     # Profile endpoints
     path('profile/', ProfileAPIView.as_view(), name='profile'),
     path('profile/change-password/', ChangePasswordAPIView.as_view(), name='change_password'),
+    
+    # Staff endpoints
+    path('', UserListAPIView.as_view(), name='list'),
+    path('search/', UserSearchAPIView.as_view(), name='search'),
+    path('export/', UserExportAPIView.as_view(), name='export'),
+    path('metrics/', MetricsAPIView.as_view(), name='metrics'),
+    path('events/', UserEventsAPIView.as_view(), name='events'),
+
+    # Several of the endpoints above in one round trip
+    path('batch/', BatchAPIView.as_view(), name='batch'),
 ]
\ No newline at end of file
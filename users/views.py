@@ -5,10 +5,12 @@ Clean, production-ready implementation with JWT tokens
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
-from rest_framework.permissions import IsAuthenticated, AllowAny
-from rest_framework_simplejwt.tokens import RefreshToken
-from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework.permissions import IsAuthenticated, IsAdminUser, AllowAny
+from rest_framework_simplejwt.exceptions import TokenError, AuthenticationFailed
+from rest_framework_simplejwt.settings import api_settings
 from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.http import HttpResponse, StreamingHttpResponse
 
 from .serializers import (
     RegisterSerializer,
@@ -16,6 +18,26 @@ from .serializers import (
     ProfileSerializer,
     ProfileUpdateSerializer
 )
+from .tokens import UserRefreshToken
+from .authentication import check_token_state, claims_are_current
+from .batch import parse_sub_request, run_batch
+from .conditional import (
+    if_match,
+    not_modified,
+    precondition_failed_payload,
+    precondition_holds,
+    profile_revision,
+    save_unless_modified,
+    set_validators
+)
+from .conf import users_settings
+from .events import events_payload, parse_read_params, wait_for_events
+from .exporting import ENCODERS, export_users, parse_filters
+from .instrumentation import metrics
+from .pagination import UserCursorPagination
+from .search import search_index
+from .throttling import AuthRateThrottle
+from .writebehind import record_login
 
 User = get_user_model()
 
@@ -26,6 +48,8 @@ class RegisterAPIView(APIView):
     POST /api/v1/users/auth/register/
     """
     permission_classes = [AllowAny]
+    throttle_classes = [AuthRateThrottle]
+    throttle_scope = 'register'
     serializer_class = RegisterSerializer
 
     def post(self, request):
@@ -36,7 +60,7 @@ class RegisterAPIView(APIView):
             user = serializer.save()
             
             # Generate JWT tokens for the new user
-            refresh = RefreshToken.for_user(user)
+            refresh = UserRefreshToken.for_user(user)
             access_token = str(refresh.access_token)
             refresh_token = str(refresh)
             
@@ -69,6 +93,8 @@ class LoginAPIView(APIView):
     POST /api/v1/users/auth/login/
     """
     permission_classes = [AllowAny]
+    throttle_classes = [AuthRateThrottle]
+    throttle_scope = 'login'
     serializer_class = LoginSerializer
 
     def post(self, request):
@@ -80,9 +106,10 @@ class LoginAPIView(APIView):
         
         if serializer.is_valid():
             user = serializer.validated_data['user']
+            record_login(user)
             
             # Generate JWT tokens
-            refresh = RefreshToken.for_user(user)
+            refresh = UserRefreshToken.for_user(user)
             access_token = str(refresh.access_token)
             refresh_token = str(refresh)
             
@@ -131,7 +158,7 @@ class LogoutAPIView(APIView):
                 }, status=status.HTTP_400_BAD_REQUEST)
             
             # Blacklist the refresh token
-            token = RefreshToken(refresh_token)
+            token = UserRefreshToken(refresh_token)
             token.blacklist()
             
             return Response({
@@ -161,63 +188,61 @@ class ProfileAPIView(APIView):
     PUT /api/v1/users/profile/ - Full update
     PATCH /api/v1/users/profile/ - Partial update
     Requires: Authorization header with access token
+    Conditional: GET honours If-None-Match/If-Modified-Since (304),
+    PUT/PATCH honour If-Match (412)
     """
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
-        """Get current user's profile"""
-        serializer = ProfileSerializer(request.user)
-        
-        return Response({
+        """Get current user's profile (304 if the client's copy is current)"""
+        response = not_modified(request, request.user)
+        if response is not None:
+            return response
+
+        return set_validators(Response({
             "success": True,
-            "data": serializer.data
-        }, status=status.HTTP_200_OK)
+            "data": ProfileSerializer.represent(request.user)
+        }, status=status.HTTP_200_OK), request.user)
 
     def put(self, request):
         """Update user profile (full update)"""
-        serializer = ProfileUpdateSerializer(
-            request.user,
-            data=request.data,
-            partial=False
-        )
-        
-        if serializer.is_valid():
-            serializer.save()
-            
-            # Return updated profile
-            profile_data = ProfileSerializer(request.user).data
-            
-            return Response({
-                "success": True,
-                "message": "Profile updated successfully",
-                "data": profile_data
-            }, status=status.HTTP_200_OK)
-        
-        return Response({
-            "success": False,
-            "message": "Profile update failed",
-            "errors": serializer.errors
-        }, status=status.HTTP_400_BAD_REQUEST)
+        return self.update(request, partial=False)
 
     def patch(self, request):
         """Update user profile (partial update)"""
+        return self.update(request, partial=True)
+
+    def update(self, request, partial):
+        """Apply an update, refused with 412 if If-Match names an older revision"""
+        etags = if_match(request)
+        revision = profile_revision(request.user)
+        if not precondition_holds(etags, request.user, revision):
+            return set_validators(Response(
+                precondition_failed_payload(), status=status.HTTP_412_PRECONDITION_FAILED
+            ), request.user, revision)
+
         serializer = ProfileUpdateSerializer(
             request.user,
             data=request.data,
-            partial=True
+            partial=partial
         )
         
         if serializer.is_valid():
-            serializer.save()
+            if etags is None or '*' in etags:
+                serializer.save()
+            elif not save_unless_modified(request.user, revision, serializer.save):
+                return Response(
+                    precondition_failed_payload(), status=status.HTTP_412_PRECONDITION_FAILED
+                )
             
             # Return updated profile
-            profile_data = ProfileSerializer(request.user).data
+            profile_data = ProfileSerializer.represent(request.user)
             
-            return Response({
+            return set_validators(Response({
                 "success": True,
                 "message": "Profile updated successfully",
                 "data": profile_data
-            }, status=status.HTTP_200_OK)
+            }, status=status.HTTP_200_OK), request.user)
         
         return Response({
             "success": False,
@@ -234,6 +259,8 @@ class TokenRefreshAPIView(APIView):
     Returns: New access and refresh tokens
     """
     permission_classes = [AllowAny]
+    throttle_classes = [AuthRateThrottle]
+    throttle_scope = 'token_refresh'
 
     def post(self, request):
         """Refresh access token using refresh token"""
@@ -248,7 +275,16 @@ class TokenRefreshAPIView(APIView):
                 }, status=status.HTTP_400_BAD_REQUEST)
             
             # Create new token from refresh token
-            refresh = RefreshToken(refresh_token)
+            refresh = UserRefreshToken(refresh_token)
+            
+            # Reject revoked tokens and re-sign stale profile claims
+            try:
+                stamp = check_token_state(refresh)
+            except AuthenticationFailed as e:
+                raise TokenError(e.detail['detail'])
+            if not claims_are_current(refresh, stamp):
+                refresh.set_user_claims(User.objects.get(pk=refresh[api_settings.USER_ID_CLAIM]))
+            
             access_token = str(refresh.access_token)
             new_refresh_token = str(refresh)
             
@@ -348,4 +384,242 @@ class ChangePasswordAPIView(APIView):
         return Response({
             "success": True,
             "message": "Password changed successfully"
-        }, status=status.HTTP_200_OK)
\ No newline at end of file
+        }, status=status.HTTP_200_OK)
+
+
+class UserListAPIView(APIView):
+    """
+    User Directory Endpoint (staff only)
+    GET /users/?is_active=true&email_domain=example.com&fields=id,email
+    Filters: is_active, is_staff, email_domain, created_after, created_before,
+    updated_after, updated_before
+    Paginated with an opaque cursor (next/previous links), page_size up to 500
+    """
+    permission_classes = [IsAdminUser]
+    pagination_class = UserCursorPagination
+
+    def get(self, request):
+        """List users, newest first"""
+        fields = ProfileSerializer.Meta.fields
+        requested = request.query_params.get('fields')
+        if requested:
+            fields = [name.strip() for name in requested.split(',') if name.strip()]
+            unknown = set(fields) - set(ProfileSerializer.Meta.fields)
+            if unknown:
+                return Response({
+                    "success": False,
+                    "message": "Invalid fields",
+                    "errors": {
+                        "fields": ["Unknown field(s): %s" % ', '.join(sorted(unknown))]
+                    }
+                }, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            lookups = parse_filters(request.query_params)
+        except ValidationError as e:
+            return Response({
+                "success": False,
+                "message": "Invalid filters",
+                "errors": {"detail": list(e.messages)}
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        queryset = User.objects.filter(**lookups)
+        domain = request.query_params.get('email_domain', '').strip().lstrip('@')
+        if domain:
+            # Emails are stored lowercased: no UPPER()/ILIKE on the column
+            queryset = queryset.filter(email__endswith='@' + domain.lower())
+        # created_at is the cursor position, id is needed for the row order
+        queryset = queryset.only(*set(fields) | {'id', 'created_at'})
+
+        paginator = self.pagination_class()
+        page = paginator.paginate_queryset(queryset, request, view=self)
+        results = [ProfileSerializer.represent(user, fields) for user in page]
+
+        return Response({
+            "success": True,
+            "data": paginator.get_paginated_data(results)
+        }, status=status.HTTP_200_OK)
+
+
+class UserSearchAPIView(APIView):
+    """
+    User Search Endpoint (staff only)
+    GET /users/search/?q=jane&limit=20&fuzzy=true
+    Prefix matches on email and name words, then typo-tolerant matches,
+    best first
+    """
+    permission_classes = [IsAdminUser]
+    max_limit = 100
+
+    def get(self, request):
+        """Search users by email or name"""
+        query = request.query_params.get('q', '').strip()
+        if not query:
+            return Response({
+                "success": False,
+                "message": "Search failed",
+                "errors": {"q": ["This field is required"]}
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            limit = min(int(request.query_params.get('limit', 20)), self.max_limit)
+        except ValueError:
+            limit = 20
+        fuzzy = request.query_params.get('fuzzy', 'true').lower() not in ('0', 'false', 'no')
+
+        ranked = search_index.search(query, limit=max(limit, 1), fuzzy=fuzzy)
+        users = User.objects.in_bulk([user_id for user_id, _ in ranked])
+        results = []
+        for user_id, score in ranked:
+            if user_id in users:
+                data = ProfileSerializer.represent(users[user_id])
+                data['score'] = round(score, 3)
+                results.append(data)
+
+        return Response({
+            "success": True,
+            "data": results
+        }, status=status.HTTP_200_OK)
+
+
+class UserExportAPIView(APIView):
+    """
+    User Export Endpoint (staff only)
+    GET /users/export/?output=jsonl|csv
+    Filters: is_active, is_staff, created_after, created_before,
+    updated_after, updated_before (ISO 8601 dates or datetimes)
+    The response is streamed row by row.
+    """
+    permission_classes = [IsAdminUser]
+    chunk_size = 2000
+    # Streamed: cannot be part of a /users/batch/ response
+    batchable = False
+
+    def get(self, request):
+        """Stream all matching users"""
+        file_format = request.query_params.get('output', 'jsonl')
+        if file_format not in ENCODERS:
+            return Response({
+                "success": False,
+                "message": "Export failed",
+                "errors": {"output": ["Must be one of: %s" % ', '.join(sorted(ENCODERS))]}
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            lookups = parse_filters(request.query_params)
+        except ValidationError as e:
+            return Response({
+                "success": False,
+                "message": "Export failed",
+                "errors": {"detail": list(e.messages)}
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        _, content_type = ENCODERS[file_format]
+        response = StreamingHttpResponse(
+            export_users(file_format, lookups, self.chunk_size),
+            content_type=content_type
+        )
+        response['Content-Disposition'] = 'attachment; filename="users.%s"' % file_format
+        return response
+
+
+class MetricsAPIView(APIView):
+    """
+    Request Metrics Endpoint (staff only)
+    GET /users/metrics/
+    Prometheus text format; 404 unless USERS['METRICS_ENABLED'] is on
+    """
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        """Render the request histograms of this server process"""
+        if not users_settings.METRICS_ENABLED:
+            return Response({
+                "success": False,
+                "message": "Metrics are disabled"
+            }, status=status.HTTP_404_NOT_FOUND)
+
+        return HttpResponse(
+            metrics.render(),
+            content_type='text/plain; version=0.0.4; charset=utf-8'
+        )
+
+
+class UserEventsAPIView(APIView):
+    """
+    User Lifecycle Events Endpoint (staff only)
+    GET /users/events/?after=<position>&limit=100&wait=25
+    Published events following `after`, oldest first; with `wait` the
+    request is held until some arrive or that many seconds pass. Resume
+    from the returned `next` position (see users.events)
+    """
+    permission_classes = [IsAdminUser]
+    # May wait: cannot hold up a /users/batch/ response
+    batchable = False
+
+    def get(self, request):
+        """Events after a stream position"""
+        try:
+            after, limit, wait = parse_read_params(request.query_params)
+        except ValidationError as e:
+            return Response({
+                "success": False,
+                "message": "Invalid parameters",
+                "errors": {"detail": list(e.messages)}
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        events = wait_for_events(after, limit, wait)
+        return Response({
+            "success": True,
+            "data": events_payload(events, after)
+        }, status=status.HTTP_200_OK)
+
+
+class BatchAPIView(APIView):
+    """
+    Batch Endpoint
+    POST /users/batch/
+    Body: {"requests": [{"method": "GET", "path": "/users/profile/"}, ...]}
+    Each item may carry a JSON "body" and "headers" (e.g. If-None-Match).
+    Runs up to USERS['BATCH_MAX_REQUESTS'] users endpoints in one round trip
+    with this request's authentication; results come back in order
+    """
+    permission_classes = [AllowAny]
+    batchable = False
+
+    def post(self, request):
+        """Dispatch the sub-requests and return their responses"""
+        items = request.data.get('requests') if isinstance(request.data, dict) else None
+        if not isinstance(items, list) or not items:
+            return Response({
+                "success": False,
+                "message": "Invalid batch",
+                "errors": {"requests": ["A non-empty list of sub-requests is required"]}
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        max_requests = users_settings.BATCH_MAX_REQUESTS
+        if len(items) > max_requests:
+            return Response({
+                "success": False,
+                "message": "Invalid batch",
+                "errors": {"requests": ["At most %d sub-requests per batch" % max_requests]}
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        sub_requests = []
+        errors = {}
+        for index, item in enumerate(items):
+            try:
+                sub_requests.append(parse_sub_request(item))
+            except ValueError as e:
+                errors[str(index)] = [str(e)]
+        if errors:
+            return Response({
+                "success": False,
+                "message": "Invalid batch",
+                "errors": {"requests": errors}
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response({
+            "success": True,
+            "data": run_batch(request, sub_requests)
+        }, status=status.HTTP_200_OK)
@@ -0,0 +1,65 @@
+"""
+Worker Warm-up
+Work every process would otherwise do on its first requests, done once
+when the WSGI/ASGI entry point is imported. With a preloading server
+(gunicorn --preload) that is in the master, before workers fork, so they
+start warm and share the pages:
+- password hashers: settings parsed, hasher classes imported
+- JWT: simplejwt settings, token backend and key material, one
+  encode/decode through the same code path as requests
+- DRF: renderer, parser, authentication, permission and exception
+  handler classes of REST_FRAMEWORK imported
+- URLs: the URLconf and every view module imported, the resolver
+  populated
+No database connection is left open: forked workers must not share one.
+"""
+import logging
+import time
+
+from django.contrib.auth import hashers
+from django.db import connections
+from django.urls import get_resolver
+
+logger = logging.getLogger(__name__)
+
+
+def warm_hashers():
+    hashers.get_hashers_by_algorithm()
+    hashers.get_hasher()
+
+
+def warm_tokens():
+    from rest_framework_simplejwt.settings import api_settings
+
+    from .tokens import UserAccessToken
+
+    api_settings.AUTH_TOKEN_CLASSES
+    token = UserAccessToken()
+    backend = token.get_token_backend()
+    backend.decode(backend.encode(token.payload))
+
+
+def warm_rest_framework():
+    from rest_framework.settings import api_settings
+
+    for name in api_settings.import_strings:
+        getattr(api_settings, name)
+
+
+def warm_urls():
+    resolver = get_resolver()
+    resolver.url_patterns
+    resolver.reverse_dict
+
+
+def warm_up():
+    """Run every warm-up step; returns the seconds taken"""
+    start = time.perf_counter()
+    warm_hashers()
+    warm_tokens()
+    warm_rest_framework()
+    warm_urls()
+    connections.close_all()
+    elapsed = time.perf_counter() - start
+    logger.debug('Warm-up done in %.1fms', elapsed * 1000)
+    return elapsed
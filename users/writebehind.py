@@ -0,0 +1,152 @@
+"""
+Write-behind Buffer for last_login
+Logins only record (user id, timestamp) in memory. A background thread
+coalesces the entries per user and writes them with one bulk_update every
+LAST_LOGIN_FLUSH_INTERVAL seconds, or sooner once LAST_LOGIN_FLUSH_SIZE
+users are pending, so the login path never waits on a write lock. Pending
+entries are flushed when the process exits.
+"""
+import atexit
+import logging
+import os
+import threading
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.utils import timezone
+from rest_framework_simplejwt.settings import api_settings
+
+from .cache import user_cache
+from .conf import users_settings
+from .sqlite import write_queue
+
+logger = logging.getLogger(__name__)
+
+User = get_user_model()
+
+
+class LastLoginBuffer:
+    """
+    Per-process map of user id -> latest login time, drained by a daemon
+    thread started on first use (and again after a fork)
+    """
+
+    def __init__(self):
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._pid = None
+        self._thread = None
+        self._registered_atexit = False
+
+    @property
+    def enabled(self):
+        return users_settings.LAST_LOGIN_BUFFER_ENABLED
+
+    def record(self, user_id, when=None):
+        """Remember a login; written to the database by the next flush"""
+        when = when or timezone.now()
+        if not self.enabled:
+            write_queue.run(User.objects.filter(pk=user_id).update, last_login=when)
+            return
+        self._add(user_id, when)
+
+    async def arecord(self, user_id, when=None):
+        """Async version of record()"""
+        when = when or timezone.now()
+        if not self.enabled:
+            await User.objects.filter(pk=user_id).aupdate(last_login=when)
+            return
+        self._add(user_id, when)
+
+    def _add(self, user_id, when):
+        self._ensure_started()
+        with self._lock:
+            previous = self._pending.get(user_id)
+            if previous is None or when > previous:
+                self._pending[user_id] = when
+            pending = len(self._pending)
+        if pending >= users_settings.LAST_LOGIN_FLUSH_SIZE:
+            self._wakeup.set()
+
+    def pending(self):
+        with self._lock:
+            return len(self._pending)
+
+    def flush(self):
+        """Write every pending entry; returns the number of users updated"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return 0
+
+        users = [User(pk=user_id, last_login=when) for user_id, when in pending.items()]
+        try:
+            # bulk_update does not run auto_now, so updated_at (and the
+            # profile stamp in issued tokens) is left alone
+            write_queue.run(User.objects.bulk_update, users, ['last_login'], batch_size=500)
+        except Exception:
+            # Keep the entries for the next attempt, unless newer ones arrived
+            with self._lock:
+                for user_id, when in pending.items():
+                    if self._pending.get(user_id, when) <= when:
+                        self._pending[user_id] = when
+            raise
+
+        # Cached copies must not write an older last_login back on save()
+        for user_id in pending:
+            user_cache.invalidate(user_id)
+        return len(pending)
+
+    def _ensure_started(self):
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pending = {}
+            self._wakeup = threading.Event()
+            self._pid = os.getpid()
+            self._thread = threading.Thread(
+                target=self._run, name='users-last-login-flush', daemon=True
+            )
+            self._thread.start()
+            if not self._registered_atexit:
+                atexit.register(self.drain)
+                self._registered_atexit = True
+
+    def _run(self):
+        pid = os.getpid()
+        while self._pid == pid:
+            self._wakeup.wait(users_settings.LAST_LOGIN_FLUSH_INTERVAL)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception('Flushing last_login updates failed')
+            finally:
+                connection.close()
+
+    def drain(self):
+        """Flush on shutdown"""
+        if self._pid != os.getpid():
+            return
+        try:
+            self.flush()
+        except Exception:
+            logger.exception('Draining last_login updates failed')
+
+
+last_login_buffer = LastLoginBuffer()
+
+
+def record_login(user):
+    """Record a successful login when SIMPLE_JWT['UPDATE_LAST_LOGIN'] is on"""
+    if api_settings.UPDATE_LAST_LOGIN:
+        last_login_buffer.record(user.pk)
+
+
+async def arecord_login(user):
+    """Async version of record_login"""
+    if api_settings.UPDATE_LAST_LOGIN:
+        await last_login_buffer.arecord(user.pk)